@@ -1,16 +1,17 @@
 # app.py (root)
 import streamlit as st
 
-# Import dashboards
-from modules.patient.app import render_patient_dashboard
-from modules.health_agent.app import render_health_agent_dashboard
-from modules.doctor.app import render_doctor_dashboard
-from modules.management.app import render_management_dashboard
+# Dashboards are imported lazily, only for the logged-in role (modules/registry.py)
+from modules.registry import get_dashboard
 
-from db import get_user_by_username, verify_password, init_db
+from db import begin_rerun, schema_is_current
+from services import assets, auth
 
 st.set_page_config(page_title="Hospital App", layout="wide")
 
+# Per-rerun DB connection counters (see db.rerun_stats)
+begin_rerun()
+
 from pathlib import Path
 
 
@@ -28,23 +29,35 @@ def set_global_background():
     """, unsafe_allow_html=True)
 
 
-# Ensure DB exists
-init_db()  # creates users.db if missing
+# Schema is created/upgraded at deploy time (python tools/migrate.py), never per render
+if not schema_is_current():
+    st.error("Database schema is out of date. Run `python tools/migrate.py` and restart the app.")
+    st.stop()
 
 
 # =========================
 # 3️⃣ Login Page
 # =========================
-def render_login():
-    import base64
+def _client_ip():
+    try:
+        ip = st.context.ip_address
+    except Exception:
+        return None
+    return ip if isinstance(ip, str) else None   # not a real connection (e.g. AppTest)
+
 
-    # Load Hospital Logo
-    banner_b64 = ""
+def _client():
+    """This browser's key for binding session tokens (IP + User-Agent, see services.auth)."""
     try:
-        with open("Logo_upscaled.png", "rb") as f:
-            banner_b64 = base64.b64encode(f.read()).decode("utf-8")
+        user_agent = st.context.headers.get("User-Agent")
     except Exception:
-        pass
+        user_agent = None
+    return auth.client_key(_client_ip(), user_agent)
+
+
+def render_login():
+    # Hospital logo: fingerprinted WebP/PNG variants served as static files (tools/build_assets.py)
+    banner = assets.picture_html("logo", alt="Mother Teresa Hospital", sizes="(max-width: 600px) 100vw, 600px")
 
     # CSS for login card
     st.markdown("""
@@ -96,9 +109,9 @@ def render_login():
     """, unsafe_allow_html=True)
 
     # Banner (logo or fallback text)
-    if banner_b64:
+    if banner:
         st.markdown(
-            f"<div class='login-header'><img src='data:image/png;base64,{banner_b64}'/></div>",
+            f"<div class='login-header'>{banner}</div>",
             unsafe_allow_html=True,
         )
     else:
@@ -115,25 +128,39 @@ def render_login():
         login_btn = st.form_submit_button("Log In")
 
     if login_btn:
-        user_row = get_user_by_username(login_input.strip())
-        if not user_row:
+        user, error = auth.login(login_input.strip(), password, _client_ip())
+        if error == auth.RATE_LIMITED:
+            st.error("Too many login attempts. Please wait a minute and try again.")
+        elif error == auth.BUSY:
+            st.error("Server is busy. Please try again in a moment.")
+        elif error == auth.NOT_FOUND:
             st.error("User not found. (Ask admin to create your account.)")
-        elif not verify_password(user_row["salt"], user_row["password_hash"], password):
+        elif error == auth.BAD_PASSWORD:
             st.error("Incorrect password.")
         else:
-            st.session_state.user = {
-                "id": user_row["id"],
-                "username": user_row["username"],
-                "name": user_row["name"],
-                "role": user_row["role"],
-            }
-            st.success(f"Logged in as {user_row['name']} ({user_row['role']})")
+            st.session_state.user = user
+            # Signed token in the URL: a browser refresh restores the session without re-hashing.
+            # It is bound to this browser and short-lived (renewed below while the user is active).
+            st.query_params[auth.SESSION_PARAM] = auth.issue_token(user, _client())
+            st.success(f"Logged in as {user['name']} ({user['role']})")
             st.rerun()
 
 
 # =========================
 # 4️⃣ Role-based Dashboards
 # =========================
+if "user" not in st.session_state:
+    restored = auth.user_from_token(st.query_params.get(auth.SESSION_PARAM), _client())
+    if restored:
+        st.session_state.user = restored
+    else:
+        st.query_params.pop(auth.SESSION_PARAM, None)
+else:
+    # Sliding expiry: swap in a fresh token once half the TTL has passed
+    renewed = auth.renew_token(st.query_params.get(auth.SESSION_PARAM), _client())
+    if renewed:
+        st.query_params[auth.SESSION_PARAM] = renewed
+
 if "user" not in st.session_state:
     set_global_background()
     render_login()
@@ -142,13 +169,8 @@ else:
     role = st.session_state["user"]["role"]
     user = st.session_state["user"]
 
-    if user["role"] == "Patient":
-        render_patient_dashboard(user)
-    elif user["role"] == "Health Agent":
-        render_health_agent_dashboard(user)
-    elif user["role"] == "Doctor":
-        render_doctor_dashboard(user)
-    elif user["role"] == "Management":
-        render_management_dashboard(user)
+    render_dashboard = get_dashboard(role)
+    if render_dashboard:
+        render_dashboard(user)
     else:
         st.error("Unknown role")
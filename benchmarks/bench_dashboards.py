@@ -0,0 +1,202 @@
+# benchmarks/bench_dashboards.py
+"""
+Dashboard data-path benchmarks against generated databases (tools/generate_data.py).
+
+Times each data function the screens call on a rerun, at several database sizes,
+and reports p50/p95 latency plus row throughput. Results can be saved as a
+baseline JSON and later runs compared against it (exit code 1 on regression).
+
+Usage (from project root):
+> python benchmarks/bench_dashboards.py                          # 1k, 10k, 100k patients
+> python benchmarks/bench_dashboards.py --scales 1000,10000 --repeat 30
+> python benchmarks/bench_dashboards.py --save-baseline benchmarks/baseline.json
+> python benchmarks/bench_dashboards.py --baseline benchmarks/baseline.json --tolerance 0.25
+> python benchmarks/bench_dashboards.py --scales 100000 --cached   # shared-cache hits
+
+Generated databases are cached in --data-dir (default: <tmp>/hospital_bench) and
+reused across runs; they are pinned to BENCH_END_DATE so every machine benchmarks
+the same rows. Baselines are machine-specific: record one per runner.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Time the queries, not services.query_cache (--cached measures the cache-hit path)
+os.environ.setdefault("HOSPITAL_QUERY_CACHE", "0")
+
+BENCH_END_DATE = date(2026, 1, 1)
+BENCH_SEED = 42
+DEFAULT_SCALES = [1_000, 10_000, 100_000]
+
+
+def _cases():
+    """name -> zero-arg callable returning the rows/DataFrame the screen would render."""
+    from modules.health_agent import app as ha
+    from services import downsample, kpis, messages, metrics, patients, pharmacy
+
+    def page(**kw):
+        return patients.page_patients(**kw)[0]
+
+    def chart_frame(grain):
+        import pandas as pd
+
+        df = pd.DataFrame(metrics.metric_series(range(1, 51), metrics.METRICS, grain=grain))
+        df["date"] = pd.to_datetime(df["date"])
+        return downsample.downsample_frame(df, x="date", y="value", by=["patient_id", "metric"])
+
+    return {
+        "patients_page_newest": lambda: page(order="newest", limit=100),
+        "patients_page_deep": lambda: page(order="name", after=("M", 0), limit=100),
+        "patients_page_search": lambda: page(order="name", search="ra", limit=100),
+        "picker_name": lambda: patients.search_patients("ra"),
+        "picker_digits": lambda: patients.search_patients("98"),
+        "list_villages": ha._list_villages,
+        "patients_search_df": lambda: ha._search_patients_df(page(order="name", with_latest=True, limit=100)),
+        "health_profiles_page": lambda: page(order="name", with_latest=True),
+        "health_profiles_red": lambda: page(order="name", risk_level="Red", with_latest=True),
+        # Health Metrics chart for a page of patients (ids 1..50 exist at every scale), all metrics
+        "health_metrics_daily": lambda: metrics.metric_series(range(1, 51), metrics.METRICS, grain="day"),
+        "health_metrics_monthly": lambda: metrics.metric_series(range(1, 51), metrics.METRICS, grain="month"),
+        "health_metrics_chart_df": lambda: chart_frame("day"),
+        "low_stock_alert_df": lambda: ha._low_stock_alert_df(ha.RMP_STOCK_ITEMS),
+        "pharmacy_page": lambda: pharmacy.page_drugs()[0],
+        # Messages screen: the newest page, then a poll with nothing new
+        "messages_tail": lambda: messages.tail("RMP")[0],
+        "messages_poll": lambda: messages.since("RMP", 2 ** 62),
+        "management_kpis": lambda: [kpis.get_kpis(max_age=0)],
+        "recent_vitals_unsent": lambda: ha._recent_vitals(unsent_only=True),
+        "recent_vitals_all": lambda: ha._recent_vitals(unsent_only=False),
+        "recent_tests_unsent": lambda: ha._recent_sugar_tests(unsent_only=True),
+        "recent_tests_all": lambda: ha._recent_sugar_tests(unsent_only=False),
+    }
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _ensure_db(data_dir, patients):
+    from tools.generate_data import generate
+
+    path = os.path.join(data_dir, f"bench_{patients}_s{BENCH_SEED}.db")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"Generating {path} ...")
+        tmp = path + ".partial"
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(tmp + suffix):
+                os.remove(tmp + suffix)
+        generate(tmp, patients, vitals=24, sugar=12, days=730, end=BENCH_END_DATE, seed=BENCH_SEED, log=None)
+        os.replace(tmp, path)
+    return path
+
+
+def run_scale(db_path, cases, repeat, warmup):
+    import db
+
+    db.DEFAULT_DB_PATH = db_path   # get_connection() resolves the pool per call
+    results = {}
+    for name, fn in cases.items():
+        for _ in range(warmup):
+            fn()
+        times, rows = [], 0
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            out = fn()
+            times.append(time.perf_counter() - t0)
+            rows = len(out)
+        p50 = statistics.median(times)
+        results[name] = {
+            "p50_ms": round(p50 * 1000, 3),
+            "p95_ms": round(_pct(times, 95) * 1000, 3),
+            "rows": rows,
+            "rows_per_s": round(rows / p50) if p50 > 0 else None,
+        }
+    return results
+
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    """[(scale, case, base_p95, now_p95)] for every case whose p95 got worse than allowed."""
+    regressions = []
+    for scale, cases in current.items():
+        for name, now in cases.items():
+            base = baseline.get(scale, {}).get(name)
+            if not base:
+                continue
+            limit = base["p95_ms"] * (1 + tolerance)
+            if now["p95_ms"] > limit and now["p95_ms"] - base["p95_ms"] > min_delta_ms:
+                regressions.append((scale, name, base["p95_ms"], now["p95_ms"]))
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)), help="comma-separated patient counts")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--warmup", type=int, default=2)
+    ap.add_argument("--only", default="", help="comma-separated case names")
+    ap.add_argument("--cached", action="store_true", help="serve repeats from services.query_cache")
+    ap.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "hospital_bench"))
+    ap.add_argument("--baseline", help="compare against this baseline JSON")
+    ap.add_argument("--save-baseline", help="write results to this JSON")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown (0.25 = +25%%)")
+    ap.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    args = ap.parse_args()
+
+    if args.cached:
+        from services import query_cache
+
+        query_cache.QUERY_CACHE_ENABLED = True
+    cases = _cases()
+    if args.only:
+        wanted = {c.strip() for c in args.only.split(",") if c.strip()}
+        cases = {k: v for k, v in cases.items() if k in wanted}
+
+    current = {}
+    for scale in [int(s) for s in args.scales.split(",") if s.strip()]:
+        path = _ensure_db(args.data_dir, scale)
+        current[str(scale)] = res = run_scale(path, cases, args.repeat, args.warmup)
+        print(f"\n== {scale:,} patients ({os.path.basename(path)}) ==")
+        print(f"  {'case':<24}{'p50 ms':>10}{'p95 ms':>10}{'rows':>10}{'rows/s':>14}")
+        for name, r in res.items():
+            print(f"  {name:<24}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['rows']:>10}{r['rows_per_s'] or 0:>14,}")
+
+    if args.save_baseline:
+        doc = {
+            "meta": {
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "machine": platform.machine(),
+                "seed": BENCH_SEED,
+                "end_date": BENCH_END_DATE.isoformat(),
+                "repeat": args.repeat,
+            },
+            "results": current,
+        }
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(current, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\nREGRESSIONS (p95 > baseline +{args.tolerance:.0%} and +{args.min_delta_ms}ms):")
+            for scale, name, base, now in regressions:
+                print(f"  {scale:>7} {name:<24} {base:8.2f} -> {now:8.2f} ms")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/bench_dedupe.py
+"""
+Duplicate-patient detection at registration (services/dedupe.py): latency and
+recall of find_duplicates() on a generated database (default 100k patients).
+
+Every 997th patient is "re-registered" with a typical spelling variant (doubled
+vowel, upper case, dropped last letter, "Lakshmi" -> "Laxmi", no mobile) and
+the original must come back among the matches. Target: p95 under 50 ms.
+
+Usage (from project root):
+> python benchmarks/bench_dedupe.py
+> python benchmarks/bench_dedupe.py --patients 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_dashboards import _ensure_db, _pct
+
+TARGET_MS = 50
+
+
+def _variant(rng, name, mobile):
+    kind = rng.choice(["double vowel", "upper case", "typo", "laxmi", "no mobile"])
+    if kind == "double vowel":
+        name = name.replace("a", "aa", 1)
+    elif kind == "upper case":
+        name = name.upper()
+    elif kind == "typo":
+        name = name[:-1]
+    elif kind == "laxmi":
+        name = name.replace("Lakshmi", "Laxmi").replace("th", "t")
+    else:
+        mobile = None
+    return name, mobile
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--patients", type=int, default=100_000)
+    ap.add_argument("--every", type=int, default=997, help="re-register every Nth patient")
+    ap.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "hospital_bench"))
+    args = ap.parse_args()
+
+    path = _ensure_db(args.data_dir, args.patients)
+    import db
+    from services import dedupe
+
+    db.DEFAULT_DB_PATH = path
+    with db.connection() as conn:
+        dedupe.sync_match_keys(conn)
+        conn.commit()
+        rows = conn.execute(
+            "SELECT id, name, father_name, age, gender, village, mobile FROM patients WHERE id % ? = 0",
+            (args.every,),
+        ).fetchall()
+
+    rng = random.Random(1)
+    times, found, top1 = [], 0, 0
+    for r in rows:
+        name, mobile = _variant(rng, r["name"], r["mobile"])
+        t0 = time.perf_counter()
+        matches = dedupe.find_duplicates(name, r["father_name"], r["age"], r["gender"], r["village"], mobile)
+        times.append((time.perf_counter() - t0) * 1000)
+        found += any(m["id"] == r["id"] for m in matches)
+        top1 += bool(matches) and matches[0]["id"] == r["id"]
+
+    t0 = time.perf_counter()
+    unrelated = dedupe.find_duplicates("Zubeida Khan", None, 30, "Female", "Ramapuram", "9000000001")
+    unrelated_ms = (time.perf_counter() - t0) * 1000
+
+    p95 = _pct(times, 95)
+    print(f"== {args.patients:,} patients ({os.path.basename(path)}), {len(rows)} re-registrations ==")
+    print(f"  recall          {found}/{len(rows)} (top match {top1}/{len(rows)})")
+    print(f"  latency ms      p50 {statistics.median(times):.1f} / p95 {p95:.1f} / max {max(times):.1f}")
+    print(f"  unrelated name  {len(unrelated)} matches in {unrelated_ms:.1f} ms")
+    print(f"  p95 {'within' if p95 <= TARGET_MS else 'OVER'} the {TARGET_MS} ms target")
+
+
+if __name__ == "__main__":
+    main()
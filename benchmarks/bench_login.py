@@ -0,0 +1,97 @@
+# benchmarks/bench_login.py
+"""
+Login throughput: concurrent clients logging in through services.auth against a
+scratch database, reporting logins/sec and p50/p95 latency. Also times a
+refresh (session token -> user), which should not touch PBKDF2 at all.
+
+Usage (from project root):
+> python benchmarks/bench_login.py --clients 16 --logins 20
+> python benchmarks/bench_login.py --workers 1          # see the pool bound at work
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--clients", type=int, default=16, help="concurrent browser sessions")
+    ap.add_argument("--logins", type=int, default=20, help="logins per client")
+    ap.add_argument("--users", type=int, default=8)
+    ap.add_argument("--workers", type=int, default=None, help="HOSPITAL_AUTH_WORKERS override")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_login_")
+    os.environ["HOSPITAL_DB_PATH"] = os.path.join(tmp, "hospital.db")
+    if args.workers is not None:
+        os.environ["HOSPITAL_AUTH_WORKERS"] = str(args.workers)
+    os.environ["HOSPITAL_AUTH_MAX_PENDING"] = str(args.clients)  # every client may queue once
+
+    import db  # after env overrides
+    from services import auth
+
+    # Measuring throughput, not the burst limiter
+    auth.USER_LIMIT = auth.IP_LIMIT = (10 ** 9, 60)
+
+    db.init_db()
+    users = [f"bench{i}" for i in range(args.users)]
+    for name in users:
+        db.create_user(name, "Health Agent", "pw-" + name)
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(args.clients)
+
+    def client(idx):
+        start.wait()
+        mine = []
+        for n in range(args.logins):
+            name = users[(idx + n) % len(users)]
+            t0 = time.perf_counter()
+            user, error = auth.login(name, "pw-" + name, ip=f"10.0.0.{idx}")
+            mine.append(time.perf_counter() - t0)
+            if error:
+                with lock:
+                    errors.append(error)
+        with lock:
+            latencies.extend(mine)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    browser = auth.client_key("10.0.0.1", "bench")
+    token = auth.issue_token(auth.login(users[0], "pw-" + users[0])[0], browser)
+    refresh = []
+    for _ in range(200):
+        t1 = time.perf_counter()
+        assert auth.user_from_token(token, browser)
+        refresh.append(time.perf_counter() - t1)
+
+    total = len(latencies)
+    print(f"Hash workers         : {auth.AUTH_WORKERS}")
+    print(f"Clients x logins     : {args.clients} x {args.logins} = {total}")
+    print(f"Throughput           : {total / wall:.1f} logins/s")
+    print(f"Login latency p50    : {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"Login latency p95    : {_pct(latencies, 95) * 1000:.1f} ms")
+    print(f"Errors               : {len(errors)} {sorted(set(errors)) or ''}")
+    print(f"Refresh (token) p95  : {_pct(refresh, 95) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# benchmarks/bench_search.py
+"""
+Patient search: the FTS5 index (services.patients, migration 0008) against the
+approaches it replaced, on a generated database (default 50k patients).
+
+  pandas_apply   old Patients_Search: load every patient + latest readings, then
+                 df.apply(lambda r: q in str(r.values).lower(), axis=1)
+  python_scan    old Health Profiles: load every patient, substring test per row
+  like_page      LIKE '%q%' on name / mobile / aadhar, one keyset page
+  fts_page       page_patients(search=q): FTS5 token-prefix match, one keyset page
+
+Matches differ by design (substring vs start-of-word), so the match count is
+printed next to each timing.
+
+Usage (from project root):
+> python benchmarks/bench_search.py
+> python benchmarks/bench_search.py --patients 100000 --repeat 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_dashboards import _ensure_db, _pct
+
+PAGE = 100
+
+_FULL_SQL = """
+    SELECT p.id, p.name, p.age, p.gender, p.mobile, p.aadhar, p.activity_level, p.village,
+           l.bp_sys, l.bp_dia, l.pulse, l.sugar_value AS sugar, l.sugar_type, l.fbs_value AS fbs
+    FROM patients p
+    LEFT JOIN patient_latest l ON l.patient_id = p.id
+    ORDER BY p.name COLLATE NOCASE
+"""
+
+_LIKE_SQL = """
+    SELECT p.id, p.name FROM patients p
+    WHERE p.name LIKE ? OR COALESCE(p.mobile, p.phone) LIKE ? OR p.aadhar LIKE ?
+    ORDER BY p.name COLLATE NOCASE, p.id LIMIT ?
+"""
+
+
+def _queries(conn):
+    """Typical things typed into the search box, taken from the data so they match."""
+    name, village, mobile, aadhar = conn.execute(
+        "SELECT name, village, mobile, aadhar FROM patients ORDER BY id LIMIT 1 OFFSET 4242"
+    ).fetchone()
+    first = name.split()[0]
+    return {
+        "short prefix": first[:2].lower(),
+        "first name": first,
+        "full name": name,
+        "village": village,
+        "mobile prefix": mobile[:6],
+        "aadhar": aadhar,
+        "no match": "zzqx",
+    }
+
+
+def approaches():
+    import pandas as pd
+    from db import connection
+    from services import patients
+
+    def pandas_apply(q):
+        with connection() as conn:
+            rows = conn.execute(_FULL_SQL).fetchall()
+        df = pd.DataFrame([tuple(r) for r in rows])
+        ql = q.lower()
+        return df[df.apply(lambda r: ql in str(r.values).lower(), axis=1)]
+
+    def python_scan(q):
+        with connection() as conn:
+            rows = conn.execute(_FULL_SQL).fetchall()
+        ql = q.lower()
+        return [r for r in rows if ql in f"{r['name']} {r['mobile'] or ''} {r['aadhar'] or ''}".lower()]
+
+    def like_page(q):
+        like = f"%{q}%"
+        with connection() as conn:
+            return conn.execute(_LIKE_SQL, (like, like, like, PAGE)).fetchall()
+
+    def fts_page(q):
+        return patients.page_patients(order="name", search=q, limit=PAGE)[0]
+
+    return {"pandas_apply": pandas_apply, "python_scan": python_scan, "like_page": like_page, "fts_page": fts_page}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--patients", type=int, default=50_000)
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "hospital_bench"))
+    args = ap.parse_args()
+
+    path = _ensure_db(args.data_dir, args.patients)
+    import db
+
+    db.DEFAULT_DB_PATH = path
+    with db.connection() as conn:
+        queries = _queries(conn)
+    fns = approaches()
+
+    print(f"== {args.patients:,} patients ({os.path.basename(path)}), p50 / p95 ms (matches) ==")
+    print(f"  {'query':<16}" + "".join(f"{name:>28}" for name in fns))
+    for label, q in queries.items():
+        cells = []
+        for fn in fns.values():
+            fn(q)   # warm-up
+            times = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                out = fn(q)
+                times.append((time.perf_counter() - t0) * 1000)
+            cells.append(f"{statistics.median(times):.2f} / {_pct(times, 95):.2f} ({len(out)})")
+        print(f"  {label:<16}" + "".join(f"{c:>28}" for c in cells))
+    print(f"\n  like_page / fts_page return at most {PAGE} rows (one page).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,652 @@
+import gc
+import importlib.util
+import json
+import logging
 import os
+import re
 import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
 from pathlib import Path
 
 # Always resolve relative to this file's location (project root)
 BASE_DIR = Path(__file__).resolve().parent
 DEFAULT_DB_PATH = os.environ.get("HOSPITAL_DB_PATH", str(BASE_DIR / "data" / "hospital.db"))
 
+# Pool tuning (per database file). POOL_SIZE=0 disables pooling (one connection per call).
+POOL_SIZE = int(os.environ.get("HOSPITAL_DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.environ.get("HOSPITAL_DB_POOL_TIMEOUT", "10"))
+# Idle connections older than this get a "SELECT 1" before being handed out again.
+HEALTH_CHECK_AFTER = float(os.environ.get("HOSPITAL_DB_HEALTH_CHECK_SECS", "30"))
+# Time every statement (SQL, parameter shape, duration, rows, caller) per rerun; HOSPITAL_DB_TRACE=0 turns it off.
+TRACE_QUERIES = os.environ.get("HOSPITAL_DB_TRACE", "1") == "1"
+# Statements slower than this (execute + fetch) go to the slow-query log with their query plan; 0 disables.
+SLOW_QUERY_MS = float(os.environ.get("HOSPITAL_DB_SLOW_MS", "200"))
+SLOW_QUERY_LOG = os.environ.get("HOSPITAL_DB_SLOW_LOG", str(BASE_DIR / "logs" / "slow_queries.log"))
+SLOW_QUERY_LOG_BYTES = 1_000_000
+SLOW_QUERY_LOG_BACKUPS = 5
+# Statements kept per session for the Management "Diagnostics" tab
+STATEMENT_HISTORY = 200
+
 def _ensure_parent_dir(db_path: str):
     p = Path(db_path).expanduser().resolve()
     p.parent.mkdir(parents=True, exist_ok=True)
     return str(p)
 
+
+# =========================
+# Query tracing
+# =========================
+class TracingCursor(sqlite3.Cursor):
+    """
+    Cursor that records every statement it runs (see rerun_stats / query_totals).
+    A statement's time is execute + all fetches; it is closed off when its rows run
+    out, the cursor runs another statement, or the cursor is closed / collected.
+    """
+
+    _stmt = None      # record of the statement whose rows are being fetched
+    _sql = None       # its SQL and parameters as run (only kept for EXPLAIN, never logged)
+    _params = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        stmt = _begin_statement(sql, _param_shape(parameters))
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._executed(stmt, sql, parameters, time.perf_counter() - t0)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        if isinstance(seq_of_parameters, (list, tuple)):
+            first = seq_of_parameters[0] if seq_of_parameters else ()
+            shape = f"{len(seq_of_parameters)} x {_param_shape(first)}"
+        else:
+            first, shape = None, "many (iterator)"
+        stmt = _begin_statement(sql, shape)
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._executed(stmt, sql, first, time.perf_counter() - t0)
+
+    def _executed(self, stmt, sql, parameters, elapsed):
+        self._stmt, self._sql, self._params = stmt, sql, parameters
+        _record_rows(stmt, 0, elapsed)
+        if self.description is None:   # DDL / DML: nothing to fetch, report affected rows
+            stmt["rows"] = max(self.rowcount, 0)
+            self._finish()
+
+    def _fetched(self, n, elapsed, exhausted):
+        if self._stmt is not None:
+            _record_rows(self._stmt, n, elapsed)
+        if exhausted:
+            self._finish()
+
+    def _finish(self):
+        stmt, sql, params = self._stmt, self._sql, self._params
+        if stmt is None:
+            return
+        self._stmt = self._sql = self._params = None
+        if 0 < SLOW_QUERY_MS <= stmt["ms"]:
+            pool = getattr(self.connection, "_pool", None)
+            _log_slow_query(stmt, sql, params, pool.db_path if pool is not None else None)
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(0 if row is None else 1, time.perf_counter() - t0, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        t0 = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(len(rows), time.perf_counter() - t0, len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(len(rows), time.perf_counter() - t0, True)
+        return rows
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(0, time.perf_counter() - t0, True)
+            raise
+        self._fetched(1, time.perf_counter() - t0, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+def _param_shape(parameters) -> str:
+    """Types only, e.g. "(int, str)" or "{pid: int}"; values (patient data) never leave the process."""
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    try:
+        return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+    except TypeError:
+        return type(parameters).__name__
+
+
+_SITE_PACKAGES = os.sep + "site-packages" + os.sep
+
+def _caller() -> str:
+    """Innermost frame in this project (outside the tracing plumbing) that ran the statement."""
+    root = str(BASE_DIR) + os.sep
+    frame = sys._getframe(2)   # skip _caller and _begin_statement
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if (filename.startswith(root) and _SITE_PACKAGES not in filename
+                and code not in _TRACE_CODES):
+            return f"{os.path.relpath(filename, BASE_DIR)}:{frame.f_lineno} {code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+# =========================
+# Slow-query log
+# =========================
+_slow_logger = None
+_slow_logger_lock = threading.Lock()
+
+def _slow_query_logger() -> logging.Logger:
+    global _slow_logger
+    with _slow_logger_lock:
+        if _slow_logger is None:
+            logger = logging.getLogger("hospital.slow_sql")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            if not logger.handlers:
+                Path(SLOW_QUERY_LOG).parent.mkdir(parents=True, exist_ok=True)
+                handler = RotatingFileHandler(SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_BYTES,
+                                              backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+            _slow_logger = logger
+    return _slow_logger
+
+def _explain(db_path: str, sql: str, parameters) -> list:
+    """EXPLAIN QUERY PLAN lines (indented by depth), on a private read-only connection:
+    the traced one may already be back in the pool and in use by another thread."""
+    if not db_path or parameters is None:
+        return []
+    try:
+        conn = sqlite3.connect(Path(db_path).as_uri() + "?mode=ro", uri=True, timeout=1)
+        try:
+            rows = conn.execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+    depth, lines = {0: -1}, []
+    for node_id, parent, _unused, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+def _log_slow_query(stmt: dict, sql: str, parameters, db_path: str):
+    entry = {
+        "at": datetime.fromtimestamp(stmt["at"]).isoformat(timespec="seconds"),
+        "ms": round(stmt["ms"], 1),
+        "rows": stmt["rows"],
+        "caller": stmt["caller"],
+        "sql": stmt["sql"],
+        "params": stmt["params"],
+        "plan": _explain(db_path, sql, parameters),
+    }
+    try:
+        _slow_query_logger().info(json.dumps(entry))
+    except Exception:
+        pass   # diagnostics must never break a render
+
+def slow_queries(limit: int = 50) -> list:
+    """Most recent entries of the slow-query log (newest first)."""
+    try:
+        with open(SLOW_QUERY_LOG, encoding="utf-8") as f:
+            lines = f.readlines()[-limit:]
+    except OSError:
+        return []
+    entries = []
+    for line in reversed(lines):
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
+
+
+# =========================
+# Connection pool
+# =========================
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool instead of closing."""
+
+    _pool = None
+    _checked_out = False
+    _idle_since = 0.0
+
+    # conn.execute() normally builds a plain C cursor; route it through cursor() when tracing
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = TracingCursor if TRACE_QUERIES else sqlite3.Cursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        if TRACE_QUERIES:
+            return self.cursor().execute(sql, parameters)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if TRACE_QUERIES:
+            return self.cursor().executemany(sql, seq_of_parameters)
+        return super().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        pool = self._pool
+        if pool is None:
+            super().close()
+        elif self._checked_out:
+            self._checked_out = False
+            pool.release(self)
+        # else: already back in the pool; a second close() is a no-op
+
+    def discard(self):
+        """Really close the underlying connection (it is never reused)."""
+        self._pool = None
+        try:
+            super().close()
+        except sqlite3.Error:
+            pass
+
+
+# Frames _caller() looks past when attributing a statement
+_TRACE_CODES = {
+    TracingCursor.execute.__code__, TracingCursor.executemany.__code__,
+    PooledConnection.execute.__code__, PooledConnection.executemany.__code__,
+}
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of sqlite3 connections to one database file.
+
+    - At most `max_size` physical connections are open at once; callers wait up to
+      `timeout` seconds for one to come back before getting sqlite3.OperationalError.
+    - PRAGMAs are applied once per physical connection, not once per query.
+    - Connections that were never closed (leaked) give their slot back when garbage collected.
+    """
+
+    def __init__(self, db_path: str, max_size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._open = 0
+        self._cond = threading.Condition(threading.RLock())
+        self.opened_total = 0
+        self.checkouts_total = 0
+        self.discarded_total = 0
+
+    def _connect(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.db_path,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            check_same_thread=False,
+            factory=PooledConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON;")
+        weakref.finalize(conn, self._slot_freed)
+        return conn
+
+    def _slot_freed(self):
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def _healthy(self, conn: PooledConnection) -> bool:
+        if time.monotonic() - conn._idle_since < HEALTH_CHECK_AFTER:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self) -> PooledConnection:
+        deadline = time.monotonic() + self.timeout
+        opened = collected = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    if not self._healthy(conn):
+                        self.discarded_total += 1
+                        conn.discard()
+                        continue
+                    break
+                if self.max_size <= 0 or self._open < self.max_size:
+                    self._open += 1
+                    try:
+                        conn = self._connect()
+                    except Exception:
+                        self._open -= 1
+                        raise
+                    self.opened_total += 1
+                    opened = True
+                    break
+                if not collected:
+                    # Leaked (never closed) connections sit in reference cycles; reclaim their slots.
+                    collected = True
+                    gc.collect()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"connection pool exhausted ({self.max_size} in use) for {self.db_path}"
+                    )
+                self._cond.wait(remaining)
+            self.checkouts_total += 1
+        conn._pool = self
+        conn._checked_out = True
+        _record_checkout(opened)
+        return conn
+
+    def release(self, conn: PooledConnection):
+        # Never hand out a connection with someone else's half-finished transaction.
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            self.discarded_total += 1
+            conn.discard()
+            return
+        if self.max_size <= 0:
+            conn.discard()
+            return
+        conn._idle_since = time.monotonic()
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "db_path": self.db_path,
+                "max_size": self.max_size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "opened_total": self.opened_total,
+                "checkouts_total": self.checkouts_total,
+                "discarded_total": self.discarded_total,
+            }
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.discard()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path: str = None) -> ConnectionPool:
+    """Return the (process-wide) pool for a database file, creating it on first use."""
+    path = _ensure_parent_dir(db_path or DEFAULT_DB_PATH)
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = _pools[path] = ConnectionPool(path)
+    return pool
+
+
+# -----------------------------
+# Per-rerun connection counters
+# -----------------------------
+# Keyed by Streamlit session id (or thread id outside Streamlit); reset by begin_rerun().
+_MAX_TRACKED_RUNS = 1000
+_rerun_stats = OrderedDict()
+_previous_run_stats = OrderedDict()   # the session's last complete run, for the Diagnostics tab
+_rerun_lock = threading.Lock()
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except Exception:
+    get_script_run_ctx = None
+
+def _run_key():
+    if get_script_run_ctx is not None:
+        try:
+            try:
+                ctx = get_script_run_ctx(suppress_warning=True)
+            except TypeError:   # older Streamlit
+                ctx = get_script_run_ctx()
+            if ctx is not None:
+                return ctx.session_id
+        except Exception:
+            pass
+    return threading.get_ident()
+
+def _new_run_stats() -> dict:
+    return {"started": time.time(), "checkouts": 0, "opened": 0, "queries": 0, "rows": 0, "sql_ms": 0.0,
+            "statements": deque(maxlen=STATEMENT_HISTORY)}
+
+def _record_checkout(opened: bool):
+    key = _run_key()
+    with _rerun_lock:
+        stats = _run_stats_locked(key)
+        stats["checkouts"] += 1
+        if opened:
+            stats["opened"] += 1
+
+# Process-wide totals (only move while TRACE_QUERIES is on)
+_query_totals = {"queries": 0, "rows": 0, "sql_ms": 0.0}
+
+def _run_stats_locked(key):
+    stats = _rerun_stats.get(key)
+    if stats is None:
+        stats = _rerun_stats[key] = _new_run_stats()
+    return stats
+
+def _begin_statement(sql: str, params: str) -> dict:
+    stmt = {"at": time.time(), "sql": " ".join(sql.split()), "params": params,
+            "ms": 0.0, "rows": 0, "caller": _caller()}
+    key = _run_key()
+    with _rerun_lock:
+        stats = _run_stats_locked(key)
+        stats["statements"].append(stmt)
+        stats["queries"] += 1
+        _query_totals["queries"] += 1
+    return stmt
+
+def _record_rows(stmt: dict, n: int, elapsed: float):
+    ms = elapsed * 1000
+    key = _run_key()
+    with _rerun_lock:
+        stmt["rows"] += n
+        stmt["ms"] += ms
+        for stats in (_query_totals, _run_stats_locked(key)):
+            stats["rows"] += n
+            stats["sql_ms"] += ms
+
+def set_query_tracing(enabled: bool = True):
+    """Turn statement recording on or off for all pooled connections (new cursors)."""
+    global TRACE_QUERIES
+    TRACE_QUERIES = bool(enabled)
+
+def query_totals() -> dict:
+    """Statements, rows fetched and SQL milliseconds since the process started tracing."""
+    with _rerun_lock:
+        return dict(_query_totals)
+
+def begin_rerun():
+    """Reset the connection counters for the current session; call at the top of every script run."""
+    key = _run_key()
+    with _rerun_lock:
+        previous = _rerun_stats.get(key)
+        if previous is not None:
+            _previous_run_stats[key] = previous
+            _previous_run_stats.move_to_end(key)
+        _rerun_stats[key] = _new_run_stats()
+        _rerun_stats.move_to_end(key)
+        for runs in (_rerun_stats, _previous_run_stats):
+            while len(runs) > _MAX_TRACKED_RUNS:
+                runs.popitem(last=False)
+
+def _copy_stats(stats: dict) -> dict:
+    out = dict(stats or _new_run_stats())
+    out["statements"] = [dict(s) for s in out["statements"]]
+    return out
+
+def rerun_stats() -> dict:
+    """Connection (and, when tracing, per-statement) counters for the current session's run so far."""
+    with _rerun_lock:
+        return _copy_stats(_rerun_stats.get(_run_key()))
+
+def previous_rerun_stats() -> dict:
+    """Same as rerun_stats(), for the current session's previous (complete) run."""
+    with _rerun_lock:
+        return _copy_stats(_previous_run_stats.get(_run_key()))
+
+
 def get_connection():
-    db_path = _ensure_parent_dir(DEFAULT_DB_PATH)
-    conn = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
+    """Check a connection out of the pool; conn.close() returns it."""
+    return get_pool().acquire()
+
+@contextmanager
+def connection(db_path: str = None):
+    """
+    with connection() as conn: ...
+    Commits on success, rolls back on error, and always returns the connection to the pool.
+    """
+    conn = get_pool(db_path).acquire()
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
 
 def get_db_path() -> str:
     return _ensure_parent_dir(DEFAULT_DB_PATH)
 
-#Vitals table
-#ALTER TABLE vitals ADD COLUMN sent_to_doctor INTEGER NOT NULL DEFAULT 0;
-#CREATE INDEX IF NOT EXISTS idx_vitals_sent ON vitals (sent_to_doctor);
 
-#Sugar table 
-#-- add a frequency_days column for follow-up (default 0 = no follow-up)
-#ALTER TABLE blood_sugar_tests
-#ADD COLUMN IF NOT EXISTS frequency_days INTEGER DEFAULT 0;
+# =========================
+# Schema migrations
+# =========================
+# Numbered files in migrations/ (0001_baseline.py, ...), each exposing upgrade(conn).
+# They run once at deploy time via `python tools/migrate.py`; renders only check the version.
+MIGRATIONS_DIR = BASE_DIR / "migrations"
+_MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.py$")
+_current_schemas = set()
+
+def migration_files() -> list:
+    """[(version, name, path), ...] sorted by version."""
+    found = []
+    for p in MIGRATIONS_DIR.glob("*.py"):
+        m = _MIGRATION_FILE.match(p.name)
+        if m:
+            found.append((int(m.group(1)), m.group(2), p))
+    return sorted(found)
+
+def _load_migration(path: Path):
+    spec = importlib.util.spec_from_file_location(f"migrations.m{path.stem}", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+def schema_version(conn) -> int:
+    row = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name='schema_version'"
+    ).fetchone()
+    if not row:
+        return 0
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def migrate(db_path: str = None, target: int = None, log=print) -> list:
+    """
+    Apply pending migrations (up to `target`, default all), each in its own transaction.
+    Returns the versions applied. Migration upgrade(conn) functions must not commit.
+    """
+    path = _ensure_parent_dir(db_path or DEFAULT_DB_PATH)
+    conn = sqlite3.connect(path, isolation_level=None)
+    applied = []
+    try:
+        # Table rebuilds (DROP + RENAME) must not trip foreign keys mid-migration.
+        conn.execute("PRAGMA foreign_keys = OFF")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TEXT NOT NULL
+            )
+        """)
+        current = schema_version(conn)
+        for version, name, mpath in migration_files():
+            if version <= current or (target is not None and version > target):
+                continue
+            mod = _load_migration(mpath)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                mod.upgrade(conn)
+                conn.execute(
+                    "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                    (version, name, datetime.utcnow().isoformat()),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            applied.append(version)
+            if log:
+                log(f"applied {version:04d}_{name}")
+    finally:
+        conn.close()
+    _current_schemas.discard(path)
+    return applied
 
+def schema_is_current(db_path: str = None) -> bool:
+    """True once the database has every migration applied (checked once per process)."""
+    path = _ensure_parent_dir(db_path or DEFAULT_DB_PATH)
+    if path in _current_schemas:
+        return True
+    latest = max((v for v, _, _ in migration_files()), default=0)
+    conn = get_pool(path).acquire()
+    try:
+        ok = schema_version(conn) >= latest
+    finally:
+        conn.close()
+    if ok:
+        _current_schemas.add(path)
+    return ok
 
 
 # modules/auth/db.py
@@ -40,27 +657,14 @@ import binascii
 from datetime import datetime
 from typing import Optional, Tuple
 
-DEFAULT_DB = os.path.join(os.path.dirname(__file__), "data", "hospital.db")
+DEFAULT_DB = DEFAULT_DB_PATH  # honours HOSPITAL_DB_PATH like the pool
 
 def get_conn(db_path: str = DEFAULT_DB):
-    return sqlite3.connect(db_path, check_same_thread=False)
+    return get_pool(db_path).acquire()
 
 def init_db(db_path: str = DEFAULT_DB):
-    conn = get_conn(db_path)
-    cur = conn.cursor()
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        name TEXT,
-        role TEXT NOT NULL,
-        salt TEXT NOT NULL,
-        password_hash TEXT NOT NULL,
-        created_at TEXT
-    )
-    """)
-    conn.commit()
-    conn.close()
+    """Bring the schema up to date (for scripts; the app relies on tools/migrate.py)."""
+    migrate(db_path, log=None)
 
 def _hash_password(password: str, salt: bytes, iterations: int = 200_000) -> str:
     # PBKDF2-HMAC-SHA256
@@ -91,7 +695,6 @@ def create_user(username: str, role: str, password: str, name: Optional[str] = N
     return True
 
 def get_user_by_username(username: str, db_path: str = DEFAULT_DB) -> Optional[dict]:
-    init_db(db_path)
     conn = get_conn(db_path)
     cur = conn.cursor()
     cur.execute("SELECT id, username, name, role, salt, password_hash, created_at FROM users WHERE username = ?", (username,))
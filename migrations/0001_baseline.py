@@ -0,0 +1,176 @@
+# migrations/0001_baseline.py
+"""
+Baseline schema: every table the dashboards used to create on the fly
+(_ensure_tables, _ensure_*_columns, _ensure_*_table, init_db).
+
+Idempotent on an existing data/hospital.db: tables are created only if missing
+and columns that older databases lack are added.
+"""
+
+TABLES = {
+    "users": """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            name TEXT,
+            role TEXT NOT NULL,
+            salt TEXT NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TEXT
+        )
+    """,
+    "patients": """
+        CREATE TABLE IF NOT EXISTS patients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL, age INTEGER, gender TEXT, phone TEXT,
+            father_name TEXT, mobile TEXT, aadhar TEXT, address TEXT, photo_path TEXT,
+            diet TEXT, breakfast TEXT, lunch TEXT, dinner TEXT,
+            tobacco TEXT, alcohol TEXT, activity_level TEXT, family_history TEXT,
+            village TEXT
+        )
+    """,
+    "vitals": """
+        CREATE TABLE IF NOT EXISTS vitals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fk_patient_id INTEGER NOT NULL,
+            recorded_at TEXT NOT NULL,
+            bp_sys INTEGER, bp_dia INTEGER, pulse INTEGER, temperature REAL,
+            resp_rate INTEGER, spo2 INTEGER, height_cm REAL, weight_kg REAL, bmi REAL,
+            notes TEXT, recorded_by INTEGER, waist_cm REAL,
+            sent_to_doctor INTEGER NOT NULL DEFAULT 0, frequency_days INTEGER,
+            FOREIGN KEY (fk_patient_id) REFERENCES patients(id)
+        )
+    """,
+    "lab_orders": """
+        CREATE TABLE IF NOT EXISTS lab_orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fk_patient_id INTEGER NOT NULL,
+            ordered_at TEXT NOT NULL,
+            test_name TEXT NOT NULL, priority TEXT, notes TEXT,
+            ordered_by INTEGER, status TEXT DEFAULT 'Pending',
+            FOREIGN KEY (fk_patient_id) REFERENCES patients(id)
+        )
+    """,
+    "stock": """
+        CREATE TABLE IF NOT EXISTS stock (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_name TEXT NOT NULL UNIQUE,
+            category TEXT, qty INTEGER DEFAULT 0, unit TEXT DEFAULT 'pcs',
+            last_updated TEXT
+        )
+    """,
+    "blood_sugar_tests": """
+        CREATE TABLE IF NOT EXISTS blood_sugar_tests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fk_patient_id INTEGER NOT NULL,
+            test_type TEXT NOT NULL,                 -- RBS/FBS/PPBS/HbA1c
+            result_mg_dl REAL,                       -- mg/dL or % for HbA1c
+            last_meal_time TEXT,
+            history TEXT,
+            symptoms TEXT,
+            notes TEXT,
+            sent_to_doctor INTEGER DEFAULT 0,        -- 0/1
+            taken_at TEXT NOT NULL,
+            recorded_by INTEGER,
+            frequency_days INTEGER,
+            FOREIGN KEY (fk_patient_id) REFERENCES patients(id)
+        )
+    """,
+    "stock_requests": """
+        CREATE TABLE IF NOT EXISTS stock_requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_name TEXT NOT NULL,
+            qty INTEGER NOT NULL CHECK(qty >= 0),
+            requested_by INTEGER,
+            requested_at TEXT NOT NULL,
+            status TEXT DEFAULT 'Pending'   -- Pending / Approved / Rejected
+        )
+    """,
+    "rmp_users": """
+        CREATE TABLE IF NOT EXISTS rmp_users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            mobile TEXT,
+            aadhar TEXT,
+            address TEXT,
+            photo_path TEXT,
+            specialization TEXT,
+            notes TEXT
+        )
+    """,
+    "medications": """
+        CREATE TABLE IF NOT EXISTS medications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_id INTEGER NOT NULL,
+            drug_name TEXT NOT NULL,
+            dose TEXT,
+            frequency TEXT,
+            duration TEXT,
+            referral_facility TEXT,
+            follow_up_days INTEGER,
+            reason TEXT,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(patient_id) REFERENCES patients(id)
+        )
+    """,
+    "doctor_advice": """
+        CREATE TABLE IF NOT EXISTS doctor_advice (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_id INTEGER NOT NULL,
+            advice TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(patient_id) REFERENCES patients(id)
+        )
+    """,
+    "messages": """
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_role TEXT NOT NULL,   -- 'RMP', 'Doctor', 'Admin', 'System'
+            recipient_role TEXT NOT NULL,
+            message TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    """,
+    "pharmacy": """
+        CREATE TABLE IF NOT EXISTS pharmacy (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            drug_name TEXT NOT NULL,
+            supplied INTEGER DEFAULT 0,
+            distributed INTEGER DEFAULT 0,
+            amount_due REAL DEFAULT 0.0,
+            amount_collected REAL DEFAULT 0.0
+        )
+    """,
+}
+
+# Columns added over time by _ensure_patient_columns / _ensure_vitals_columns /
+# _ensure_followup_columns; older databases may still be missing some of them.
+COLUMNS = {
+    "patients": {
+        "father_name": "TEXT", "mobile": "TEXT", "aadhar": "TEXT", "address": "TEXT",
+        "village": "TEXT", "photo_path": "TEXT", "diet": "TEXT", "breakfast": "TEXT",
+        "lunch": "TEXT", "dinner": "TEXT", "tobacco": "TEXT", "alcohol": "TEXT",
+        "activity_level": "TEXT", "family_history": "TEXT",
+    },
+    "vitals": {
+        "waist_cm": "REAL",
+        "sent_to_doctor": "INTEGER NOT NULL DEFAULT 0",
+        "frequency_days": "INTEGER",
+    },
+    "blood_sugar_tests": {
+        "frequency_days": "INTEGER",
+    },
+}
+
+
+def upgrade(conn):
+    for ddl in TABLES.values():
+        conn.execute(ddl)
+
+    for table, columns in COLUMNS.items():
+        existing = {row[1].lower() for row in conn.execute(f"PRAGMA table_info({table})")}
+        for col, sqltype in columns.items():
+            if col not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {sqltype}")
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vitals_sent ON vitals (sent_to_doctor)")
@@ -0,0 +1,43 @@
+# migrations/0002_drop_stray_sugar_column.py
+"""
+Drop the stray column literally named "INTEGER" from blood_sugar_tests.
+
+An old `ALTER TABLE blood_sugar_tests ADD COLUMN IF NOT EXISTS frequency_days INTEGER DEFAULT 0`
+was parsed by SQLite as a column called INTEGER. The table is rebuilt (works on any
+SQLite version, unlike ALTER TABLE DROP COLUMN) keeping ids and every real column.
+"""
+
+NEW_TABLE = """
+    CREATE TABLE blood_sugar_tests_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        fk_patient_id INTEGER NOT NULL,
+        test_type TEXT NOT NULL,                 -- RBS/FBS/PPBS/HbA1c
+        result_mg_dl REAL,                       -- mg/dL or % for HbA1c
+        last_meal_time TEXT,
+        history TEXT,
+        symptoms TEXT,
+        notes TEXT,
+        sent_to_doctor INTEGER DEFAULT 0,        -- 0/1
+        taken_at TEXT NOT NULL,
+        recorded_by INTEGER,
+        frequency_days INTEGER,
+        FOREIGN KEY (fk_patient_id) REFERENCES patients(id)
+    )
+"""
+
+COLUMNS = [
+    "id", "fk_patient_id", "test_type", "result_mg_dl", "last_meal_time", "history",
+    "symptoms", "notes", "sent_to_doctor", "taken_at", "recorded_by", "frequency_days",
+]
+
+
+def upgrade(conn):
+    existing = [row[1] for row in conn.execute("PRAGMA table_info(blood_sugar_tests)")]
+    if "INTEGER" not in existing:
+        return
+
+    cols = ", ".join(COLUMNS)
+    conn.execute(NEW_TABLE)
+    conn.execute(f"INSERT INTO blood_sugar_tests_new ({cols}) SELECT {cols} FROM blood_sugar_tests")
+    conn.execute("DROP TABLE blood_sugar_tests")
+    conn.execute("ALTER TABLE blood_sugar_tests_new RENAME TO blood_sugar_tests")
@@ -0,0 +1,26 @@
+# migrations/0003_time_series_indexes.py
+"""
+Managed index set for the per-patient time-series lookups.
+
+Latest vitals / latest sugar (optionally by test_type) and full-history reads all
+filter on the patient first and order by time; the trailing rowid in every SQLite
+index covers the `, id DESC` tie-breakers. tools/index_advisor.py checks these
+indexes are actually picked for the registered hot queries.
+"""
+
+INDEXES = {
+    "idx_vitals_patient_recorded": "vitals (fk_patient_id, recorded_at)",
+    "idx_sugar_patient_taken": "blood_sugar_tests (fk_patient_id, taken_at)",
+    "idx_sugar_patient_type_taken": "blood_sugar_tests (fk_patient_id, test_type, taken_at)",
+    "idx_sugar_sent": "blood_sugar_tests (sent_to_doctor)",
+    "idx_patients_village": "patients (village)",
+    "idx_medications_patient": "medications (patient_id)",
+    "idx_doctor_advice_patient": "doctor_advice (patient_id)",
+    "idx_stock_requests_requested_by": "stock_requests (requested_by)",
+    "idx_lab_orders_status": "lab_orders (status)",
+}
+
+
+def upgrade(conn):
+    for name, target in INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
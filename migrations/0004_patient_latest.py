@@ -0,0 +1,119 @@
+# migrations/0004_patient_latest.py
+"""
+patient_latest: one row per patient with the latest vitals and latest sugar
+reading (overall and per test type), kept current by triggers on vitals and
+blood_sugar_tests so screens read it with a single indexed join.
+
+"Latest" uses the same ordering the screens used: recorded_at/taken_at DESC, id DESC.
+Each trigger re-derives the affected patient's columns from the 0003 indexes,
+so out-of-order inserts, edits and deletes stay correct.
+"""
+
+SUGAR_TYPES = {"FBS": "fbs", "PPBS": "ppbs", "RBS": "rbs", "HbA1c": "hba1c"}
+
+TABLE = """
+    CREATE TABLE IF NOT EXISTS patient_latest (
+        patient_id INTEGER PRIMARY KEY,
+        vitals_id INTEGER, vitals_at TEXT,
+        bp_sys INTEGER, bp_dia INTEGER, pulse INTEGER, temperature REAL,
+        sugar_id INTEGER, sugar_at TEXT, sugar_type TEXT, sugar_value REAL,
+        fbs_value REAL, fbs_at TEXT,
+        ppbs_value REAL, ppbs_at TEXT,
+        rbs_value REAL, rbs_at TEXT,
+        hba1c_value REAL, hba1c_at TEXT
+    )
+"""
+
+
+def _ensure_row(pid):
+    return f"INSERT OR IGNORE INTO patient_latest (patient_id) VALUES ({pid});"
+
+
+def _refresh_vitals(pid):
+    return f"""
+        UPDATE patient_latest
+        SET (vitals_id, vitals_at, bp_sys, bp_dia, pulse, temperature) = (
+            SELECT id, recorded_at, bp_sys, bp_dia, pulse, temperature
+            FROM vitals WHERE fk_patient_id = {pid}
+            ORDER BY recorded_at DESC, id DESC LIMIT 1)
+        WHERE patient_id = {pid};"""
+
+
+def _refresh_sugar(pid, test_type=None):
+    stmts = [f"""
+        UPDATE patient_latest
+        SET (sugar_id, sugar_at, sugar_type, sugar_value) = (
+            SELECT id, taken_at, test_type, result_mg_dl
+            FROM blood_sugar_tests WHERE fk_patient_id = {pid}
+            ORDER BY taken_at DESC, id DESC LIMIT 1)
+        WHERE patient_id = {pid};"""]
+    for ttype, col in SUGAR_TYPES.items():
+        only_if = f" AND {test_type} = '{ttype}'" if test_type else ""
+        stmts.append(f"""
+        UPDATE patient_latest
+        SET ({col}_value, {col}_at) = (
+            SELECT result_mg_dl, taken_at
+            FROM blood_sugar_tests WHERE fk_patient_id = {pid} AND test_type = '{ttype}'
+            ORDER BY taken_at DESC, id DESC LIMIT 1)
+        WHERE patient_id = {pid}{only_if};""")
+    return "".join(stmts)
+
+
+TRIGGERS = {
+    "trg_vitals_latest_ins": f"""
+        AFTER INSERT ON vitals BEGIN
+            {_ensure_row("NEW.fk_patient_id")}
+            {_refresh_vitals("NEW.fk_patient_id")}
+        END""",
+    "trg_vitals_latest_upd": f"""
+        AFTER UPDATE OF fk_patient_id, recorded_at, bp_sys, bp_dia, pulse, temperature ON vitals BEGIN
+            {_ensure_row("NEW.fk_patient_id")}
+            {_refresh_vitals("OLD.fk_patient_id")}
+            {_refresh_vitals("NEW.fk_patient_id")}
+        END""",
+    "trg_vitals_latest_del": f"""
+        AFTER DELETE ON vitals BEGIN
+            {_refresh_vitals("OLD.fk_patient_id")}
+        END""",
+    "trg_sugar_latest_ins": f"""
+        AFTER INSERT ON blood_sugar_tests BEGIN
+            {_ensure_row("NEW.fk_patient_id")}
+            {_refresh_sugar("NEW.fk_patient_id", "NEW.test_type")}
+        END""",
+    "trg_sugar_latest_upd": f"""
+        AFTER UPDATE OF fk_patient_id, test_type, result_mg_dl, taken_at ON blood_sugar_tests BEGIN
+            {_ensure_row("NEW.fk_patient_id")}
+            {_refresh_sugar("OLD.fk_patient_id")}
+            {_refresh_sugar("NEW.fk_patient_id")}
+        END""",
+    "trg_sugar_latest_del": f"""
+        AFTER DELETE ON blood_sugar_tests BEGIN
+            {_refresh_sugar("OLD.fk_patient_id", "OLD.test_type")}
+        END""",
+    "trg_patients_latest_del": """
+        AFTER DELETE ON patients BEGIN
+            DELETE FROM patient_latest WHERE patient_id = OLD.id;
+        END""",
+}
+
+
+def upgrade(conn):
+    conn.execute(TABLE)
+    for name, body in TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {body}")
+
+    # Screens list patients by name; keep that ordering index-driven
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_patients_name_nocase ON patients (name COLLATE NOCASE)")
+
+    # Backfill from existing readings
+    conn.execute("""
+        INSERT OR IGNORE INTO patient_latest (patient_id)
+        SELECT DISTINCT fk_patient_id FROM vitals
+        UNION SELECT DISTINCT fk_patient_id FROM blood_sugar_tests
+    """)
+    pid = "patient_latest.patient_id"
+    conn.execute(_refresh_vitals(pid))
+    for stmt in _refresh_sugar(pid).split(";"):
+        if stmt.strip():
+            conn.execute(stmt)
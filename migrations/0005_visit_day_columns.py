@@ -0,0 +1,56 @@
+# migrations/0005_visit_day_columns.py
+"""
+Normalized time columns for day-range filters.
+
+recorded_at / taken_at are written in three shapes (CURRENT_TIMESTAMP "YYYY-MM-DD HH:MM:SS",
+naive isoformat() from the seeds, tz-aware "...+00:00" for sugar). Wrapping them in
+date(...) in a WHERE clause defeats every index, so each row also gets:
+
+  *_epoch  INTEGER  unix seconds (offsets applied; naive values are taken as UTC,
+                    which is what CURRENT_TIMESTAMP writes)
+  *_day    TEXT     UTC calendar day 'YYYY-MM-DD' of that instant
+
+"Today" is then `visit_day = date('now')` (same UTC day the old query used) and a
+range is `recorded_epoch BETWEEN ? AND ?`, both plain index lookups.
+Triggers fill the columns whenever the source timestamp is inserted or changed,
+so writers don't have to know about them.
+"""
+
+TABLES = {
+    # table: (timestamp column, epoch column, day column)
+    "vitals": ("recorded_at", "recorded_epoch", "visit_day"),
+    "blood_sugar_tests": ("taken_at", "taken_epoch", "taken_day"),
+}
+
+INDEXES = {
+    "idx_vitals_visit_day": "vitals (visit_day)",
+    "idx_vitals_recorded_epoch": "vitals (recorded_epoch)",
+    "idx_sugar_taken_day": "blood_sugar_tests (taken_day)",
+    "idx_sugar_taken_epoch": "blood_sugar_tests (taken_epoch)",
+}
+
+
+def _fill(ts, epoch, day):
+    return f"{epoch} = CAST(strftime('%s', {ts}) AS INTEGER), {day} = date({ts})"
+
+
+def upgrade(conn):
+    for table, (ts, epoch, day) in TABLES.items():
+        cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+        if epoch not in cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {epoch} INTEGER")
+        if day not in cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {day} TEXT")
+
+        for suffix, event in (("ins", "INSERT"), ("upd", f"UPDATE OF {ts}")):
+            name = f"trg_{table}_{epoch}_{suffix}"
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            conn.execute(f"""
+                CREATE TRIGGER {name} AFTER {event} ON {table} BEGIN
+                    UPDATE {table} SET {_fill("NEW." + ts, epoch, day)} WHERE id = NEW.id;
+                END""")
+
+        conn.execute(f"UPDATE {table} SET {_fill(ts, epoch, day)}")
+
+    for name, target in INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
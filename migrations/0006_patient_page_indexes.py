@@ -0,0 +1,12 @@
+# migrations/0006_patient_page_indexes.py
+"""
+Index for keyset-paginated patient lists filtered by village and ordered by name
+(services/patients.py). The village + newest-first list is already served by
+idx_patients_village, whose trailing rowid gives the id order.
+"""
+
+
+def upgrade(conn):
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_patients_village_name ON patients (village, name COLLATE NOCASE)"
+    )
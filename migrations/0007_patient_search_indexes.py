@@ -0,0 +1,17 @@
+# migrations/0007_patient_search_indexes.py
+"""
+Indexes for the typeahead patient picker (services.patients.search_patients):
+mobile / phone / aadhar prefix lookups. Name prefixes use idx_patients_name_nocase
+(or idx_patients_village_name within a village); numeric IDs use the rowid.
+"""
+
+INDEXES = {
+    "idx_patients_mobile": "patients (mobile)",
+    "idx_patients_phone": "patients (phone)",
+    "idx_patients_aadhar": "patients (aadhar)",
+}
+
+
+def upgrade(conn):
+    for name, target in INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
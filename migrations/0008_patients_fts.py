@@ -0,0 +1,44 @@
+# migrations/0008_patients_fts.py
+"""
+patients_fts: FTS5 index over the searchable patient fields, stored as an
+external-content table (no second copy of the text) and kept in sync with
+patients by triggers. Prefix indexes on 2 and 3 characters keep short
+typeahead prefixes ("ra*", "98*") cheap. services/patients.py builds the MATCH
+expressions.
+"""
+
+COLUMNS = ("name", "father_name", "mobile", "aadhar", "village", "address")
+
+_cols = ", ".join(COLUMNS)
+_new = ", ".join(f"new.{c}" for c in COLUMNS)
+_old = ", ".join(f"old.{c}" for c in COLUMNS)
+
+TABLE = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS patients_fts USING fts5(
+        {_cols},
+        content='patients', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+"""
+
+TRIGGERS = {
+    "trg_patients_fts_ins": f"""AFTER INSERT ON patients BEGIN
+            INSERT INTO patients_fts (rowid, {_cols}) VALUES (new.id, {_new});
+        END""",
+    "trg_patients_fts_del": f"""AFTER DELETE ON patients BEGIN
+            INSERT INTO patients_fts (patients_fts, rowid, {_cols}) VALUES ('delete', old.id, {_old});
+        END""",
+    "trg_patients_fts_upd": f"""AFTER UPDATE OF {_cols} ON patients BEGIN
+            INSERT INTO patients_fts (patients_fts, rowid, {_cols}) VALUES ('delete', old.id, {_old});
+            INSERT INTO patients_fts (rowid, {_cols}) VALUES (new.id, {_new});
+        END""",
+}
+
+
+def upgrade(conn):
+    conn.execute(TABLE)
+    for name, body in TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {body}")
+    # Index the existing rows
+    conn.execute("INSERT INTO patients_fts (patients_fts) VALUES ('rebuild')")
@@ -0,0 +1,54 @@
+# migrations/0009_patient_match_keys.py
+"""
+patient_match_keys: per-patient blocking keys for duplicate detection at
+registration (services/dedupe.py): normalized village + age, a phonetic name
+key, normalized names for trigram scoring, and hashes of the mobile / aadhar
+digits.
+
+The keys are computed in Python, so triggers only mark rows stale (any insert
+path, including raw sqlite3 scripts, keeps working) and dedupe.sync_match_keys()
+fills stale rows before each lookup. Existing patients start out stale;
+tools/migrate.py fills them right after migrating, at deploy time.
+"""
+
+TABLE = """
+    CREATE TABLE IF NOT EXISTS patient_match_keys (
+        patient_id INTEGER PRIMARY KEY,
+        village_key TEXT, age INTEGER, gender TEXT,
+        name_key TEXT, name_norm TEXT, father_norm TEXT,
+        mobile_hash TEXT, aadhar_hash TEXT,
+        stale INTEGER NOT NULL DEFAULT 1
+    )
+"""
+
+INDEXES = {
+    "idx_match_keys_village_age": "patient_match_keys (village_key, age)",
+    "idx_match_keys_name_age": "patient_match_keys (name_key, age)",
+    "idx_match_keys_mobile": "patient_match_keys (mobile_hash)",
+    "idx_match_keys_aadhar": "patient_match_keys (aadhar_hash)",
+    "idx_match_keys_stale": "patient_match_keys (patient_id) WHERE stale = 1",
+}
+
+TRIGGERS = {
+    "trg_patients_match_keys_ins": """AFTER INSERT ON patients BEGIN
+            INSERT OR REPLACE INTO patient_match_keys (patient_id, stale) VALUES (new.id, 1);
+        END""",
+    "trg_patients_match_keys_upd": """AFTER UPDATE OF name, father_name, age, gender, village, mobile, phone, aadhar
+        ON patients BEGIN
+            INSERT OR IGNORE INTO patient_match_keys (patient_id) VALUES (new.id);
+            UPDATE patient_match_keys SET stale = 1 WHERE patient_id = new.id;
+        END""",
+    "trg_patients_match_keys_del": """AFTER DELETE ON patients BEGIN
+            DELETE FROM patient_match_keys WHERE patient_id = old.id;
+        END""",
+}
+
+
+def upgrade(conn):
+    conn.execute(TABLE)
+    for name, target in INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+    for name, body in TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {body}")
+    conn.execute("INSERT OR IGNORE INTO patient_match_keys (patient_id) SELECT id FROM patients")
@@ -0,0 +1,135 @@
+# migrations/0010_metric_rollups.py
+"""
+metric_rollups: per patient, metric and day / month / year bucket, the count and
+sum of readings, so Health Metrics charts read pre-aggregated series (mean =
+total / n) with one indexed query instead of every patient's full history.
+
+  metric   bp_sys / bp_dia / pulse from vitals, the test_type (FBS, PPBS, RBS,
+           HbA1c) from blood_sugar_tests
+  bucket   UTC day 'YYYY-MM-DD', month 'YYYY-MM-01' or year 'YYYY-01-01' of
+           recorded_at / taken_at (same day the visit_day / taken_day columns use)
+
+Triggers add every inserted reading to its three buckets and take deleted or
+edited readings back out (an edit is -old +new), so the table stays exact
+without re-reading history. Buckets whose count drops to 0 are removed.
+"""
+
+TABLE = """
+    CREATE TABLE IF NOT EXISTS metric_rollups (
+        patient_id INTEGER NOT NULL,
+        grain TEXT NOT NULL,            -- day / month / year
+        metric TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        n INTEGER NOT NULL,
+        total REAL NOT NULL,
+        PRIMARY KEY (patient_id, grain, metric, bucket)
+    ) WITHOUT ROWID
+"""
+
+BUCKETS = {
+    "day": "date({ts})",
+    "month": "strftime('%Y-%m-01', {ts})",
+    "year": "strftime('%Y-01-01', {ts})",
+}
+
+# source table: (columns a change to which moves a reading, timestamp, [(metric, value), ...]);
+# {r} is the trigger row, NEW or OLD
+SOURCES = {
+    "vitals": (
+        "fk_patient_id, recorded_at, bp_sys, bp_dia, pulse",
+        "{r}.recorded_at",
+        [("'bp_sys'", "{r}.bp_sys"), ("'bp_dia'", "{r}.bp_dia"), ("'pulse'", "{r}.pulse")],
+    ),
+    "blood_sugar_tests": (
+        "fk_patient_id, test_type, result_mg_dl, taken_at",
+        "{r}.taken_at",
+        [("{r}.test_type", "{r}.result_mg_dl")],
+    ),
+}
+
+
+def _apply(table, row, sign):
+    """Add (sign=1) or remove (sign=-1) one reading `row` (NEW / OLD) in all its buckets."""
+    _, ts, metrics = SOURCES[table]
+    ts = ts.format(r=row)
+    values = " UNION ALL ".join(
+        f"SELECT {m.format(r=row)} AS metric, {v.format(r=row)} AS value" for m, v in metrics
+    )
+    grains = " UNION ALL ".join(
+        f"SELECT '{grain}' AS grain, {expr.format(ts=ts)} AS bucket" for grain, expr in BUCKETS.items()
+    )
+    return f"""
+        INSERT INTO metric_rollups (patient_id, grain, metric, bucket, n, total)
+        SELECT {row}.fk_patient_id, g.grain, m.metric, g.bucket, {sign}, {sign} * m.value
+        FROM ({grains}) g, ({values}) m
+        WHERE m.value IS NOT NULL AND m.metric IS NOT NULL AND g.bucket IS NOT NULL
+        ON CONFLICT (patient_id, grain, metric, bucket)
+        DO UPDATE SET n = n + excluded.n, total = total + excluded.total;"""
+
+
+def _prune(row):
+    return f"DELETE FROM metric_rollups WHERE patient_id = {row}.fk_patient_id AND n <= 0;"
+
+
+def _triggers():
+    triggers = {}
+    for table, (cols, _, _) in SOURCES.items():
+        triggers[f"trg_{table}_rollups_ins"] = f"""
+            AFTER INSERT ON {table} BEGIN
+                {_apply(table, "NEW", 1)}
+            END"""
+        triggers[f"trg_{table}_rollups_upd"] = f"""
+            AFTER UPDATE OF {cols} ON {table} BEGIN
+                {_apply(table, "OLD", -1)}
+                {_apply(table, "NEW", 1)}
+                {_prune("OLD")}
+            END"""
+        triggers[f"trg_{table}_rollups_del"] = f"""
+            AFTER DELETE ON {table} BEGIN
+                {_apply(table, "OLD", -1)}
+                {_prune("OLD")}
+            END"""
+    triggers["trg_patients_rollups_del"] = """
+        AFTER DELETE ON patients BEGIN
+            DELETE FROM metric_rollups WHERE patient_id = OLD.id;
+        END"""
+    return triggers
+
+
+# Backfill: day buckets from the readings, then months from days and years from months
+BACKFILL = [
+    """
+    INSERT INTO metric_rollups (patient_id, grain, metric, bucket, n, total)
+    SELECT fk_patient_id, 'day', metric, bucket, COUNT(*), SUM(value) FROM (
+        SELECT fk_patient_id, 'bp_sys' AS metric, date(recorded_at) AS bucket, bp_sys AS value FROM vitals
+        UNION ALL SELECT fk_patient_id, 'bp_dia', date(recorded_at), bp_dia FROM vitals
+        UNION ALL SELECT fk_patient_id, 'pulse', date(recorded_at), pulse FROM vitals
+        UNION ALL SELECT fk_patient_id, test_type, date(taken_at), result_mg_dl FROM blood_sugar_tests
+    )
+    WHERE value IS NOT NULL AND metric IS NOT NULL AND bucket IS NOT NULL
+    GROUP BY fk_patient_id, metric, bucket
+    """,
+    """
+    INSERT INTO metric_rollups (patient_id, grain, metric, bucket, n, total)
+    SELECT patient_id, 'month', metric, substr(bucket, 1, 8) || '01', SUM(n), SUM(total)
+    FROM metric_rollups WHERE grain = 'day'
+    GROUP BY patient_id, metric, substr(bucket, 1, 8)
+    """,
+    """
+    INSERT INTO metric_rollups (patient_id, grain, metric, bucket, n, total)
+    SELECT patient_id, 'year', metric, substr(bucket, 1, 5) || '01-01', SUM(n), SUM(total)
+    FROM metric_rollups WHERE grain = 'month'
+    GROUP BY patient_id, metric, substr(bucket, 1, 5)
+    """,
+]
+
+
+def upgrade(conn):
+    conn.execute(TABLE)
+    for name, body in _triggers().items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {body}")
+
+    conn.execute("DELETE FROM metric_rollups")
+    for stmt in BACKFILL:
+        conn.execute(stmt)
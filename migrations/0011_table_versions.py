@@ -0,0 +1,35 @@
+# migrations/0011_table_versions.py
+"""
+table_versions: a change counter per table, bumped by triggers on every INSERT,
+UPDATE and DELETE, whoever writes (any screen, session or process).
+
+services/query_cache.py remembers the counters a cached result was read at and
+serves it from memory until one of them moves, so shared reads stay exact
+without every writer having to know which caches to clear.
+"""
+
+TRACKED = (
+    "patients", "vitals", "blood_sugar_tests", "lab_orders", "medications", "doctor_advice",
+    "messages", "stock", "stock_requests", "pharmacy", "users", "rmp_users",
+)
+
+
+def upgrade(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    for table in TRACKED:
+        if table not in existing:
+            continue
+        conn.execute("INSERT OR IGNORE INTO table_versions (name) VALUES (?)", (table,))
+        for suffix, event in (("ins", "INSERT"), ("upd", "UPDATE"), ("del", "DELETE")):
+            name = f"trg_{table}_version_{suffix}"
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            conn.execute(f"""
+                CREATE TRIGGER {name} AFTER {event} ON {table} BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+                END""")
@@ -0,0 +1,152 @@
+# migrations/0012_stock_ledger.py
+"""
+stock_movements: append-only ledger of everything that moves stock, per item.
+
+  kind            receipt / issue / adjustment (on-hand), opening (backfill),
+                  request / approval / rejection / withdrawal (stock_requests)
+  on_hand_delta   change to the quantity on the shelf (stock.qty)
+  pending_delta   change to the quantity requested and not yet decided
+  received_delta  change to the quantity approved (received) on requests
+
+stock.qty stays as the current on-hand level for existing readers; a trigger
+adds every movement's on_hand_delta to it, and services/stock.py is the only
+writer of on-hand movements. Triggers on stock_requests record the request
+lifecycle (a new request, a status change, a deleted request) whoever writes it.
+
+stock_snapshots: every item's balances as of one movement id. Current levels are
+the latest snapshot plus the movements after it (services/stock.py takes a new
+snapshot once that tail passes STOCK_SNAPSHOT_EVERY), so reading them costs
+O(items + tail) however long the ledger grows.
+"""
+
+TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS stock_movements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,   -- never reused: snapshots cut the ledger by id
+        item_name TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        on_hand_delta INTEGER NOT NULL DEFAULT 0,
+        pending_delta INTEGER NOT NULL DEFAULT 0,
+        received_delta INTEGER NOT NULL DEFAULT 0,
+        request_id INTEGER,
+        created_by INTEGER,
+        created_at TEXT NOT NULL,
+        note TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_stock_movements_item ON stock_movements (item_name, id)",
+    """
+    CREATE TABLE IF NOT EXISTS stock_snapshots (
+        movement_id INTEGER NOT NULL,           -- balances include every movement with id <= this
+        item_name TEXT NOT NULL,
+        on_hand INTEGER NOT NULL,
+        pending INTEGER NOT NULL,
+        received INTEGER NOT NULL,
+        taken_at TEXT NOT NULL,
+        PRIMARY KEY (movement_id, item_name)
+    ) WITHOUT ROWID
+    """,
+]
+
+# A request's contribution to the pending / received totals; {r} is NEW or OLD
+_PENDING = "CASE WHEN {r}.status = 'Pending' OR {r}.status IS NULL THEN {r}.qty ELSE 0 END"
+_RECEIVED = "CASE WHEN {r}.status = 'Approved' THEN {r}.qty ELSE 0 END"
+
+
+def _request_movement(kind, new, old, at, when="1"):
+    """Movement moving a request's contribution from `old` to `new` (either may be None), if `when`."""
+    def delta(expr):
+        plus = expr.format(r=new) if new else "0"
+        minus = expr.format(r=old) if old else "0"
+        return f"({plus}) - ({minus})"
+
+    row = new or old
+    return f"""
+        INSERT INTO stock_movements (item_name, kind, pending_delta, received_delta, request_id, created_by, created_at)
+        SELECT {row}.item_name, {kind}, {delta(_PENDING)}, {delta(_RECEIVED)}, {row}.id, {row}.requested_by, {at}
+        WHERE {when};"""
+
+
+_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+_STATUS_KIND = ("CASE NEW.status WHEN 'Approved' THEN 'approval' WHEN 'Rejected' THEN 'rejection' "
+                "ELSE 'request' END")
+
+TRIGGERS = {
+    "trg_stock_movements_apply": """
+        AFTER INSERT ON stock_movements WHEN NEW.on_hand_delta <> 0 BEGIN
+            UPDATE stock SET qty = COALESCE(qty, 0) + NEW.on_hand_delta, last_updated = NEW.created_at
+            WHERE item_name = NEW.item_name;
+        END""",
+    "trg_stock_movements_no_update": """
+        BEFORE UPDATE ON stock_movements BEGIN
+            SELECT RAISE(ABORT, 'stock_movements is append-only; record a correcting movement');
+        END""",
+    "trg_stock_movements_no_delete": """
+        BEFORE DELETE ON stock_movements BEGIN
+            SELECT RAISE(ABORT, 'stock_movements is append-only; record a correcting movement');
+        END""",
+    "trg_stock_requests_ledger_ins": f"""
+        AFTER INSERT ON stock_requests BEGIN
+            {_request_movement(_STATUS_KIND, "NEW", None, "NEW.requested_at")}
+        END""",
+    # Moving a request to another item is a withdrawal from the old one and a request on the new one
+    "trg_stock_requests_ledger_upd": f"""
+        AFTER UPDATE OF item_name, qty, status ON stock_requests BEGIN
+            {_request_movement("'withdrawal'", None, "OLD", _NOW, "OLD.item_name IS NOT NEW.item_name")}
+            {_request_movement("'request'", "NEW", None, _NOW, "OLD.item_name IS NOT NEW.item_name")}
+            {_request_movement(_STATUS_KIND, "NEW", "OLD", _NOW, "OLD.item_name IS NEW.item_name AND "
+                               "(OLD.qty IS NOT NEW.qty OR OLD.status IS NOT NEW.status)")}
+        END""",
+    "trg_stock_requests_ledger_del": f"""
+        AFTER DELETE ON stock_requests BEGIN
+            {_request_movement("'withdrawal'", None, "OLD", _NOW, "OLD.status IS NOT 'Rejected'")}
+        END""",
+    "trg_stock_movements_version_ins": """
+        AFTER INSERT ON stock_movements BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'stock_movements';
+        END""",
+}
+
+# Backfill: an opening movement per stock row and one per live request (its current
+# state), then the first snapshot. Runs before the triggers exist, so stock.qty is
+# left as it is.
+BACKFILL = [
+    """
+    INSERT INTO stock_movements (item_name, kind, on_hand_delta, created_at, note)
+    SELECT item_name, 'opening', COALESCE(qty, 0), COALESCE(last_updated, strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+           'balance before the ledger'
+    FROM stock ORDER BY id
+    """,
+    """
+    INSERT INTO stock_movements (item_name, kind, pending_delta, received_delta, request_id, created_by, created_at)
+    SELECT item_name, CASE WHEN status = 'Approved' THEN 'approval' ELSE 'request' END,
+           CASE WHEN status = 'Pending' OR status IS NULL THEN qty ELSE 0 END,
+           CASE WHEN status = 'Approved' THEN qty ELSE 0 END,
+           id, requested_by, requested_at
+    FROM stock_requests
+    WHERE status IS NOT 'Rejected'
+    ORDER BY id
+    """,
+    """
+    INSERT INTO stock_snapshots (movement_id, item_name, on_hand, pending, received, taken_at)
+    SELECT (SELECT COALESCE(MAX(id), 0) FROM stock_movements), item_name,
+           SUM(on_hand_delta), SUM(pending_delta), SUM(received_delta), strftime('%Y-%m-%dT%H:%M:%f', 'now')
+    FROM stock_movements
+    GROUP BY item_name
+    """,
+]
+
+
+def upgrade(conn):
+    for stmt in TABLES:
+        conn.execute(stmt)
+    for name in TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    if not conn.execute("SELECT 1 FROM stock_movements LIMIT 1").fetchone():
+        for stmt in BACKFILL:
+            conn.execute(stmt)
+
+    conn.execute("INSERT OR IGNORE INTO table_versions (name) VALUES ('stock_movements')")
+    for name, body in TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER {name} {body}")
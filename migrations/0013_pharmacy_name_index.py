@@ -0,0 +1,9 @@
+# migrations/0013_pharmacy_name_index.py
+"""
+Index for the keyset-paginated Pharmacy grid (services/pharmacy.py), ordered by
+drug name; the trailing rowid breaks ties between drugs with the same name.
+"""
+
+
+def upgrade(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pharmacy_name_nocase ON pharmacy (drug_name COLLATE NOCASE)")
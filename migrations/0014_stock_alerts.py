@@ -0,0 +1,127 @@
+# migrations/0014_stock_alerts.py
+"""
+stock_alerts: one row per time an item's on-hand quantity (stock.qty, kept by
+the 0012 ledger) falls into a worse band, written by a trigger whoever moves the
+stock:
+
+  low       qty <= 5 (services.kpis.LOW_STOCK_THRESHOLD)
+  critical  qty <= 2
+  out       qty <= 0
+
+A restock above the low band acknowledges the item's open alerts (acknowledged_by
+NULL); people acknowledge them from the alerts view. Screens read open alerts
+newest first and counts per severity through the indexes below instead of
+scanning messages for 'Stock alert:%' and parsing the text.
+
+The backfill carries over the System 'Stock alert: ...' messages (item and the
+first number in the text) and opens an alert for every item already in a band.
+"""
+import re
+
+LOW = 5
+CRITICAL = 2
+
+TABLE = """
+    CREATE TABLE IF NOT EXISTS stock_alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        item_name TEXT NOT NULL,
+        qty INTEGER,
+        severity TEXT NOT NULL,             -- low / critical / out
+        created_at TEXT NOT NULL,
+        acknowledged INTEGER NOT NULL DEFAULT 0,
+        acknowledged_by INTEGER,
+        acknowledged_at TEXT,
+        note TEXT                           -- original text of alerts carried over from messages
+    )
+"""
+
+INDEXES = {
+    "idx_stock_alerts_open": "stock_alerts (acknowledged, id)",
+    "idx_stock_alerts_severity": "stock_alerts (severity, acknowledged, id)",
+    "idx_stock_alerts_item_open": "stock_alerts (item_name, acknowledged)",
+}
+
+
+def _band(q):
+    return f"(CASE WHEN {q} <= 0 THEN 3 WHEN {q} <= {CRITICAL} THEN 2 WHEN {q} <= {LOW} THEN 1 ELSE 0 END)"
+
+
+_SEVERITY = f"(CASE WHEN NEW.qty <= 0 THEN 'out' WHEN NEW.qty <= {CRITICAL} THEN 'critical' ELSE 'low' END)"
+_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+
+TRIGGERS = {
+    "trg_stock_alerts_raise": f"""
+        AFTER UPDATE OF qty ON stock
+        WHEN {_band("COALESCE(NEW.qty, 0)")} > {_band("COALESCE(OLD.qty, 0)")} BEGIN
+            INSERT INTO stock_alerts (item_name, qty, severity, created_at)
+            VALUES (NEW.item_name, NEW.qty, {_SEVERITY}, COALESCE(NEW.last_updated, {_NOW}));
+        END""",
+    "trg_stock_alerts_clear": f"""
+        AFTER UPDATE OF qty ON stock
+        WHEN NEW.qty > {LOW} AND COALESCE(OLD.qty, 0) <= {LOW} BEGIN
+            UPDATE stock_alerts SET acknowledged = 1, acknowledged_at = {_NOW}
+            WHERE item_name = NEW.item_name AND acknowledged = 0;
+        END""",
+}
+
+_LEGACY_ITEM = re.compile(r"^Stock alert:\s*(.+?)(?=\s+(?:is\s+)?(?:running low|low|out of stock)\b|\s*[(.,:]|$)", re.I)
+_NUMBER = re.compile(r"\d+")
+
+
+def _legacy_alert(message):
+    """(item, qty, severity) from a 'Stock alert: ...' message, the way the old screen read it."""
+    m = _LEGACY_ITEM.match(message.strip())
+    item = m.group(1).strip() if m else message
+    n = _NUMBER.search(message)
+    qty = int(n.group()) if n else None
+    if "out of stock" in message.lower() or qty == 0:
+        severity = "out"
+    elif qty is not None and qty <= CRITICAL:
+        severity = "critical"
+    else:
+        severity = "low"
+    return item, qty, severity
+
+
+def backfill(conn):
+    """Alerts carried over from messages, then one per item already at or below LOW."""
+    legacy = conn.execute("""
+        SELECT message, created_at FROM messages
+        WHERE sender_role = 'System' AND message LIKE 'Stock alert:%'
+        ORDER BY created_at, id
+    """).fetchall()
+    conn.executemany(
+        "INSERT INTO stock_alerts (item_name, qty, severity, created_at, note) VALUES (?, ?, ?, ?, ?)",
+        [(*_legacy_alert(msg), created_at, msg) for msg, created_at in legacy],
+    )
+    conn.execute(f"""
+        INSERT INTO stock_alerts (item_name, qty, severity, created_at)
+        SELECT item_name, COALESCE(qty, 0),
+               CASE WHEN COALESCE(qty, 0) <= 0 THEN 'out' WHEN qty <= {CRITICAL} THEN 'critical' ELSE 'low' END,
+               COALESCE(last_updated, {_NOW})
+        FROM stock WHERE COALESCE(qty, 0) <= {LOW}
+        ORDER BY id
+    """)
+
+
+def upgrade(conn):
+    conn.execute(TABLE)
+    for name, cols in INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {cols}")
+
+    if not conn.execute("SELECT 1 FROM stock_alerts LIMIT 1").fetchone():
+        backfill(conn)
+
+    for name, body in TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {body}")
+
+    # Change counter for services.query_cache (as in 0011)
+    conn.execute("INSERT OR IGNORE INTO table_versions (name) VALUES ('stock_alerts')")
+    for suffix, event in (("ins", "INSERT"), ("upd", "UPDATE"), ("del", "DELETE")):
+        name = f"trg_stock_alerts_version_{suffix}"
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"""
+            CREATE TRIGGER {name} AFTER {event} ON stock_alerts BEGIN
+                UPDATE table_versions SET version = version + 1 WHERE name = 'stock_alerts';
+            END""")
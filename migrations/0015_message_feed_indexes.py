@@ -0,0 +1,20 @@
+# migrations/0015_message_feed_indexes.py
+"""
+Indexes for the cursor-paginated message feed (services/messages.py).
+
+A role's feed is the messages it sent plus the ones addressed to it, each side
+seeked newest-first (or after a since-id) on its own index. A thread is the
+conversation between two roles in either direction, keyed by the unordered pair
+min(sender_role, recipient_role), max(...) so both directions share one index.
+"""
+
+INDEXES = {
+    "idx_messages_recipient": "messages (recipient_role, id)",
+    "idx_messages_sender": "messages (sender_role, id)",
+    "idx_messages_thread": "messages (min(sender_role, recipient_role), max(sender_role, recipient_role), id)",
+}
+
+
+def upgrade(conn):
+    for name, cols in INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {cols}")
@@ -12,13 +12,9 @@ import traceback
 import streamlit as st
 
 
-
-
-# Force wide layout (before any other Streamlit UI calls)
-st.set_page_config(layout="wide")
-
-st.markdown(
-    """
+# Keep columns side by side (horizontal scroll) instead of stacking on narrow viewports.
+# Layout is already wide: root app.py calls st.set_page_config once.
+_NO_WRAP_CSS = """
     <style>
     /* Force Streamlit horizontal blocks (columns) not to wrap and allow horizontal scroll */
     [data-testid="stHorizontalBlock"] {
@@ -32,9 +28,7 @@ st.markdown(
     /* Optional: give generic containers similar treatment */
     .block-container, .stApp { overflow-x: visible !important; }
     </style>
-    """,
-    unsafe_allow_html=True,
-)
+"""
 
 
 
@@ -51,37 +45,25 @@ import os
 import os
 import streamlit as st
 
-def local_css_from_project_root(*path_parts):
+def _init_run():
     """
-    Safely load a CSS file relative to project root (assumes project root is two levels above this module).
-    Returns CSS text or None if not found.
+    Per-run page setup, called first by render_health_agent_dashboard. (This used to run at
+    import, i.e. only in the first session of the process and only on its first run.)
     """
-    # file dirname of this module
-    this_dir = os.path.dirname(__file__)
-    # adjust how many levels up your project root is — here modules/health_agent -> project root = ../../
-    project_root = os.path.normpath(os.path.join(this_dir, "..", ".."))
-    css_path = os.path.join(project_root, *path_parts)
-    css_path = os.path.abspath(css_path)
-
-    if not os.path.exists(css_path):
-        # helpful debug output — remove or change to logging in production
-        st.error(f"CSS file not found: {css_path}")
-        print(f"[DEBUG] CSS file not found: {css_path}")
-        return None
-
-    with open(css_path, "r", encoding="utf-8") as f:
-        return f.read()
-
-# Usage (from same file)
-css = local_css_from_project_root("static", "style.css")
-if css:
-    st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
+    st.markdown(_NO_WRAP_CSS, unsafe_allow_html=True)
+    css = assets.stylesheet("style.css")   # minified build (tools/build_assets.py), read once per process
+    if css:
+        st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
+    else:
+        st.error("CSS file not found: static/style.css")
 
+    st.session_state.setdefault("rmp_page", "dashboard")
+    try:
+        _auto_apply_pending_if_authenticated()
+    except Exception:
+        pass
 
 
-if "rmp_page" not in st.session_state:
-    st.session_state["rmp_page"] = "dashboard"
-    
 def _go(page_key: str):
     # keep both, in case older code still reads rmp_page somewhere
     st.session_state["rmp_section"] = page_key
@@ -155,6 +137,8 @@ try:
     from db import get_connection
 except Exception:
     get_connection = None
+
+from services import assets, auth, dedupe, downsample, kpis, messages, metrics, patients, pharmacy, query_cache, risk, stock
     
     
 # Fixed items catalog (as per your list)
@@ -171,60 +155,6 @@ RMP_STOCK_ITEMS = [
 # =========================
 # DB helpers
 # =========================
-def _ensure_patient_columns():
-    """Add new patient columns if they don't exist (SQLite safe migration)."""
-    if not get_connection:
-        return
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("PRAGMA table_info(patients)")
-    existing = {row[1] for row in cur.fetchall()}
-
-    # column_name -> SQL type
-    to_add = {
-        "father_name": "TEXT",
-        "mobile": "TEXT",
-        "aadhar": "TEXT",
-        "address": "TEXT",
-        "village": "TEXT",            # <-- add this line
-        "photo_path": "TEXT",
-        "diet": "TEXT",
-        "breakfast": "TEXT",
-        "lunch": "TEXT",
-        "dinner": "TEXT",
-        "tobacco": "TEXT",          # Yes/No
-        "alcohol": "TEXT",          # Yes/No
-        "activity_level": "TEXT",   # Sedentary / Lightly / Moderate / Very
-        "family_history": "TEXT",
-    }
-
-    for col, sqltype in to_add.items():
-        if col not in existing:
-            cur.execute(f"ALTER TABLE patients ADD COLUMN {col} {sqltype}")
-
-    conn.commit()
-    conn.close()
-
-
-def _ensure_vitals_columns():
-    """Add new vitals columns if they don't exist (SQLite safe migration)."""
-    if not get_connection:
-        return
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("PRAGMA table_info(vitals)")
-    existing = {row[1] for row in cur.fetchall()}
-
-    to_add = {
-        "waist_cm": "REAL",   # <-- Weist
-    }
-    for col, sqltype in to_add.items():
-        if col not in existing:
-            cur.execute(f"ALTER TABLE vitals ADD COLUMN {col} {sqltype}")
-
-    conn.commit()
-    conn.close()
-
 def _reset_vitals_form():
     """Clear vitals inputs and disable the Save button by making the form invalid."""
     for k, v in {
@@ -235,129 +165,6 @@ def _reset_vitals_form():
         st.session_state[k] = v
     st.session_state["vitals_saving"] = False
 
-def _ensure_blood_sugar_table():
-    """Create blood_sugar_tests table (idempotent)."""
-    if not get_connection:
-        return
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS blood_sugar_tests (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            fk_patient_id INTEGER NOT NULL,
-            test_type TEXT NOT NULL,                 -- RBS/FBS/PPBS/HbA1c
-            result_mg_dl REAL,                       -- mg/dL or % for HbA1c
-            last_meal_time TEXT,
-            history TEXT,
-            symptoms TEXT,
-            notes TEXT,
-            sent_to_doctor INTEGER DEFAULT 0,        -- 0/1
-            taken_at TEXT NOT NULL,
-            recorded_by INTEGER,
-            FOREIGN KEY (fk_patient_id) REFERENCES patients(id)
-        )
-    """)
-    conn.commit(); conn.close()
-
-def _ensure_messages_table():
-    """Store chat messages between RMP and Doctor/Admin + alerts."""
-    if not get_connection:
-        return
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            sender_role TEXT NOT NULL,   -- 'RMP', 'Doctor', 'Admin', 'System'
-            recipient_role TEXT NOT NULL,
-            message TEXT NOT NULL,
-            created_at TEXT NOT NULL
-        )
-    """)
-    conn.commit(); conn.close()
-
-
-def _ensure_tables():
-    if not get_connection:
-        return
-    conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS patients(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL, age INTEGER, gender TEXT, phone TEXT
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS vitals(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            fk_patient_id INTEGER NOT NULL,
-            recorded_at TEXT NOT NULL,
-            bp_sys INTEGER, bp_dia INTEGER, pulse INTEGER, temperature REAL,
-            resp_rate INTEGER, spo2 INTEGER, height_cm REAL, weight_kg REAL, bmi REAL,
-            notes TEXT, recorded_by INTEGER,
-            FOREIGN KEY (fk_patient_id) REFERENCES patients(id)
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS lab_orders(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            fk_patient_id INTEGER NOT NULL,
-            ordered_at TEXT NOT NULL,
-            test_name TEXT NOT NULL, priority TEXT, notes TEXT,
-            ordered_by INTEGER, status TEXT DEFAULT 'Pending',
-            FOREIGN KEY (fk_patient_id) REFERENCES patients(id)
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS stock(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            item_name TEXT NOT NULL UNIQUE,
-            category TEXT, qty INTEGER DEFAULT 0, unit TEXT DEFAULT 'pcs',
-            last_updated TEXT
-        )
-    """)
-    cur.execute("""  
-        CREATE TABLE IF NOT EXISTS medications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            patient_id INTEGER NOT NULL,
-            drug_name TEXT NOT NULL,
-            dose TEXT,
-            frequency TEXT,
-            duration TEXT,
-            referral_facility TEXT,
-            follow_up_days INTEGER,
-            reason TEXT,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY(patient_id) REFERENCES patients(id)
-        );
-    """)
-    
-    conn.commit()
-    conn.close()
-    _ensure_patient_columns()
-    _ensure_vitals_columns()  
-    _ensure_blood_sugar_table()   # <-- add this
-    _ensure_stock_requests_table()  # <-- add this
-    _ensure_medications_table()
-    _ensure_doctor_advice_table()
-
-def _ensure_rmp_users_table():
-    if not get_connection: return
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS rmp_users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            mobile TEXT,
-            aadhar TEXT,
-            address TEXT,
-            photo_path TEXT,
-            specialization TEXT,
-            notes TEXT
-        )
-    """)
-    conn.commit(); conn.close()
-
 import sqlite3
 
 def _get_patient_by_id(pid: int):
@@ -405,9 +212,13 @@ def _render_profile(user: dict):
             st.info("📷 No photo available")
 
 
+# Dashboard counters come from one cached snapshot (services.kpis), not a query each.
 def _count_rows(table: str) -> int:
     if not get_connection:
         return 0
+    snap = kpis.get_kpis()
+    if table in snap:
+        return snap[table]
     conn = get_connection(); cur = conn.cursor()
     try:
         cur.execute(f"SELECT COUNT(*) FROM {table}")
@@ -421,26 +232,20 @@ def _count_rows(table: str) -> int:
 def _today_visits_count() -> int:
     if not get_connection:
         return 0
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM vitals WHERE date(recorded_at) = date('now')")
-    n = cur.fetchone()[0] or 0
-    conn.close()
-    return n
+    return kpis.get_kpis()["today_visits"]
 
 
 def _pending_tests_count() -> int:
     if not get_connection:
         return 0
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM lab_orders WHERE status != 'Completed'")
-    n = cur.fetchone()[0] or 0
-    conn.close()
-    return n
+    return kpis.get_kpis()["pending_tests"]
 
 
-def _low_stock_count(threshold: int = 5) -> int:
+def _low_stock_count(threshold: int = kpis.LOW_STOCK_THRESHOLD) -> int:
     if not get_connection:
         return 0
+    if threshold == kpis.LOW_STOCK_THRESHOLD:
+        return kpis.get_kpis()["low_stock"]
     conn = get_connection(); cur = conn.cursor()
     cur.execute("SELECT COUNT(*) FROM stock WHERE qty <= ?", (threshold,))
     n = cur.fetchone()[0] or 0
@@ -448,38 +253,113 @@ def _low_stock_count(threshold: int = 5) -> int:
     return n
 
 
-def _load_patients():
+SEARCH_HELP = 'Words match the start of any word: "ram 98". Use quotes for exact words, village:name for one field.'
+
+
+def _patient_page(key: str, **filters):
+    """
+    The current page of a keyset-paginated patient list (services.patients) for widget `key`.
+    Returns (rows, next_cursor); the page position resets when the filters change.
+    """
+    state = st.session_state.setdefault(f"{key}_pager", {"filters": None, "cursors": [None]})
+    if state["filters"] != filters:
+        state["filters"], state["cursors"] = dict(filters), [None]
+    return patients.page_patients(after=state["cursors"][-1], **filters)
+
+
+def _pager_nav(key: str, next_cursor, shown: int, noun: str = "patients"):
+    """Prev / Next buttons under a list fetched with _patient_page(key, ...) (or kept in the same `{key}_pager` state)."""
+    state = st.session_state[f"{key}_pager"]
+    page = len(state["cursors"])
+    c1, c2, c3 = st.columns([1, 1, 4])
+    with c1:
+        if st.button("◀ Prev", key=f"{key}_prev", disabled=page == 1):
+            state["cursors"].pop(); st.rerun()
+    with c2:
+        if st.button("Next ▶", key=f"{key}_next", disabled=next_cursor is None):
+            state["cursors"].append(next_cursor); st.rerun()
+    with c3:
+        st.caption(f"Page {page} · {shown} {noun}")
+
+
+def _patient_picker(key: str, label: str = "Patient", village: str = None, all_label: str = None):
+    """
+    Typeahead patient picker: a search box (name / mobile / aadhar / #ID) and a select
+    holding only the top matches (services.patients.search_patients); with nothing typed,
+    the newest patients. Returns the chosen patient id, 0 for `all_label`, or None when
+    nothing matches (a search that finds no one never offers `all_label`).
+    """
+    q = st.text_input(
+        f"Find {label.lower()}", key=f"{key}_q",
+        placeholder="Name, mobile, aadhar or #ID",
+    )
+    if q.strip():
+        rows = patients.search_patients(q, village=village)
+    else:
+        rows, _ = patients.page_patients(order="newest", village=village, limit=patients.PICKER_LIMIT)
+
+    if not rows and (q.strip() or not all_label):
+        st.info("No matching patients.")
+        return None
+    labels = {0: all_label} if all_label else {}
+    labels.update({r["id"]: f"#{r['id']} · {r['name']} ({r['gender'] or ''}) — {r['village'] or '—'}" for r in rows})
+    return st.selectbox(label, list(labels), format_func=labels.get, key=f"{key}_select")
+
+
+def _search_patients_df(rows):
+    """Patients_Search table for one page of page_patients(with_latest=True) rows, with a Risk label."""
+    import pandas as pd
+    df = pd.DataFrame(
+        [tuple(r[k] for k in ("id", "name", "age", "gender", "mobile", "aadhar", "activity_level", "village",
+                              "bp_sys", "bp_dia", "pulse", "sugar", "sugar_type", "fbs")) for r in rows],
+        columns=[
+            "ID","Name","Age","Gender","Mobile","Aadhar","Activity","Village",
+            "BP Sys","BP Dia","Pulse","Sugar","Sugar Type","FBS"
+        ]
+    )
+    # Shared rule, whole column at once
+    df["Risk"] = risk.classify_frame(df).map(risk.LABELS)
+    return df
+
+
+def _recent_vitals(unsent_only: bool = True, limit: int = 100):
+    """Record Vitals 'Recent' table rows (newest first); includes frequency_days for Next record."""
     if not get_connection:
         return []
+    where_clause = " WHERE v.sent_to_doctor = 0 " if unsent_only else ""
     conn = get_connection(); cur = conn.cursor()
-    cur.execute("""
-        SELECT
-            id, name, age, gender,
-            COALESCE(mobile, phone) as mobile,
-            aadhar, activity_level, village
-        FROM patients
-        ORDER BY id DESC
-        LIMIT 200
-    """)
-    rows = cur.fetchall(); conn.close()
-    return rows
+    try:
+        cur.execute(f"""
+            SELECT v.id, p.name, v.bp_sys, v.bp_dia, v.pulse, v.temperature,
+                   v.spo2, v.height_cm, v.weight_kg, v.waist_cm, v.bmi,
+                   v.notes, v.recorded_at, v.frequency_days, v.sent_to_doctor
+            FROM vitals v
+            JOIN patients p ON p.id = v.fk_patient_id
+            {where_clause}
+            ORDER BY v.id DESC LIMIT ?
+        """, (limit,))
+        return cur.fetchall()
+    finally:
+        conn.close()
 
-def _load_patients_by_village(village: str):
+
+def _recent_sugar_tests(unsent_only: bool = True, limit: int = 100):
+    """Sugar Blood Test 'Recent tests' table rows (newest first)."""
     if not get_connection:
         return []
+    where_clause = " WHERE t.sent_to_doctor = 0 " if unsent_only else ""
     conn = get_connection(); cur = conn.cursor()
-    if not village or village.lower() == "all":
-        cur.execute("""
-            SELECT id, name, age, gender, COALESCE(mobile, phone) as mobile, aadhar, activity_level, village
-            FROM patients ORDER BY id DESC LIMIT 200
-        """)
-    else:
-        cur.execute("""
-            SELECT id, name, age, gender, COALESCE(mobile, phone) as mobile, aadhar, activity_level, village
-            FROM patients WHERE village = ? ORDER BY id DESC LIMIT 200
-        """, (village,))
-    rows = cur.fetchall(); conn.close()
-    return rows
+    try:
+        cur.execute(f"""
+            SELECT t.id, p.name, t.test_type, t.result_mg_dl, t.last_meal_time, t.sent_to_doctor, t.taken_at,t.frequency_days
+            FROM blood_sugar_tests t
+            JOIN patients p ON p.id = t.fk_patient_id
+            {where_clause}
+            ORDER BY t.id DESC LIMIT ?
+        """, (limit,))
+        return cur.fetchall()
+    finally:
+        conn.close()
 
 
 from typing import Optional
@@ -505,11 +385,44 @@ def _save_vitals(
             recorded_by, int(frequency_days or 0)
         ))
         conn.commit(); conn.close()
+        kpis.invalidate_kpis()
         return True
     except Exception:
         return False
 
 
+def _register_patient(p: dict) -> int:
+    """Insert a Patients_New form (dict of its fields, photo as bytes) and return the new id."""
+    # Save photo if provided (robust filename)
+    photo_path = None
+    if p.get("photo"):
+        import os, time, secrets
+        folder = "uploads/patient_photos"
+        os.makedirs(folder, exist_ok=True)
+        filename = f"{int(time.time())}_{secrets.token_hex(4)}.jpg"
+        fullpath = os.path.join(folder, filename)
+        with open(fullpath, "wb") as f:
+            f.write(p["photo"])
+        photo_path = fullpath  # store relative path if preferred
+
+    conn = get_connection(); cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO patients
+        (name, father_name, age, gender, phone, mobile, aadhar, address, village, photo_path,
+         diet, breakfast, lunch, dinner, tobacco, alcohol, activity_level, family_history)
+        VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+    """, (
+        p["name"], p["father_name"], p["age"], p["gender"],
+        p["mobile"], p["mobile"], p["aadhar"], p["address"], p["village"], photo_path,
+        p["diet"], p["breakfast"], p["lunch"], p["dinner"],
+        p["tobacco"], p["alcohol"], p["activity_level"], p["family_history"]
+    ))
+    pid = cur.lastrowid
+    conn.commit(); conn.close()
+    kpis.invalidate_kpis()
+    return pid
+
+
 def _save_test_order(pid: int, test_name: str, priority: str, notes: str, ordered_by: Optional[int]):
     if not get_connection:
         return False
@@ -518,90 +431,40 @@ def _save_test_order(pid: int, test_name: str, priority: str, notes: str, ordere
         INSERT INTO lab_orders (fk_patient_id, ordered_at, test_name, priority, notes, ordered_by)
         VALUES (?, ?, ?, ?, ?, ?)
     """, (pid, datetime.utcnow().isoformat(), test_name, priority, notes, ordered_by))
-    conn.commit(); conn.close(); return True
+    conn.commit(); conn.close()
+    kpis.invalidate_kpis()
+    return True
 
 
 def _list_villages():
     """Return distinct non-empty villages (sorted)."""
     if not get_connection:
         return []
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("""
+    rows = query_cache.cached_query("""
         SELECT DISTINCT village
         FROM patients
         WHERE village IS NOT NULL AND TRIM(village) <> ''
         ORDER BY village COLLATE NOCASE
-    """)
-    rows = [r[0] for r in cur.fetchall()]
-    conn.close()
-    return rows
+    """, tables=("patients",))
+    return [r[0] for r in rows]
 
 
-def _upsert_stock(item_name: str, category: str, qty_delta: int, unit: str = "pcs"):
+def _upsert_stock(item_name: str, category: str, qty_delta: int, unit: str = "pcs", user_id: int | None = None):
+    """Receive (qty_delta > 0) or issue (< 0) stock through the ledger; issues stop at zero."""
     if not get_connection:
         return False
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("SELECT id, qty FROM stock WHERE item_name=?", (item_name,))
-    row = cur.fetchone()
-    if row:
-        new_qty = max(0, (row[1] or 0) + qty_delta)
-        cur.execute("UPDATE stock SET qty=?, unit=?, category=?, last_updated=? WHERE id=?",
-                    (new_qty, unit, category, datetime.utcnow().isoformat(), row[0]))
-    else:
-        cur.execute("INSERT INTO stock (item_name, category, qty, unit, last_updated) VALUES (?,?,?,?,?)",
-                    (item_name, category, max(0, qty_delta), unit, datetime.utcnow().isoformat()))
-    conn.commit(); conn.close(); return True
+    kind = "receipt" if qty_delta >= 0 else "issue"
+    stock.record_movement(item_name, kind, qty_delta, category=category, unit=unit, created_by=user_id)
+    kpis.invalidate_kpis()
+    return True
 
 
 def _get_stock():
     if not get_connection:
         return []
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("SELECT id, item_name, category, qty, unit, last_updated FROM stock ORDER BY item_name")
-    rows = cur.fetchall(); conn.close(); return rows
-
-
-def _logo_path():
-    for p in ("assets/Logo_upscaled.png", "static/Logo_upscaled.png", "Logo_upscaled.png"):
-        if Path(p).exists():
-            return p
-    return None
-    
-from pathlib import Path
-import streamlit as st
-
-import streamlit as st
-
-import streamlit as st
-
-def _logo_paths():
-    logos = []
-    candidates = [
-        # Mother Teresa logo
-        ("assets/Mother-Teresa.png", "Mother Teresa Hospital"),
-        ("static/Mother-Teresa.png", "Mother Teresa Hospital"),
-        ("Mother-Teresa.png", "Mother Teresa Hospital"),
-        ("Mother-Teresa.jpg", "Mother Teresa Hospital"),
-        ("assets/Mother-Teresa.jpg", "Mother Teresa Hospital"),
-        ("static/Mother-Teresa.jpg", "Mother Teresa Hospital"),
-
-        # Hands logo
-        ("assets/Hands.png", "Helping Hands"),
-        ("static/Hands.png", "Helping Hands"),
-        ("Hands.png", "Helping Hands"),
-        ("Hands.jpg", "Helping Hands"),
-        ("assets/Hands.jpg", "Helping Hands"),
-        ("static/Hands.jpg", "Helping Hands"),
-
-        # Kakatiya logo
-        ("assets/kakatiya helping hands society logo.png", "Kakatiya Helping Hands"),
-        ("static/kakatiya helping hands society logo.png", "Kakatiya Helping Hands"),
-        ("kakatiya helping hands society logo.png", "Kakatiya Helping Hands"),
-    ]
-    for path, label in candidates:
-        if Path(path).exists():
-            logos.append((path, label))
-    return logos
+    return query_cache.cached_query(
+        "SELECT id, item_name, category, qty, unit, last_updated FROM stock ORDER BY item_name", tables=("stock",)
+    )
 
 
 # =========================
@@ -724,25 +587,13 @@ def _bottom_nav():
 # =========================
 
 def render_health_agent_dashboard(user):
+    _init_run()
     _apply_theme()
     st.markdown('<div class="rmp-scope">', unsafe_allow_html=True)
 
-    from pathlib import Path
-
-    def _find_logo_file():
-        candidates = [
-            "static/images/Logo_upscaled.png",
-            "static/Logo_upscaled.png",
-            "assets/Logo_upscaled.png",
-            "Logo_upscaled.png",
-            "/mnt/data/Logo_upscaled.png",
-        ]
-        for p in candidates:
-            if Path(p).exists():
-                return p
-        return None
-
-    found_logo = _find_logo_file()
+    # Served as a static file the browser caches (tools/build_assets.py), not re-sent each rerun
+    logo = assets.picture_html("logo", alt="Mother Teresa Hospital", sizes="(max-width: 640px) 100vw, 640px",
+                               style="width:100%; height:auto;")
 
     # Layout: 3 equal columns so everything is centered properly
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -761,8 +612,8 @@ def render_health_agent_dashboard(user):
 
     # --- Center logo ---
     with col2:
-        if found_logo and Path(found_logo).exists():
-            st.image(found_logo, use_container_width=True, width=180)
+        if logo:
+            st.markdown(logo, unsafe_allow_html=True)
         else:
             st.info("Logo not found")
             
@@ -776,6 +627,8 @@ def render_health_agent_dashboard(user):
             for k in list(st.session_state.keys()):
                 if k not in keep:
                     del st.session_state[k]
+            auth.revoke_token(st.query_params.get(auth.SESSION_PARAM))
+            st.query_params.pop(auth.SESSION_PARAM, None)
             st.rerun()
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -869,11 +722,8 @@ def render_health_agent_dashboard(user):
             total_blood_sugar = _count_rows("blood_sugar_tests")
         except Exception:
             total_blood_sugar = 0
-        total_stock = 0
         try:
-            if get_connection:
-                rows = _get_stock()
-                total_stock = sum([(r[3] or 0) for r in rows])
+            total_stock = kpis.get_kpis()["stock_total"] if get_connection else 0
         except Exception:
             total_stock = 0
 
@@ -1056,34 +906,46 @@ def render_health_agent_dashboard(user):
                     elif not get_connection:
                         st.error("DB not available.")
                     else:
-                        # Save photo if provided (robust filename)
-                        photo_path = None
-                        if photo is not None:
-                            import os, time, secrets
-                            folder = "uploads/patient_photos"
-                            os.makedirs(folder, exist_ok=True)
-                            filename = f"{int(time.time())}_{secrets.token_hex(4)}.jpg"
-                            fullpath = os.path.join(folder, filename)
-                            with open(fullpath, "wb") as f:
-                                f.write(photo.getbuffer())
-                            photo_path = fullpath  # store relative path if preferred
-
-                        # Insert record
-                        conn = get_connection(); cur = conn.cursor()
-                        cur.execute("""
-                            INSERT INTO patients
-                            (name, father_name, age, gender, phone, mobile, aadhar, address, village, photo_path,
-                             diet, breakfast, lunch, dinner, tobacco, alcohol, activity_level, family_history)
-                            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-                        """, (
-                            name.strip(), father_name.strip(), age, gender,
-                            mobile.strip(), mobile.strip(), aadhar.strip(), address.strip(), village.strip(), photo_path,
-                            diet, breakfast.strip(), lunch.strip(), dinner.strip(),
-                            tobacco, alcohol, activity_level, family_history.strip()
-                        ))
-                        conn.commit(); conn.close()
-                        st.success(f"Patient '{name}' added.")
-        
+                        new_patient = {
+                            "name": name.strip(), "father_name": father_name.strip(), "age": age, "gender": gender,
+                            "mobile": mobile.strip(), "aadhar": aadhar.strip(), "address": address.strip(),
+                            "village": village.strip(), "photo": photo.getvalue() if photo is not None else None,
+                            "diet": diet, "breakfast": breakfast.strip(), "lunch": lunch.strip(), "dinner": dinner.strip(),
+                            "tobacco": tobacco, "alcohol": alcohol, "activity_level": activity_level,
+                            "family_history": family_history.strip(),
+                        }
+                        # Same person registered before (spelling variant, same mobile / aadhar)?
+                        matches = dedupe.find_duplicates(
+                            new_patient["name"], new_patient["father_name"], age, gender,
+                            new_patient["village"], new_patient["mobile"], new_patient["aadhar"],
+                        )
+                        if matches:
+                            st.session_state["pending_new_patient"] = {"patient": new_patient, "matches": matches}
+                        else:
+                            _register_patient(new_patient)
+                            st.success(f"Patient '{name}' added.")
+
+            pending = st.session_state.get("pending_new_patient")
+            if pending:
+                import pandas as pd
+                st.warning(f"'{pending['patient']['name']}' may already be registered. Check these before saving:")
+                df_dup = pd.DataFrame(pending["matches"])
+                df_dup["reasons"] = df_dup["reasons"].map(", ".join)
+                st.dataframe(
+                    df_dup[["id", "name", "father_name", "age", "gender", "village", "mobile", "score", "reasons"]],
+                    use_container_width=True, hide_index=True,
+                )
+                d1, d2 = st.columns(2)
+                with d1:
+                    if st.button("Save as a new patient anyway", key="dup_save_anyway"):
+                        _register_patient(pending["patient"])
+                        st.session_state.pop("pending_new_patient", None)
+                        st.success(f"Patient '{pending['patient']['name']}' added.")
+                with d2:
+                    if st.button("Don't save (already registered)", key="dup_cancel"):
+                        st.session_state.pop("pending_new_patient", None)
+                        st.rerun()
+
         # Patients Search 
         elif sub == "Patients_Search":
             if st.button("← Back to Patients", key="back_patients_search"):
@@ -1091,94 +953,17 @@ def render_health_agent_dashboard(user):
 
             st.subheader("🔍 Search Patients")
 
-            # ---- Load patients
-            rows = _load_patients()  # must return: [id, name, age, gender, mobile, aadhar, activity_level, village]
-            if not rows:
-                st.info("No patients found."); st.stop()
-
-            # ---------------- Village list (FIX) ----------------
-            # Build from the village column (index 7), not activity
-            villages = sorted({(r[7] or "").strip() for r in rows if r[7]})
-            q = st.text_input("Search by name/mobile/aadhar", "")
+            # ---- Filters run in SQL; only the visible page is fetched
+            villages = _list_villages()
+            q = st.text_input("Search by name/father/mobile/aadhar/village/address", "", help=SEARCH_HELP)
             village_filter = st.selectbox("Village", ["All"] + villages, index=0)
 
-            # ---- Fetch latest vitals + latest sugar per patient in one go
-            # We grab them per-patient via scalar subqueries (SQLite-friendly).
-            conn = get_connection(); cur = conn.cursor()
-            cur.execute("""
-                SELECT
-                    p.id, p.name, p.age, p.gender, p.mobile, p.aadhar,
-                    p.activity_level, p.village,
-
-                    -- Latest vitals
-                    (SELECT v.bp_sys FROM vitals v
-                       WHERE v.fk_patient_id = p.id
-                       ORDER BY v.recorded_at DESC, v.id DESC LIMIT 1)        AS bp_sys,
-                    (SELECT v.bp_dia FROM vitals v
-                       WHERE v.fk_patient_id = p.id
-                       ORDER BY v.recorded_at DESC, v.id DESC LIMIT 1)        AS bp_dia,
-                    (SELECT v.pulse FROM vitals v
-                       WHERE v.fk_patient_id = p.id
-                       ORDER BY v.recorded_at DESC, v.id DESC LIMIT 1)        AS pulse,
-
-                    -- Latest sugar
-                    (SELECT t.result_mg_dl FROM blood_sugar_tests t
-                       WHERE t.fk_patient_id = p.id
-                       ORDER BY t.taken_at DESC, t.id DESC LIMIT 1)           AS sugar,
-                    (SELECT t.test_type FROM blood_sugar_tests t
-                       WHERE t.fk_patient_id = p.id
-                       ORDER BY t.taken_at DESC, t.id DESC LIMIT 1)           AS sugar_type
-                FROM patients p
-                ORDER BY p.name COLLATE NOCASE
-            """)
-            enriched = cur.fetchall()
-            conn.close()
-
-            # ---- To DataFrame
-            import pandas as pd
-            df = pd.DataFrame(
-                enriched,
-                columns=[
-                    "ID","Name","Age","Gender","Mobile","Aadhar","Activity","Village",
-                    "BP Sys","BP Dia","Pulse","Sugar","Sugar Type"
-                ]
+            rows, next_cursor = _patient_page(
+                "ps", order="name", search=q, village=village_filter, with_latest=True, limit=100
             )
-
-            # ---------------- Risk computation (same thresholds as Health Profiles) ----------------
-            def compute_risk(bp_sys, bp_dia, pulse, sugar):
-                try:
-                    bs = float(bp_sys) if bp_sys is not None else None
-                    bd = float(bp_dia) if bp_dia is not None else None
-                    pu = float(pulse)  if pulse  is not None else None
-                    sg = float(sugar)  if sugar  is not None else None
-                except Exception:
-                    bs = bd = pu = sg = None
-
-                # Red: BP Sys >160 OR BP Dia >100 OR Pulse >120 OR Sugar(FBS proxy) >140
-                if (bs and bs > 160) or (bd and bd > 100) or (pu and pu > 120) or (sg and sg > 140):
-                    return "Red"
-                # Amber: Sys 140–160 OR Dia 90–100 OR Pulse 100–120 OR Sugar 110–140
-                if ((bs and 140 <= bs <= 160) or (bd and 90 <= bd <= 100) or
-                    (pu and 100 <= pu <= 120) or (sg and 110 <= sg <= 140)):
-                    return "Amber"
-                # Else Green
-                return "Green"
-
-            df["Risk"] = df.apply(lambda r: compute_risk(r["BP Sys"], r["BP Dia"], r["Pulse"], r["Sugar"]), axis=1)
-
-            # Optional: pretty badge look
-            def risk_badge(val):
-                if val == "Red":    return "🔴 Red"
-                if val == "Amber":  return "🟠 Amber"
-                return "🟢 Green"
-            df["Risk"] = df["Risk"].map(risk_badge)
-
-            # ---------------- Apply search/village filters ----------------
-            if q:
-                ql = q.lower()
-                df = df[df.apply(lambda r: ql in str(r.values).lower(), axis=1)]
-            if village_filter != "All":
-                df = df[df["Village"].fillna("").str.strip() == village_filter]
+            if not rows:
+                st.info("No patients found."); st.stop()
+            df = _search_patients_df(rows)
 
             # ---- Show table with Risk column
             st.dataframe(
@@ -1186,6 +971,7 @@ def render_health_agent_dashboard(user):
                     "BP Sys","BP Dia","Pulse","Sugar","Sugar Type","Risk"]],
                 use_container_width=True, hide_index=True
             )
+            _pager_nav("ps", next_cursor, len(rows))
 
             # ---- Quick “open profile” picker below the table
             ids = df["ID"].tolist()
@@ -1225,7 +1011,6 @@ def render_health_agent_dashboard(user):
 
     elif section == "Record Vitals":
         st.subheader("Record Vitals")
-        _ensure_followup_columns()  # makes sure frequency_days & sent_to_doctor exist
 
         # ---- ensure state keys exist with sensible defaults ----
         defaults = {
@@ -1249,20 +1034,11 @@ def render_health_agent_dashboard(user):
             st.caption(f"Villages: {len(villages)}")
 
         # ---- Step 2: Patient ----
-        all_rows = _load_patients()
-        rows = (
-            [r for r in all_rows if str(r[7] or "").strip().casefold() == village_choice.strip().casefold()]
-            if village_choice != "All" else all_rows
-        )
-        if not rows:
-            st.info("No patients found.")
+        fk_patient_id = _patient_picker("rv", village=village_choice)
+        if fk_patient_id is None:
             _bottom_nav()
             st.stop()
 
-        pid_map = {f"#{r[0]} · {r[1]} ({r[3] or ''}) — {r[7] or '—'}": r[0] for r in rows}
-        pid_label = st.selectbox("Patient", list(pid_map.keys()))
-        fk_patient_id = pid_map[pid_label]
-
         # ---- Inputs ----
         c1, c2, c3 = st.columns(3)
 
@@ -1354,19 +1130,6 @@ def render_health_agent_dashboard(user):
         # ---- Recent Vitals (with Send to Doctor) ----
         st.markdown("### Recent Vitals")
 
-        # Check whether 'sent_to_doctor' exists; show a hint if not
-        def _vitals_has_sent_flag() -> bool:
-            try:
-                conn = get_connection(); cur = conn.cursor()
-                cur.execute("PRAGMA table_info('vitals');")
-                cols = [r[1] for r in cur.fetchall()]   # r[1] is column name
-                conn.close()
-                return "sent_to_doctor" in {c.lower() for c in cols}
-            except Exception:
-                return False
-
-        has_sent_flag = _vitals_has_sent_flag()
-
         show_unsent_only = st.toggle(
             "Show only unsent",
             value=True,
@@ -1374,45 +1137,17 @@ def render_health_agent_dashboard(user):
             help="Show only vitals that have not been sent to doctor yet."
         )
 
-        # Build SELECT – includes frequency_days (for Next record)
-        select_cols = """
-            v.id, p.name, v.bp_sys, v.bp_dia, v.pulse, v.temperature,
-            v.spo2, v.height_cm, v.weight_kg, v.waist_cm, v.bmi,
-            v.notes, v.recorded_at, v.frequency_days
-        """
-        if has_sent_flag:
-            select_cols = select_cols + ", v.sent_to_doctor"
-
-        base_sql = f"""
-            SELECT {select_cols}
-            FROM vitals v
-            JOIN patients p ON p.id = v.fk_patient_id
-        """
-
-        where_clause = ""
-        if has_sent_flag and show_unsent_only:
-            where_clause = " WHERE v.sent_to_doctor = 0 "
-
-        sql = base_sql + where_clause + " ORDER BY v.id DESC LIMIT 100"
-
-        conn = get_connection(); cur = conn.cursor()
-        try:
-            cur.execute(sql)
-            vitals_rows = cur.fetchall()
-        finally:
-            conn.close()
+        vitals_rows = _recent_vitals(show_unsent_only)
 
         if vitals_rows:
             import pandas as pd
             from datetime import timedelta
 
-            # Columns list depends on whether we have sent flag
-            base_cols = [
+            cols = [
                 "ID", "Patient", "BP Sys", "BP Dia", "Pulse", "Temp (°F)",
                 "SpO₂", "Height (cm)", "Weight (kg)", "Waist (cm)", "BMI",
-                "Notes", "Recorded At", "frequency_days"
+                "Notes", "Recorded At", "frequency_days", "Sent to Dr"
             ]
-            cols = base_cols + (["Sent to Dr"] if has_sent_flag else [])
 
             df_vitals = pd.DataFrame(vitals_rows, columns=cols)
 
@@ -1452,8 +1187,8 @@ def render_health_agent_dashboard(user):
             view_cols = [
                 "ID", "Patient", "BP Sys", "BP Dia", "Pulse", "Temp (°F)", "SpO₂",
                 "Height (cm)", "Weight (kg)", "Waist (cm)", "BMI",
-                "Notes", "Recorded At", "Next record"
-            ] + (["Sent to Dr"] if has_sent_flag else [])
+                "Notes", "Recorded At", "Next record", "Sent to Dr"
+            ]
             df_view = df_vitals[view_cols].copy()
 
             # Add a selectable column
@@ -1462,58 +1197,49 @@ def render_health_agent_dashboard(user):
             # Configure disabled columns (everything except the Select)
             disabled_cols = [c for c in df_view.columns if c != "Select"]
 
-            if not has_sent_flag:
-                st.info(
-                    "To enable 'Send to doctor' for vitals, add "
-                    "`sent_to_doctor INTEGER DEFAULT 0` to the `vitals` table. "
-                    "Migration runs via _ensure_followup_columns()."
-                )
-
             edited = st.data_editor(
                 df_view,
                 hide_index=True,
                 use_container_width=True,
                 column_config={
                     "Select": st.column_config.CheckboxColumn("Select"),
-                    **({"Sent to Dr": st.column_config.CheckboxColumn("Sent to Dr", disabled=True)}
-                       if has_sent_flag else {})
+                    "Sent to Dr": st.column_config.CheckboxColumn("Sent to Dr", disabled=True),
                 },
                 disabled=disabled_cols,
                 key="recent_vitals_editor",
             )
 
-            if has_sent_flag:
-                # Determine selected rows that are eligible to send (not already sent)
-                selected_df = edited[edited["Select"] == True]
-                eligible_ids = selected_df.loc[
-                    selected_df.get("Sent to Dr", False) != True, "ID"
-                ].astype(int).tolist()
-                already_sent_ids = selected_df.loc[
-                    selected_df.get("Sent to Dr", False) == True, "ID"
-                ].astype(int).tolist()
-
-                # Right aligned action button
-                spacer, right = st.columns([6, 1])
-                with right:
-                    disabled_btn = (len(eligible_ids) == 0)
-                    if st.button("📨 Send to doctor", key="btn_vitals_send_bulk", disabled=disabled_btn):
-                        placeholders = ",".join(["?"] * len(eligible_ids))
-                        try:
-                            conn = get_connection(); cur = conn.cursor()
-                            cur.execute(
-                                f"UPDATE vitals SET sent_to_doctor = 1 WHERE id IN ({placeholders})",
-                                eligible_ids
-                            )
-                            conn.commit(); conn.close()
-                            st.success(f"Sent {len(eligible_ids)} record(s) to doctor.")
-                            if already_sent_ids:
-                                st.info(f"Ignored already-sent ID(s): {', '.join(map(str, already_sent_ids))}")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Failed to send: {e}")
-
-                if already_sent_ids and len(eligible_ids) == 0:
-                    st.caption("Some selected rows are already sent; they can’t be sent again.")
+            # Determine selected rows that are eligible to send (not already sent)
+            selected_df = edited[edited["Select"] == True]
+            eligible_ids = selected_df.loc[
+                selected_df.get("Sent to Dr", False) != True, "ID"
+            ].astype(int).tolist()
+            already_sent_ids = selected_df.loc[
+                selected_df.get("Sent to Dr", False) == True, "ID"
+            ].astype(int).tolist()
+
+            # Right aligned action button
+            spacer, right = st.columns([6, 1])
+            with right:
+                disabled_btn = (len(eligible_ids) == 0)
+                if st.button("📨 Send to doctor", key="btn_vitals_send_bulk", disabled=disabled_btn):
+                    placeholders = ",".join(["?"] * len(eligible_ids))
+                    try:
+                        conn = get_connection(); cur = conn.cursor()
+                        cur.execute(
+                            f"UPDATE vitals SET sent_to_doctor = 1 WHERE id IN ({placeholders})",
+                            eligible_ids
+                        )
+                        conn.commit(); conn.close()
+                        st.success(f"Sent {len(eligible_ids)} record(s) to doctor.")
+                        if already_sent_ids:
+                            st.info(f"Ignored already-sent ID(s): {', '.join(map(str, already_sent_ids))}")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Failed to send: {e}")
+
+            if already_sent_ids and len(eligible_ids) == 0:
+                st.caption("Some selected rows are already sent; they can’t be sent again.")
         else:
             st.info("No vitals recorded yet.")
 
@@ -1521,7 +1247,6 @@ def render_health_agent_dashboard(user):
     
     elif section == "Sugar Blood Test":
         st.subheader("Sugar Blood Test")
-        _ensure_followup_columns()
 
         # --- init state (so disabled buttons work on first render) ---
         ss_defaults = {
@@ -1556,21 +1281,10 @@ def render_health_agent_dashboard(user):
         with v2:
             st.write(""); st.caption(f"Villages: {len(villages)}")
 
-        all_rows = _load_patients()  # includes village at index 7
-        if st.session_state["s_village"] != "All":
-            rows = [r for r in all_rows if str(r[7] or "").strip().casefold()
-                    == st.session_state["s_village"].strip().casefold()]
-        else:
-            rows = all_rows
-
-        if not rows:
-            st.info("No patients for the selected village.")
+        fk_patient_id = _patient_picker("sg", village=st.session_state["s_village"])
+        if fk_patient_id is None:
             _bottom_nav(); st.markdown("</div>", unsafe_allow_html=True); st.stop()
 
-        pid_map = {f"#{r[0]} · {r[1]} ({r[3] or ''}) — {r[7] or '—'}": r[0] for r in rows}
-        patient_label = st.selectbox("Patient", list(pid_map.keys()))
-        fk_patient_id = pid_map[patient_label]
-
         # # --- safe defaults for result and follow-up (do this before widgets) ---
         # if "s_result" not in st.session_state:
             # st.session_state["s_result"] = 0.0
@@ -1737,20 +1451,7 @@ def render_health_agent_dashboard(user):
             help="Show only tests that have not been sent to doctor yet."
         )
 
-        tests_rows = []
-        if get_connection:
-            conn = get_connection(); cur = conn.cursor()
-            base_sql = """
-                SELECT t.id, p.name, t.test_type, t.result_mg_dl, t.last_meal_time, t.sent_to_doctor, t.taken_at,t.frequency_days
-                FROM blood_sugar_tests t
-                JOIN patients p ON p.id = t.fk_patient_id
-            """
-            if show_unsent_only:
-                cur.execute(base_sql + " WHERE t.sent_to_doctor = 0 ORDER BY t.id DESC LIMIT 100")
-            else:
-                cur.execute(base_sql + " ORDER BY t.id DESC LIMIT 100")
-            tests_rows = cur.fetchall()
-            conn.close()
+        tests_rows = _recent_sugar_tests(show_unsent_only)
 
         if tests_rows:
             import pandas as pd
@@ -1859,46 +1560,10 @@ def render_health_agent_dashboard(user):
     elif section == "Messages":
         st.markdown("### 💬 Messages")
 
-        _ensure_messages_table()
-
-        conn = get_connection(); cur = conn.cursor()
-        rows = cur.execute(
-            "SELECT * FROM messages ORDER BY created_at ASC LIMIT 100"
-        ).fetchall()
-        conn.close()
-
-        # --- Chat Display ---
+        # --- Chat Display (newest page, then only what arrives; see _message_feed) ---
         st.subheader("Chat with Doctor/Admin")
-        if rows:
-            for r in rows:  # show oldest → newest
-                sender = r["sender_role"]
-                msg = r["message"]
-                ts = r["created_at"]
-
-                if sender == "RMP":
-                    align = "right"
-                    color = "#d1f7c4"  # light green
-                elif sender in ("Doctor", "Admin"):
-                    align = "left"
-                    color = "#f0f2f6"  # light gray
-                else:  # System alerts
-                    align = "center"
-                    color = "#e6f0ff"
-
-                st.markdown(
-                    f"""
-                    <div style="text-align:{align}; margin:6px;">
-                        <div style="display:inline-block; background:{color};
-                                    padding:8px 12px; border-radius:10px; max-width:70%;">
-                            <b>{sender}:</b> {msg}<br>
-                            <span style="font-size:10px; color:gray;">{ts}</span>
-                        </div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True,
-                )
-        else:
-            st.info("No messages yet.")
+        st.selectbox("Conversation", ["All", "Doctor", "Admin", "System"], key="msg_thread")
+        _message_feed("RMP")
 
         # --- Send New Message ---
         with st.form("send_msg", clear_on_submit=True):
@@ -1906,35 +1571,27 @@ def render_health_agent_dashboard(user):
             recipient = st.selectbox("Send To", ["Doctor", "Admin"])
             submitted = st.form_submit_button("Send")
             if submitted and new_msg.strip():
-                conn = get_connection(); cur = conn.cursor()
-                
-                cur.execute(
-                    "INSERT INTO messages (sender_role, recipient_role, message, created_at) VALUES (?,?,?,?)",
-                    ("RMP", recipient, new_msg.strip(), datetime.utcnow().isoformat())
-                )
-                conn.commit(); conn.close()
+                messages.send("RMP", recipient, new_msg.strip())
                 st.rerun()
 
         st.markdown("---")
 
-        # --- Stock Alerts (system messages) ---
-        st.subheader("📦 Stock Alerts")
-        conn = get_connection(); cur = conn.cursor()
-        stock_alerts = cur.execute(
-            "SELECT * FROM stock_requests WHERE status!='Pending' ORDER BY requested_at DESC LIMIT 20"
-        ).fetchall()
-        conn.close()
-
-        if stock_alerts:
-            for s in stock_alerts:
-                st.markdown(
-                    f"""
-                    ⚠️ <b>{s['item_name']}</b> request of {s['qty']} units 
-                    → <b>{s['status']}</b> (requested at {s['requested_at']})
-                    """, unsafe_allow_html=True
-                )
-        else:
-            st.info("No stock alerts yet.")
+        # --- Stock Alerts (stock_alerts rows, not message text) ---
+        render_stock_alerts(user)
+
+        # --- Decisions on this agent's stock requests ---
+        import html
+        st.markdown("#### Your request decisions")
+        decided = stock.decided_requests(user.get("id")) if get_connection else []
+        for r in decided:
+            icon = "✅" if r["status"] == "Approved" else "❌"
+            st.markdown(
+                f"{icon} <b>{html.escape(r['item_name'] or '')}</b> request of {r['qty']} units "
+                f"→ <b>{html.escape(r['status'] or '')}</b> (requested at {r['requested_at']})",
+                unsafe_allow_html=True,
+            )
+        if not decided:
+            st.info("No approved or rejected requests yet.")
 
 
     # =========================
@@ -1943,13 +1600,6 @@ def render_health_agent_dashboard(user):
     elif section == "Reports":
         st.markdown("### 📄 Reports")
 
-        conn = get_connection(); cur = conn.cursor()
-        patients = cur.execute("SELECT id, name, gender FROM patients ORDER BY id DESC").fetchall()
-        conn.close()
-
-        if not patients:
-            st.info("No patients available.")
-            return
 
         # --- Header row: Patient | Doctor Advice ---
         hcol1, hcol2 = st.columns([1, 2])
@@ -1962,12 +1612,9 @@ def render_health_agent_dashboard(user):
         col1, col2 = st.columns([1, 2], vertical_alignment="center")
 
         with col1:
-            pid = st.selectbox(
-                "",  # keep clean alignment
-                [p["id"] for p in patients],
-                format_func=lambda i: f"#{i} · {next(p['name'] for p in patients if p['id']==i)} ({next(p['gender'] for p in patients if p['id']==i)})",
-                key="reports_patient_select"
-            )
+            pid = _patient_picker("rp")
+        if pid is None:
+            return
 
         with col2:
             # Fetch advice
@@ -2114,6 +1761,7 @@ def _save_blood_sugar(
         ))
         conn.commit()
         conn.close()
+        kpis.invalidate_kpis()
         return True
     except Exception:
         # Make debugging visible by re-raising the original exception.
@@ -2126,66 +1774,6 @@ def _save_blood_sugar(
         raise
 
 
-def _ensure_stock_requests_table():
-    """Requests raised by RMP to Admin for inventory items."""
-    if not get_connection:
-        return
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS stock_requests (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            item_name TEXT NOT NULL,
-            qty INTEGER NOT NULL CHECK(qty >= 0),
-            requested_by INTEGER,
-            requested_at TEXT NOT NULL,
-            status TEXT DEFAULT 'Pending'   -- Pending / Approved / Rejected
-        )
-    """)
-    conn.commit(); conn.close()
-    
-
-#Table for doctor advice
-def _ensure_doctor_advice_table():
-    """Doctor Advice"""
-    if not get_connection:
-        return
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("""    
-        CREATE TABLE IF NOT EXISTS doctor_advice (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            patient_id INTEGER NOT NULL,
-            advice TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY(patient_id) REFERENCES patients(id)
-        );
-    """)
-    conn.commit(); conn.close()
-    
-#Table for medications
-def _ensure_medications_table():
-    """Medications"""
-    if not get_connection:
-        return
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("""  
-        CREATE TABLE IF NOT EXISTS medications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            patient_id INTEGER NOT NULL,
-            drug_name TEXT NOT NULL,
-            dose TEXT,
-            frequency TEXT,
-            duration TEXT,
-            referral_facility TEXT,
-            follow_up_days INTEGER,
-            reason TEXT,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY(patient_id) REFERENCES patients(id)
-        );
-    """)
-    conn.commit(); conn.close()
-    
-
-
 def _save_stock_requests(requests: list[tuple[str, int]], user_id: int | None) -> bool:
     """requests = [(item_name, qty), ...]"""
     if not get_connection or not requests:
@@ -2217,37 +1805,14 @@ def _low_stock_alert_df(items: list[str], threshold: int = 5):
             "Low? (≤thr)": [False]*len(items),
         })
 
-    conn = get_connection(); cur = conn.cursor()
-
-    # Current stock
-    cur.execute("SELECT item_name, COALESCE(qty,0) FROM stock")
-    stock_map = {row[0]: int(row[1] or 0) for row in cur.fetchall()}
-
-    # Requests (Pending)
-    cur.execute("""
-        SELECT item_name, COALESCE(SUM(qty),0)
-        FROM stock_requests
-        WHERE status='Pending'
-        GROUP BY item_name
-    """)
-    req_map = {row[0]: int(row[1] or 0) for row in cur.fetchall()}
-
-    # Received (Approved)
-    cur.execute("""
-        SELECT item_name, COALESCE(SUM(qty),0)
-        FROM stock_requests
-        WHERE status='Approved'
-        GROUP BY item_name
-    """)
-    rec_map = {row[0]: int(row[1] or 0) for row in cur.fetchall()}
-
-    conn.close()
+    # Current, pending and approved quantities: latest ledger snapshot + the movements since
+    levels = stock.balances()
+    empty = {"on_hand": 0, "pending": 0, "received": 0}
 
     rows = []
     for name in items:
-        cur_qty = stock_map.get(name, 0)
-        req_qty = req_map.get(name, 0)
-        rec_qty = rec_map.get(name, 0)
+        level = levels.get(name, empty)
+        cur_qty, req_qty, rec_qty = level["on_hand"], level["pending"], level["received"]
         total   = cur_qty + rec_qty
         rows.append([name, cur_qty, req_qty, rec_qty, total, total <= threshold])
 
@@ -2328,110 +1893,189 @@ def _render_low_stock_alert():
     csv = df_show.to_csv(index=False).encode("utf-8")
     st.download_button("Download CSV", csv, file_name="low_stock_alert.csv", mime="text/csv", key="dl_low_stock_alert")
 
-def render_stock_alerts():
-    """Show stock alerts merged from messages table (System messages)."""
-    if not get_connection:
+    with st.expander("Stock movements (latest 100)"):
+        import pandas as pd
+        moves = stock.history(limit=100)
+        if moves:
+            st.dataframe(pd.DataFrame(
+                [tuple(r) for r in moves],
+                columns=["ID", "At", "Item", "Kind", "On hand", "Pending", "Received", "Request", "By", "Note"],
+            ), use_container_width=True, hide_index=True)
+        else:
+            st.info("No stock movements yet.")
+
+# Chat bubble placement and colour per sender; anyone else (System alerts) is centred
+_BUBBLES = {"RMP": ("right", "#d1f7c4"), "Doctor": ("left", "#f0f2f6"), "Admin": ("left", "#f0f2f6")}
+# Messages kept on screen; older ones are dropped (and reloadable) as new ones arrive
+_FEED_KEEP = 4 * messages.FEED_PAGE
+
+
+def _message_html(r) -> str:
+    import html
+    align, color = _BUBBLES.get(r["sender_role"], ("center", "#e6f0ff"))
+    return f"""
+        <div style="text-align:{align}; margin:6px;">
+            <div style="display:inline-block; background:{color};
+                        padding:8px 12px; border-radius:10px; max-width:70%;">
+                <b>{html.escape(str(r["sender_role"]))}:</b> {html.escape(str(r["message"]))}<br>
+                <span style="font-size:10px; color:gray;">{html.escape(str(r["created_at"]))}</span>
+            </div>
+        </div>"""
+
+
+@st.fragment(run_every=messages.POLL_SECS)
+def _message_feed(role: str):
+    """
+    The role's conversation feed (services.messages), re-run on its own every
+    POLL_SECS: the first run loads the newest page, later runs only fetch
+    messages after the newest one held in session state.
+    """
+    thread = st.session_state.get("msg_thread", "All")
+    with_role = None if thread == "All" else thread
+    feed = st.session_state.get("msg_feed")
+    if not feed or feed["key"] != (role, thread):
+        rows, older = messages.tail(role, with_role=with_role)
+        feed = st.session_state["msg_feed"] = {"key": (role, thread), "rows": list(rows), "older": older}
+    else:
+        new = messages.since(role, feed["rows"][-1]["id"] if feed["rows"] else 0, with_role=with_role)
+        if new:
+            feed["rows"].extend(new)
+            if len(feed["rows"]) > _FEED_KEEP:
+                feed["rows"] = feed["rows"][-_FEED_KEEP:]
+                feed["older"] = feed["rows"][0]["id"]
+
+    if feed["older"] is not None and st.button("⬆ Load older messages", key="msg_older"):
+        rows, feed["older"] = messages.tail(role, with_role=with_role, before=feed["older"])
+        feed["rows"][:0] = rows
+
+    if not feed["rows"]:
+        st.info("No messages yet.")
         return
-    conn = get_connection(); cur = conn.cursor()
+    # One markdown block for the whole conversation
+    st.markdown("".join(_message_html(r) for r in feed["rows"]), unsafe_allow_html=True)
+    st.caption(f"{len(feed['rows'])} messages · new ones appear within {messages.POLL_SECS:g}s")
 
-    # Get only system-generated stock alerts
-    cur.execute("""
-        SELECT message, created_at
-        FROM messages
-        WHERE sender_role = 'System'
-          AND message LIKE 'Stock alert:%'
-        ORDER BY created_at DESC
-    """)
-    alerts = cur.fetchall()
-    conn.close()
 
+def render_stock_alerts(user=None):
+    """Open stock alerts (services.stock, migration 0014), worst first by count, newest first in the list."""
     st.subheader("📦 Stock Alerts")
+    if not get_connection:
+        return
+
+    counts = stock.alert_counts()
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Out of stock", counts["out"])
+    c2.metric("Critical (≤2)", counts["critical"])
+    c3.metric("Low (≤5)", counts["low"])
+
+    show_all = st.toggle("Show acknowledged too", value=False, key="stock_alerts_all")
+    alerts = stock.open_alerts(include_acknowledged=show_all)
     if not alerts:
-        st.info("No stock alerts yet.")
+        st.info("No open stock alerts." if not show_all else "No stock alerts yet.")
         return
 
+    style = {"out": (st.error, "❌"), "critical": (st.warning, "⚠️"), "low": (st.info, "ℹ️")}
     for a in alerts:
-        msg = a["message"]
-        created_at = a["created_at"]
-
-        # Extract quantity if present
-        qty = None
-        for token in msg.split():
-            if token.isdigit():
-                qty = int(token); break
-
-        # Color coding
-        if "Out of stock" in msg or (qty is not None and qty == 0):
-            st.error(f"❌ {msg}\n\n🕒 {created_at}")
-        elif qty is not None and qty <= 2:
-            st.warning(f"⚠️ {msg}\n\n🕒 {created_at}")
-        elif qty is not None and qty <= 5:
-            st.info(f"ℹ️ {msg}\n\n🕒 {created_at}")
+        box, icon = style.get(a["severity"], (st.info, "ℹ️"))
+        if a["note"]:
+            text = a["note"]
+        elif a["severity"] == "out":
+            text = f"{a['item_name']}: out of stock"
         else:
-            st.success(f"✅ {msg}\n\n🕒 {created_at}")
+            text = f"{a['item_name']}: {a['qty']} left"
+        done = f" · acknowledged {a['acknowledged_at']}" if a["acknowledged"] else ""
+        c_msg, c_btn = st.columns([6, 1])
+        with c_msg:
+            box(f"{icon} {text}\n\n🕒 {a['created_at']}{done}")
+        with c_btn:
+            if not a["acknowledged"] and st.button("Acknowledge", key=f"ack_alert_{a['id']}"):
+                stock.acknowledge_alerts([a["id"]], (user or {}).get("id")); st.rerun()
 
+    open_ids = [a["id"] for a in alerts if not a["acknowledged"]]
+    if len(open_ids) > 1 and st.button("Acknowledge all shown", key="ack_alerts_all"):
+        stock.acknowledge_alerts(open_ids, (user or {}).get("id")); st.rerun()
 
 
-def render_pharmacy():
-    st.subheader("💊 Pharmacy")
 
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("""
-        SELECT id, drug_name, supplied, distributed, amount_due, amount_collected
-        FROM pharmacy
-    """)
-    rows = cur.fetchall()
-    conn.close()
-
-    # Header row
-    header_cols = st.columns([2, 1, 1, 1, 1, 1, 1])
-    headers = ["Drug", "Supplied", "Distributed", "Balance", "Amount Due", "Collected", "Balance Amount"]
-    for col, head in zip(header_cols, headers):
-        col.markdown(f"**{head}**")
-
-    # Data rows
-    for rid, drug, supplied, distributed, amt_due, amt_collected in rows:
-        balance = supplied - distributed
-        balance_amt = amt_due - amt_collected
-
-        cols = st.columns([2, 1, 1, 1, 1, 1, 1])
-
-        # Drug name
-        cols[0].write(drug)
-
-        # Supplied
-        cols[1].write(supplied)
+def render_pharmacy():
+    """
+    One editable table per page of drugs (services.pharmacy). Edits stay in the
+    browser until "Save changes"; then only the changed rows are written, in one
+    transaction.
+    """
+    import pandas as pd
 
-        # Distributed (editable integer)
-        new_distributed = cols[2].number_input(
-            "", min_value=0, value=int(distributed), step=1, key=f"dist_{rid}", label_visibility="collapsed"
-        )
+    st.subheader("💊 Pharmacy")
+    if not get_connection:
+        st.error("Database not available.")
+        return
 
-        # Balance
-        cols[3].write(supplied - new_distributed)
+    q = st.text_input("Find drug", key="pharm_q", placeholder="Part of the drug name").strip()
+    state = st.session_state.setdefault("pharm_pager", {"filters": None, "cursors": [None]})
+    if state["filters"] != {"search": q}:
+        state["filters"], state["cursors"] = {"search": q}, [None]
+    rows, next_cursor = pharmacy.page_drugs(after=state["cursors"][-1], search=q)
 
-        # Amount Due
-        cols[4].write(float(amt_due))
+    flash = st.session_state.pop("pharm_flash", None)
+    if flash:
+        (st.warning if flash[1] else st.success)(flash[0])
+    if not rows:
+        st.info("No drugs found.")
+        return
 
-        # Collected (editable float)
-        new_amt_collected = cols[5].number_input(
-            "", min_value=0.0, value=float(amt_collected), step=1.0, key=f"amt_{rid}", label_visibility="collapsed"
+    base = pd.DataFrame([tuple(r) for r in rows], columns=[
+        "ID", "Drug", "Supplied", "Distributed", "Amount Due", "Collected"
+    ]).set_index("ID")
+    base["Balance"] = base["Supplied"] - base["Distributed"]
+    base["Balance Amount"] = base["Amount Due"] - base["Collected"]
+    base = base[["Drug", "Supplied", "Distributed", "Balance", "Amount Due", "Collected", "Balance Amount"]]
+
+    # A new editor (and no leftover edits) per page, search and save
+    editor_key = f"pharm_editor_{len(state['cursors'])}_{q}_{st.session_state.get('pharm_saves', 0)}"
+    with st.form("pharm_form", border=False):
+        edited = st.data_editor(
+            base,
+            key=editor_key,
+            hide_index=True,
+            use_container_width=True,
+            num_rows="fixed",
+            disabled=["Drug", "Supplied", "Balance", "Amount Due", "Balance Amount"],
+            column_config={
+                "Distributed": st.column_config.NumberColumn("Distributed", min_value=0, step=1, format="%d",
+                                                             required=True),
+                "Collected": st.column_config.NumberColumn("Collected", min_value=0.0, step=1.0, format="%.2f",
+                                                           required=True),
+                "Amount Due": st.column_config.NumberColumn("Amount Due", format="%.2f"),
+                "Balance Amount": st.column_config.NumberColumn("Balance Amount", format="%.2f"),
+            },
         )
+        save = st.form_submit_button("💾 Save changes", type="primary")
+    st.caption("Balances are recalculated when the changes are saved.")
+
+    if save:
+        edited = edited.fillna({"Distributed": base["Distributed"], "Collected": base["Collected"]})
+        changed = (edited["Distributed"] != base["Distributed"]) | (edited["Collected"] != base["Collected"])
+        changes = [
+            {"id": rid, "distributed": int(edited.at[rid, "Distributed"]),
+             "amount_collected": float(edited.at[rid, "Collected"]),
+             "old_distributed": int(base.at[rid, "Distributed"]),
+             "old_amount_collected": float(base.at[rid, "Collected"])}
+            for rid in base.index[changed]
+        ]
+        if not changes:
+            st.info("No changes to save.")
+        else:
+            saved, conflicts = pharmacy.save_changes(changes)
+            msg = f"Saved {len(saved)} drug(s)."
+            if conflicts:
+                names = ", ".join(base.loc[conflicts, "Drug"].astype(str))
+                msg += f" Not saved, changed by someone else meanwhile: {names}. Their current values are shown."
+            st.session_state["pharm_flash"] = (msg, bool(conflicts))
+            st.session_state["pharm_saves"] = st.session_state.get("pharm_saves", 0) + 1
+            st.rerun()
 
-        # Balance Amount
-        cols[6].write(float(amt_due - new_amt_collected))
+    _pager_nav("pharm", next_cursor, len(rows), noun="drugs")
 
-        # If updated → save to DB
-        if new_distributed != distributed or new_amt_collected != amt_collected:
-            conn = get_connection(); cur = conn.cursor()
-            cur.execute("""
-                UPDATE pharmacy
-                SET distributed=?, amount_collected=?
-                WHERE id=?
-            """, (new_distributed, new_amt_collected, rid))
-            conn.commit(); conn.close()
-
-import pandas as pd
 import streamlit as st
 
 # =========================
@@ -2443,7 +2087,7 @@ def render_health_profiles():
     - Filters row: Search | Risk | Select Patient  (Select Patient includes "All patients")
     - Results table for the current filter set
     - Health Metrics chart controlled by: Select metrics + Group by (single instance)
-      * When Select Patient == "All patients", the chart overlays all filtered patients
+      * When Select Patient == "All patients", the chart overlays the patients on the current page
       * Otherwise it shows the selected patient's metrics
     """
     import pandas as pd
@@ -2453,127 +2097,44 @@ def render_health_profiles():
         st.error("Database not available.")
         return
 
-    # ---------- Load patients ----------
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("SELECT id, name, age, gender, COALESCE(mobile, phone) AS mobile, aadhar FROM patients ORDER BY name")
-    patients = cur.fetchall()
-    conn.close()
-
-    if not patients:
-        st.info("No patients found.")
-        return
-
-    # ---------- Helpers ----------
-    def _latest_vitals_for(pid: int):
-        """Return (date, bp_sys, bp_dia, pulse, temp) or None row if missing."""
-        conn = get_connection(); c = conn.cursor()
-        c.execute("""
-            SELECT recorded_at, bp_sys, bp_dia, pulse, temperature
-            FROM vitals WHERE fk_patient_id=?
-            ORDER BY recorded_at DESC LIMIT 1
-        """, (pid,))
-        row = c.fetchone()
-        conn.close()
-        return row
-
-    def _latest_sugar_for(pid: int):
-        """Prefer latest FBS; otherwise latest of any type. Return (date, test_type, value) or None."""
-        conn = get_connection(); c = conn.cursor()
-        # latest FBS first
-        c.execute("""
-            SELECT taken_at, test_type, result_mg_dl
-            FROM blood_sugar_tests
-            WHERE fk_patient_id=? AND test_type='FBS'
-            ORDER BY taken_at DESC LIMIT 1
-        """, (pid,))
-        row = c.fetchone()
-        if not row:
-            c = get_connection().cursor()
-            c.execute("""
-                SELECT taken_at, test_type, result_mg_dl
-                FROM blood_sugar_tests
-                WHERE fk_patient_id=?
-                ORDER BY taken_at DESC LIMIT 1
-            """, (pid,))
-            row = c.fetchone()
-        conn.close()
-        return row
-
-    def _risk_label(pid: int) -> str:
-        """
-        🔴 Red:    BP Sys >160 or BP Dia >100 or Pulse >120 or FBS >140
-        🟠 Amber:  BP Sys 140–160 or BP Dia 90–100 or Pulse 100–120 or FBS 110–140
-        🟢 Green:  otherwise / no data
-        """
-        v = _latest_vitals_for(pid)
-        s = _latest_sugar_for(pid)
-        bp_sys = (v[1] if v else None) or 0
-        bp_dia = (v[2] if v else None) or 0
-        pulse  = (v[3] if v else None) or 0
-        fbs = 0
-        if s and s[1] == "FBS" and s[2] is not None:
-            fbs = float(s[2])
-
-        # Red
-        if bp_sys > 160 or bp_dia > 100 or pulse > 120 or fbs > 140:
-            return "Red"
-        # Amber
-        if (140 <= bp_sys <= 160) or (90 <= bp_dia <= 100) or (100 <= pulse <= 120) or (110 <= fbs <= 140):
-            return "Amber"
-        # Green (default)
-        return "Green"
-
     # ---------- Top filters: Search | Risk | Select Patient ----------
     col1, col2, col3 = st.columns([2, 1, 2])
     with col1:
-        q = st.text_input("Search (name / mobile / aadhar)", key="hp_search").strip().lower()
+        q = st.text_input("Search (name / mobile / aadhar / village)", key="hp_search", help=SEARCH_HELP).strip()
     with col2:
         risk_choice = st.selectbox("Risk level", ["All", "Red", "Amber", "Green"], key="hp_risk")
+
+    # Filters run in SQL; only the visible page is fetched
+    filtered, next_cursor = _patient_page("hp", order="name", search=q, risk_level=risk_choice, with_latest=True)
+    if not filtered:
+        st.info("No patients found.")
+        return
+
     with col3:
-        # Build labels for dropdown (with “All patients” on top)
-        options = ["All patients"]
-        label_to_pid = {}
-        for p in patients:
-            pid, name, age, gender, mobile, aadhar = p
-            label = f"#{pid} · {name} ({gender}, {age} yrs)"
-            label_to_pid[label] = pid
-            options.append(label)
-        sel_label = st.selectbox("Select Patient", options, index=0, key="hp_patient_select")
-
-    # ---------- Apply filters for table ----------
-    filtered = patients
-    if q:
-        filtered = [p for p in filtered if q in f"{p[1]} {p[4] or ''} {p[5] or ''}".lower()]
-
-    if risk_choice != "All":
-        filtered = [p for p in filtered if _risk_label(p[0]) == risk_choice]
+        # "All patients" on top, then the typeahead matches
+        sel_pid = _patient_picker("hp", label="Select Patient", all_label="All patients")
 
     # ---------- Build results table ----------
+    # Sugar shown: latest FBS if the patient has one, else latest of any type. Risk uses FBS only (services.risk).
     rows = []
     for p in filtered:
-        pid, name, age, gender, mobile, aadhar = p
-        v = _latest_vitals_for(pid)
-        s = _latest_sugar_for(pid)
-        bp_sys = v[1] if v else None
-        bp_dia = v[2] if v else None
-        pulse  = v[3] if v else None
-        sugar  = s[2] if s else None
-        sugar_type = s[1] if s else None
+        has_fbs = p["fbs_at"] is not None
         rows.append({
-            "ID": pid,
-            "Patient": name,
-            "Mobile": mobile,
-            "Aadhar": aadhar,
-            "BP Sys": bp_sys,
-            "BP Dia": bp_dia,
-            "Pulse": pulse,
-            "Sugar": sugar,
-            "Sugar Type": sugar_type,
-            "Risk": _risk_label(pid),
+            "ID": p["id"],
+            "Patient": p["name"],
+            "Mobile": p["mobile"],
+            "Aadhar": p["aadhar"],
+            "BP Sys": p["bp_sys"],
+            "BP Dia": p["bp_dia"],
+            "Pulse": p["pulse"],
+            "Sugar": p["fbs"] if has_fbs else p["sugar"],
+            "Sugar Type": "FBS" if has_fbs else p["sugar_type"],
+            "Risk": p["risk"],
         })
 
     df_tbl = pd.DataFrame(rows)
     st.dataframe(df_tbl, use_container_width=True, hide_index=True)
+    _pager_nav("hp", next_cursor, len(filtered))
 
     # ---------- Chart Controls (metrics + group-by) ----------
     st.markdown("### 📈 Health Metrics")
@@ -2597,81 +2158,36 @@ def render_health_profiles():
     # ---------- Build chart dataframe ----------
     # Determine which patients to plot: single or all
     plot_pids = []
-    if sel_label == "All patients":
+    if sel_pid is None:
+        return   # the picker's search matched no one ("No matching patients.")
+    if sel_pid == 0:
         plot_pids = [p[0] for p in filtered]
     else:
-        plot_pids = [label_to_pid.get(sel_label)]
+        plot_pids = [sel_pid]
 
     if not plot_pids:
         st.info("No data to plot for the current filters.")
         return
 
-    # Collect time series per patient
-    all_parts = []
-    for pid in plot_pids:
-        # vitals
-        conn = get_connection(); c = conn.cursor()
-        c.execute("""
-            SELECT recorded_at, bp_sys, bp_dia, pulse, temperature
-            FROM vitals WHERE fk_patient_id=? ORDER BY recorded_at
-        """, (pid,))
-        vit = c.fetchall()
-
-        # sugars (wide → FBS/PPBS/HbA1c/RBS)
-        c.execute("""
-            SELECT taken_at, test_type, result_mg_dl
-            FROM blood_sugar_tests WHERE fk_patient_id=? ORDER BY taken_at
-        """, (pid,))
-        sug = c.fetchall()
-        conn.close()
-
-        df_v = pd.DataFrame(vit, columns=["Date", "BP Sys", "BP Dia", "Pulse", "Temp"])
-        if not df_v.empty:
-            df_v["Date"] = pd.to_datetime(df_v["Date"], errors="coerce")
-
-        df_s = pd.DataFrame(sug, columns=["Date", "Test", "Result"])
-        if not df_s.empty:
-            df_s["Date"] = pd.to_datetime(df_s["Date"], errors="coerce")
-            # Use an aggregation to handle potential duplicate (Date, Test) rows.
-            # Choose 'mean' or 'last' depending on desired behavior.
-            df_s = df_s.pivot_table(index="Date", columns="Test", values="Result", aggfunc='mean').reset_index()
-
-
-        # merge wide
-        if not df_v.empty or not df_s.empty:
-            if df_v.empty:
-                df = df_s.rename_axis(None, axis=1)
-            elif df_s.empty:
-                df = df_v.rename_axis(None, axis=1)
-            else:
-                df = pd.merge(df_v, df_s, on="Date", how="outer")
-
-            # group by
-            if group_by == "Monthly":
-                df["Date"] = df["Date"].dt.to_period("M").dt.to_timestamp()
-                df = df.groupby("Date").mean(numeric_only=True).reset_index()
-            elif group_by == "Yearly":
-                df["Date"] = df["Date"].dt.to_period("Y").dt.to_timestamp()
-                df = df.groupby("Date").mean(numeric_only=True).reset_index()
-
-            df["PatientID"] = pid
-            all_parts.append(df)
+    if not sel_metrics:
+        st.info("No data available for the selected metrics.")
+        return
 
-    if not all_parts:
+    # Pre-aggregated per-bucket means for every plotted patient, one query (services.metrics)
+    series = metrics.metric_series(plot_pids, sel_metrics, grain=group_by)
+    if not series:
         st.info("No vitals/tests recorded for the selection.")
         return
 
-    df_all = pd.concat(all_parts, ignore_index=True).sort_values("Date")
-    # keep only requested metrics that exist
-    keep_cols = ["Date", "PatientID"] + [m for m in sel_metrics if m in df_all.columns]
-    df_all = df_all[[c for c in keep_cols if c in df_all.columns]]
-
-    if len(keep_cols) <= 2:
-        st.info("No data available for the selected metrics.")
-        return
+    df_long = pd.DataFrame(series).rename(columns={"patient_id": "PatientID", "metric": "Metric",
+                                                   "date": "Date", "value": "Value"})
+    df_long["Date"] = pd.to_datetime(df_long["Date"])
 
-    # Melt to long for Altair
-    df_long = df_all.melt(id_vars=["Date", "PatientID"], var_name="Metric", value_name="Value").dropna()
+    # Keep the Vega payload bounded however long the history (services.downsample, LTTB)
+    total_points = len(df_long)
+    df_long = downsample.downsample_frame(df_long, x="Date", y="Value", by=["PatientID", "Metric"])
+    if len(df_long) < total_points:
+        st.caption(f"Showing {len(df_long):,} of {total_points:,} points; peaks and dips are kept.")
 
     # If plotting many patients, color by Metric and stroke-dash by Patient
     color = alt.Color("Metric:N")
@@ -2699,29 +2215,14 @@ def render_health_profiles():
 def _risk_badge_for_patient(pid: int) -> str:
     """Return 🔴/🟠/🟢 based on last recorded vitals/sugar."""
     conn = get_connection(); cur = conn.cursor()
-    cur.execute("SELECT bp_sys, bp_dia, pulse FROM vitals WHERE fk_patient_id=? ORDER BY recorded_at DESC LIMIT 1", (pid,))
-    v = cur.fetchone()
-
-    cur.execute("SELECT result_mg_dl FROM blood_sugar_tests WHERE fk_patient_id=? AND test_type='FBS' ORDER BY taken_at DESC LIMIT 1", (pid,))
-    s = cur.fetchone()
+    cur.execute("SELECT bp_sys, bp_dia, pulse, fbs_value FROM patient_latest WHERE patient_id=?", (pid,))
+    row = cur.fetchone()
     conn.close()
 
-    risk = "Green"
-    if v:
-        bp_sys, bp_dia, pulse = v[0], v[1], v[2]
-        if bp_sys and bp_sys > 160 or bp_dia and bp_dia > 100 or pulse and pulse > 120:
-            risk = "Red"
-        elif bp_sys and bp_sys >= 140 or bp_dia and bp_dia >= 90 or pulse and pulse >= 100:
-            risk = "Amber"
-
-    if s:
-        sugar_val = s[0]
-        if sugar_val and sugar_val > 140:
-            risk = "Red"
-        elif sugar_val and sugar_val >= 110:
-            risk = "Amber"
+    if not row:
+        return risk.BADGES[risk.GREEN]
+    return risk.BADGES[risk.classify_one(row["bp_sys"], row["bp_dia"], row["pulse"], row["fbs_value"])]
 
-    return {"Red":"🔴","Amber":"🟠","Green":"🟢"}.get(risk, "🟢")
 
 
 from datetime import datetime
@@ -2777,27 +2278,6 @@ def _call_actions_block(name: str, mobile: str | None, patient_id: int):
     st.markdown("<div class='action-row'>", unsafe_allow_html=True)
 
     
-def _ensure_followup_columns():
-    # Adds frequency_days + sent_to_doctor (for vitals) if missing
-    try:
-        conn = get_connection(); cur = conn.cursor()
-
-        def _has_col(table, col):
-            cur.execute(f"PRAGMA table_info({table})")
-            return any(r[1].lower() == col.lower() for r in cur.fetchall())
-
-        if not _has_col("vitals", "frequency_days"):
-            cur.execute("ALTER TABLE vitals ADD COLUMN frequency_days INTEGER")
-        if not _has_col("vitals", "sent_to_doctor"):
-            cur.execute("ALTER TABLE vitals ADD COLUMN sent_to_doctor INTEGER DEFAULT 0")
-
-        if not _has_col("blood_sugar_tests", "frequency_days"):
-            cur.execute("ALTER TABLE blood_sugar_tests ADD COLUMN frequency_days INTEGER")
-
-        conn.commit(); conn.close()
-    except Exception:
-        pass
-
 # put this near where you build the vitals table
 def _coerce_pos_int(value):
     """Return a positive int or None (handles '', None, NaN, non-numeric)."""
@@ -2908,12 +2388,6 @@ def _auto_apply_pending_if_authenticated():
 
 
 
-# call it every run to pick up when login sets session state
-try:
-    _auto_apply_pending_if_authenticated()
-except Exception:
-    pass
-
 # put near top of your file
 import streamlit as st
 import os
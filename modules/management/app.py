@@ -1,3 +1,5 @@
+import os
+
 import streamlit as st
 from datetime import date, datetime
 
@@ -6,107 +8,37 @@ try:
 except Exception:
     get_connection = None
 
+import db
+
+from modules import registry
+from services import kpis, query_cache
+
 # -----------------------------
 # Management Dashboard Helpers
 # -----------------------------
 
-def _ensure_tables():
+def _kpi_snapshot() -> dict:
+    """All dashboard counters in one cached read (see services.kpis)."""
     if not get_connection:
-        return
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS patients (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            age INTEGER,
-            gender TEXT,
-            phone TEXT
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS vitals (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            fk_patient_id INTEGER NOT NULL,
-            recorded_at TEXT NOT NULL,
-            bp_sys INTEGER,
-            bp_dia INTEGER,
-            pulse INTEGER,
-            temperature REAL,
-            resp_rate INTEGER,
-            spo2 INTEGER,
-            height_cm REAL,
-            weight_kg REAL,
-            bmi REAL,
-            notes TEXT,
-            recorded_by INTEGER,
-            FOREIGN KEY (fk_patient_id) REFERENCES patients(id)
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS lab_orders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            fk_patient_id INTEGER NOT NULL,
-            ordered_at TEXT NOT NULL,
-            test_name TEXT NOT NULL,
-            priority TEXT,
-            notes TEXT,
-            ordered_by INTEGER,
-            status TEXT DEFAULT 'Pending',
-            FOREIGN KEY (fk_patient_id) REFERENCES patients(id)
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS stock (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            item_name TEXT NOT NULL UNIQUE,
-            category TEXT,
-            qty INTEGER DEFAULT 0,
-            unit TEXT DEFAULT 'pcs',
-            last_updated TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-
-def _count_rows(table: str) -> int:
-    if not get_connection:
-        return 0
-    conn = get_connection()
-    cur = conn.cursor()
+        return {}
     try:
-        cur.execute(f"SELECT COUNT(*) FROM {table}")
-        n = cur.fetchone()[0] or 0
+        return kpis.get_kpis()
     except Exception:
-        n = 0
-    conn.close()
-    return n
-
-
-def _today_visits_count() -> int:
-    if not get_connection:
-        return 0
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM vitals WHERE date(recorded_at) = date('now')")
-    n = cur.fetchone()[0] or 0
-    conn.close()
-    return n
+        return {}
 
 
 def _low_stock(threshold: int = 5):
     if not get_connection:
         return []
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
+    return query_cache.cached_query(
         "SELECT id, item_name, category, qty, unit, last_updated FROM stock WHERE qty <= ? ORDER BY qty ASC, item_name",
-        (threshold,),
+        (threshold,), tables=("stock",),
     )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+
+
+def _diagnostics_enabled() -> bool:
+    """The Diagnostics tab is hidden unless the URL has ?diagnostics=1 (or HOSPITAL_DIAGNOSTICS=1)."""
+    return st.query_params.get("diagnostics") == "1" or os.environ.get("HOSPITAL_DIAGNOSTICS") == "1"
 
 
 # -----------------------------
@@ -131,45 +63,35 @@ def _kpi_card(title: str, value: str):
 
 def render_management_dashboard(user: dict):
     """Front page for Management login."""
-    _ensure_tables()
 
     st.markdown("### 🧭 Management Dashboard")
     st.caption(f"Welcome, {user.get('name','Management')} · {date.today().strftime('%b %d, %Y')}")
 
-    # KPI row
+    # KPI row (one snapshot shared by the cards and the Reports tab)
+    snap = _kpi_snapshot()
+    pending = snap.get("pending_tests", 0)
+    total_stock = snap.get("stock_total", 0)
     c1, c2, c3, c4 = st.columns(4)
     with c1:
-        _kpi_card("Total Patients", str(_count_rows("patients")))
+        _kpi_card("Total Patients", str(snap.get("patients", 0)))
     with c2:
-        _kpi_card("Today's Visits", str(_today_visits_count()))
+        _kpi_card("Today's Visits", str(snap.get("today_visits", 0)))
     with c3:
-        pending = 0
-        if get_connection:
-            conn = get_connection()
-            cur = conn.cursor()
-            cur.execute("SELECT COUNT(*) FROM lab_orders WHERE status != 'Completed'")
-            pending = cur.fetchone()[0] or 0
-            conn.close()
         _kpi_card("Pending Tests", str(pending))
     with c4:
-        total_stock = 0
-        if get_connection:
-            conn = get_connection()
-            cur = conn.cursor()
-            cur.execute("SELECT COALESCE(SUM(qty),0) FROM stock")
-            total_stock = cur.fetchone()[0] or 0
-            conn.close()
         _kpi_card("Items in Stock", str(total_stock))
 
     st.write("")
 
     # Tabs
-    tab_overview, tab_stock, tab_users, tab_reports = st.tabs([
+    show_diagnostics = _diagnostics_enabled()
+    tabs = st.tabs([
         "Overview",
         "Stock",
         "Users",
         "Reports",
-    ])
+    ] + (["Diagnostics"] if show_diagnostics else []))
+    tab_overview, tab_stock, tab_users, tab_reports = tabs[:4]
 
     with tab_overview:
         st.subheader("Today at a glance")
@@ -180,7 +102,7 @@ def render_management_dashboard(user: dict):
                 """
                 SELECT v.id, p.name, v.recorded_at, v.bp_sys, v.bp_dia, v.pulse, v.temperature
                 FROM vitals v JOIN patients p ON p.id = v.fk_patient_id
-                WHERE date(v.recorded_at) = date('now')
+                WHERE v.visit_day = date('now')
                 ORDER BY v.id DESC
                 """
             )
@@ -219,8 +141,8 @@ def render_management_dashboard(user: dict):
             today = date.today().isoformat()
             counts = {
                 "date": [today],
-                "total_patients": [_count_rows("patients")],
-                "today_visits": [_today_visits_count()],
+                "total_patients": [snap.get("patients", 0)],
+                "today_visits": [snap.get("today_visits", 0)],
                 "pending_tests": [pending],
                 "items_in_stock": [total_stock],
             }
@@ -230,3 +152,61 @@ def render_management_dashboard(user: dict):
             st.download_button("Download Counts CSV", csv, file_name=f"mgmt_counts_{today}.csv", mime="text/csv")
         else:
             st.warning("DB connection not configured.")
+
+    if show_diagnostics:
+        with tabs[4]:
+            _render_diagnostics()
+
+
+def _render_diagnostics():
+    """SQL timings for this session's runs, connection pool and query cache state, and the slow-query log."""
+    import pandas as pd
+
+    st.subheader("SQL diagnostics")
+    if not db.TRACE_QUERIES:
+        st.info("Query tracing is off (HOSPITAL_DB_TRACE=0); only connection counters are shown.")
+
+    # The run rendering this tab is still going; its predecessor is the complete picture
+    current, previous = db.rerun_stats(), db.previous_rerun_stats()
+    st.caption("Previous run of this session.")
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Statements", previous["queries"])
+    c2.metric("Rows", previous["rows"])
+    c3.metric("SQL time (ms)", f"{previous['sql_ms']:.1f}")
+    c4.metric("Connection checkouts", previous["checkouts"])
+
+    stmts = previous["statements"] or current["statements"]
+    if stmts:
+        df = pd.DataFrame(stmts, columns=["ms", "rows", "caller", "params", "sql"])
+        df["ms"] = df["ms"].round(2)
+        st.dataframe(df.sort_values("ms", ascending=False), use_container_width=True, hide_index=True)
+        if len(stmts) >= db.STATEMENT_HISTORY:
+            st.caption(f"Only the last {db.STATEMENT_HISTORY} statements of a run are kept.")
+
+    st.markdown("**Connection pool**")
+    try:
+        st.json(db.get_pool().stats(), expanded=False)
+    except Exception as e:
+        st.warning(f"Pool unavailable: {e}")
+
+    st.markdown("**Query cache**")
+    st.json(query_cache.stats(), expanded=False)
+
+    st.markdown("**Dashboard imports (ms, first use in this process)**")
+    st.json({m: round(ms, 1) for m, ms in registry.import_times().items()}, expanded=False)
+
+    st.markdown("**Slow queries**")
+    if db.SLOW_QUERY_MS > 0:
+        st.caption(f"Statements over {db.SLOW_QUERY_MS:g} ms, newest first · {db.SLOW_QUERY_LOG}")
+    else:
+        st.caption("Slow-query log disabled (HOSPITAL_DB_SLOW_MS=0).")
+    slow = db.slow_queries(50)
+    if not slow:
+        st.success("No slow queries logged.")
+        return
+    df = pd.DataFrame(slow, columns=["at", "ms", "rows", "caller", "params", "sql"])
+    st.dataframe(df, use_container_width=True, hide_index=True)
+    for entry in slow[:10]:
+        with st.expander(f"{entry['ms']} ms · {entry['caller']}"):
+            st.code(entry["sql"], language="sql")
+            st.code("\n".join(entry.get("plan") or ["(no plan)"]), language="text")
@@ -2,7 +2,8 @@
 # Cleaned Patient module (safe to import). Provides render_patient_dashboard(user)
 import streamlit as st
 from datetime import datetime, date, timedelta
-from pathlib import Path
+
+from services import assets, auth
 
 # -----------------------------
 # Small helpers / UI pieces
@@ -1529,27 +1530,12 @@ def render_patient_dashboard(user: dict):
             unsafe_allow_html=True,
         )
 
-    # Center: logo (best-effort)
-    def _find_logo_file():
-        candidates = [
-            "static/images/Logo_upscaled.png",
-            "static/Logo_upscaled.png",
-            "assets/Logo_upscaled.png",
-            "Logo_upscaled.png",
-            "/mnt/data/Logo_upscaled.png",
-        ]
-        for p in candidates:
-            if Path(p).exists():
-                return p
-        return None
-
-    found_logo = _find_logo_file()
+    # Center: logo, a static file the browser caches (tools/build_assets.py)
+    logo = assets.picture_html("logo", alt="Mother Teresa Hospital", sizes="(max-width: 640px) 100vw, 640px",
+                               style="width:100%; height:auto;")
     with col2:
-        if found_logo:
-            try:
-                st.image(found_logo, use_container_width=True, width=160)
-            except Exception:
-                st.info("Logo found but could not be displayed.")
+        if logo:
+            st.markdown(logo, unsafe_allow_html=True)
         else:
             st.markdown(
                 "<div style='height:100%;display:flex;align-items:center;justify-content:center;color:#6b7280;'>Logo</div>",
@@ -1565,6 +1551,8 @@ def render_patient_dashboard(user: dict):
             for k in list(st.session_state.keys()):
                 if k not in keep:
                     del st.session_state[k]
+            auth.revoke_token(st.query_params.get(auth.SESSION_PARAM))
+            st.query_params.pop(auth.SESSION_PARAM, None)
             st.rerun()
         st.markdown("</div>", unsafe_allow_html=True)
 
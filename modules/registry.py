@@ -0,0 +1,50 @@
+# modules/registry.py
+"""
+Role -> dashboard registry for root app.py.
+
+Only the logged-in role's dashboard module is imported, on its first use in the
+process (the login page imports none of them); later reruns and sessions get the
+cached render function. Import times are kept for tools/measure_startup.py and
+the Diagnostics tab.
+
+    render = get_dashboard(user["role"])
+    if render: render(user)
+"""
+import importlib
+import threading
+import time
+from typing import Callable, Optional
+
+# role -> (module, render function)
+DASHBOARDS = {
+    "Patient": ("modules.patient.app", "render_patient_dashboard"),
+    "Health Agent": ("modules.health_agent.app", "render_health_agent_dashboard"),
+    "Doctor": ("modules.doctor.app", "render_doctor_dashboard"),
+    "Management": ("modules.management.app", "render_management_dashboard"),
+}
+
+_loaded = {}         # role -> render function
+_import_ms = {}      # module -> milliseconds its first import took
+_lock = threading.Lock()
+
+
+def get_dashboard(role: str) -> Optional[Callable]:
+    """The render function for `role`, importing its module the first time; None for an unknown role."""
+    render = _loaded.get(role)
+    if render is not None:
+        return render
+    if role not in DASHBOARDS:
+        return None
+    module_name, func = DASHBOARDS[role]
+    with _lock:   # two sessions logging in at once import the module once
+        if role not in _loaded:
+            t0 = time.perf_counter()
+            module = importlib.import_module(module_name)
+            _import_ms.setdefault(module_name, (time.perf_counter() - t0) * 1000)
+            _loaded[role] = getattr(module, func)
+        return _loaded[role]
+
+
+def import_times() -> dict:
+    """{module: ms} for dashboards imported so far in this process."""
+    return dict(_import_ms)
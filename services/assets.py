@@ -0,0 +1,77 @@
+# services/assets.py
+"""
+Fingerprinted static assets built by tools/build_assets.py.
+
+The manifest (static/build/assets.json) is read once per process. Screens get
+app/static/... URLs (Streamlit static serving) that the browser fetches once
+and caches, instead of file paths Streamlit reads, hashes and ships over the
+websocket on every rerun, or base64 inlined into the page.
+
+    st.markdown(picture_html("logo", alt="Mother Teresa Hospital", sizes="600px"), unsafe_allow_html=True)
+    css = stylesheet("style.css")    # minified text, read once
+
+Without a build (no manifest) picture_html() returns None, so callers keep
+their text fallback, and stylesheet() reads the source file under static/.
+"""
+import functools
+import html
+import json
+import os
+from typing import Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(ROOT, "static")
+MANIFEST_PATH = os.path.join(STATIC_DIR, "build", "assets.json")
+# Where Streamlit serves static/ (relative, so a server.baseUrlPath still applies)
+STATIC_URL = "app/static/"
+
+
+@functools.lru_cache(maxsize=None)
+def manifest() -> dict:
+    """The build manifest, or {} when tools/build_assets.py hasn't been run."""
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def url(path: str) -> str:
+    """Browser URL of a file under static/ (a manifest path like 'build/logo-640.3f9a1c2e.webp')."""
+    return STATIC_URL + path
+
+
+def _srcset(variants: dict) -> str:
+    return ", ".join(f"{url(p)} {w}w" for w, p in sorted(variants.items(), key=lambda kv: int(kv[0])))
+
+
+def picture_html(name: str, alt: str = "", sizes: str = "100vw", style: str = "") -> Optional[str]:
+    """
+    <picture> for a built image: WebP variants with a PNG fallback, the browser
+    picking the width from `sizes`. None if the image isn't in the manifest.
+    """
+    entry = manifest().get(name)
+    if not entry:
+        return None
+    largest_png = entry["png"][max(entry["png"], key=int)]
+    style_attr = f" style='{html.escape(style, quote=True)}'" if style else ""
+    return (
+        "<picture>"
+        f"<source type='image/webp' srcset='{_srcset(entry['webp'])}' sizes='{sizes}'/>"
+        f"<img src='{url(largest_png)}' srcset='{_srcset(entry['png'])}' sizes='{sizes}'"
+        f" alt='{html.escape(alt, quote=True)}'{style_attr}/>"
+        "</picture>"
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def stylesheet(name: str) -> Optional[str]:
+    """Text of a stylesheet: the minified build if there is one, else static/<name>; None if neither exists."""
+    built = manifest().get(name)
+    for path in ([os.path.join(STATIC_DIR, built)] if built else []) + [os.path.join(STATIC_DIR, name)]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            continue
+    return None
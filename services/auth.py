@@ -0,0 +1,249 @@
+# services/auth.py
+"""
+Login service: password checks off the script thread, signed session tokens,
+and per-username / per-IP burst limits.
+
+- PBKDF2 (200k iterations) runs in a small process-wide worker pool. hashlib
+  releases the GIL while hashing, so concurrent logins use up to AUTH_WORKERS
+  cores and no more; when AUTH_MAX_PENDING checks are already queued, new
+  attempts are turned away ("busy") instead of piling up.
+- A successful login returns an HMAC-signed token (username, expiry, a
+  fingerprint of the current password hash and one of the client's IP address
+  and User-Agent). The app keeps it in the URL query string, so a browser
+  refresh restores the session with one indexed lookup and no re-hash.
+  Changing the password or logging out (revoke_token) invalidates it.
+- Attempts are counted in a sliding window per username and per client IP.
+
+    user, error = login(username, password, ip)
+    token = issue_token(user, client)        # client = client_key(ip, user_agent)
+    user = user_from_token(token, client)    # None if bad / expired / revoked / another client
+    token = renew_token(token, client) or token
+
+Risk of a token in the URL: it ends up in browser history, screenshots, shared
+links and proxy logs, and whoever presents it is logged in as that user
+(Doctor and Management accounts included). To narrow that:
+- the token only works from the client it was issued to (same IP and
+  User-Agent); a health agent whose mobile IP changes has to log in again;
+- it lives SESSION_TTL seconds (30 min by default) and the app renews it while
+  the user is active (renew_token, once half the TTL has passed), so a copied
+  link goes stale soon after the user stops using it;
+- logout revocations are kept in memory only and are lost on restart, so until
+  it expires a logged-out token works again after a restart; the short TTL
+  bounds that window. Set HOSPITAL_SESSION_SECRET, or tokens die with the process.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Optional, Tuple
+
+from db import get_user_by_username, verify_password
+
+AUTH_WORKERS = int(os.environ.get("HOSPITAL_AUTH_WORKERS", str(min(4, os.cpu_count() or 1))))
+AUTH_MAX_PENDING = int(os.environ.get("HOSPITAL_AUTH_MAX_PENDING", str(AUTH_WORKERS * 4)))
+AUTH_TIMEOUT = float(os.environ.get("HOSPITAL_AUTH_TIMEOUT_SECS", "15"))
+
+SESSION_PARAM = "session"
+SESSION_TTL = int(os.environ.get("HOSPITAL_SESSION_TTL_SECS", str(30 * 60)))
+# Without a configured secret, tokens are only valid until the process restarts.
+_SECRET = (os.environ.get("HOSPITAL_SESSION_SECRET") or secrets.token_hex(32)).encode("utf-8")
+
+# (max attempts, window seconds)
+USER_LIMIT = (5, 60)
+IP_LIMIT = (20, 60)
+
+# Error codes returned by login()
+RATE_LIMITED, BUSY, NOT_FOUND, BAD_PASSWORD = "rate_limited", "busy", "not_found", "bad_password"
+
+
+# -----------------------------
+# Hashing worker pool
+# -----------------------------
+_executor = ThreadPoolExecutor(max_workers=AUTH_WORKERS, thread_name_prefix="auth")
+_slots = threading.BoundedSemaphore(AUTH_MAX_PENDING)
+
+
+def _check_password(user_row: dict, password: str) -> Optional[bool]:
+    """True/False from the worker pool, or None if the pool is saturated or too slow."""
+    if not _slots.acquire(blocking=False):
+        return None
+    try:
+        future = _executor.submit(verify_password, user_row["salt"], user_row["password_hash"], password)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _f: _slots.release())
+    try:
+        return future.result(timeout=AUTH_TIMEOUT)
+    except FutureTimeout:
+        return None
+
+
+# -----------------------------
+# Burst limiting
+# -----------------------------
+_attempts = {}   # key -> deque of attempt timestamps
+_attempts_lock = threading.Lock()
+
+
+def _allow(key: str, limit: Tuple[int, int], now: float) -> bool:
+    max_attempts, window = limit
+    with _attempts_lock:
+        q = _attempts.setdefault(key, deque())
+        while q and q[0] <= now - window:
+            q.popleft()
+        if len(q) >= max_attempts:
+            return False
+        q.append(now)
+        return True
+
+
+def _forget(key: str):
+    with _attempts_lock:
+        _attempts.pop(key, None)
+
+
+def _prune(now: float):
+    """Drop idle buckets so the table doesn't grow with every username ever tried."""
+    window = max(USER_LIMIT[1], IP_LIMIT[1])
+    with _attempts_lock:
+        for key in [k for k, q in _attempts.items() if not q or q[-1] <= now - window]:
+            del _attempts[key]
+
+
+# -----------------------------
+# Login
+# -----------------------------
+def login(username: str, password: str, ip: Optional[str] = None) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Returns (user, None) on success, else (None, error) with error one of
+    RATE_LIMITED, BUSY, NOT_FOUND, BAD_PASSWORD.
+    """
+    now = time.time()
+    if len(_attempts) > 10_000:
+        _prune(now)
+    user_key = f"user:{username.lower()}"
+    if not _allow(user_key, USER_LIMIT, now):
+        return None, RATE_LIMITED
+    if ip and not _allow(f"ip:{ip}", IP_LIMIT, now):
+        return None, RATE_LIMITED
+
+    row = get_user_by_username(username)
+    if not row:
+        return None, NOT_FOUND
+    ok = _check_password(row, password)
+    if ok is None:
+        return None, BUSY
+    if not ok:
+        return None, BAD_PASSWORD
+
+    _forget(user_key)
+    return _public(row), None
+
+
+def _public(row: dict) -> dict:
+    return {"id": row["id"], "username": row["username"], "name": row["name"], "role": row["role"]}
+
+
+# -----------------------------
+# Session tokens
+# -----------------------------
+_revoked = {}    # signature -> expiry
+_revoked_lock = threading.Lock()
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64(hmac.new(_SECRET, payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def _password_tag(password_hash: str) -> str:
+    # Ties the token to the current password without putting the hash in the URL
+    return _sign("pw:" + password_hash)[:16]
+
+
+def client_key(ip: Optional[str], user_agent: Optional[str]) -> str:
+    """Fingerprint of the browser a token is bound to (its IP and User-Agent; either may be unknown)."""
+    return _sign(f"client:{ip or ''}\n{user_agent or ''}")[:16]
+
+
+def issue_token(user: dict, client: Optional[str] = None, ttl: int = SESSION_TTL) -> str:
+    """Signed session token for `user`, usable only by `client` (client_key) for `ttl` seconds."""
+    row = get_user_by_username(user["username"])
+    claims = {"u": user["username"], "exp": int(time.time()) + ttl, "pw": _password_tag(row["password_hash"]),
+              "c": client or client_key(None, None)}
+    payload = _b64(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return f"{payload}.{_sign(payload)}"
+
+
+def _claims(token: str) -> Optional[dict]:
+    try:
+        payload, sig = token.split(".", 1)
+        if not hmac.compare_digest(sig, _sign(payload)):
+            return None
+        claims = json.loads(_unb64(payload))
+    except Exception:
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    with _revoked_lock:
+        if sig in _revoked:
+            return None
+    return claims
+
+
+def _client_matches(claims: dict, client: Optional[str]) -> bool:
+    return hmac.compare_digest(claims.get("c", ""), client or client_key(None, None))
+
+
+def user_from_token(token: Optional[str], client: Optional[str] = None) -> Optional[dict]:
+    """The logged-in user for a valid token presented by `client`, else None. No password hashing involved."""
+    claims = _claims(token) if token else None
+    if not claims or not _client_matches(claims, client):
+        return None
+    row = get_user_by_username(claims["u"])
+    if not row or not hmac.compare_digest(claims.get("pw", ""), _password_tag(row["password_hash"])):
+        return None
+    return _public(row)
+
+
+def revoke_token(token: Optional[str]):
+    """Reject this token from now until it would have expired anyway (logout)."""
+    claims = _claims(token) if token else None
+    if not claims:
+        return
+    now = time.time()
+    with _revoked_lock:
+        for sig in [s for s, exp in _revoked.items() if exp < now]:
+            del _revoked[sig]
+        _revoked[token.split(".", 1)[1]] = claims["exp"]
+
+
+def renew_token(token: Optional[str], client: Optional[str] = None, ttl: int = SESSION_TTL) -> Optional[str]:
+    """
+    A fresh token (and the old one revoked) once less than half of `ttl` is left,
+    so an active session slides forward; None while the token is still fresh, or
+    if it isn't valid for `client`.
+    """
+    claims = _claims(token) if token else None
+    if not claims or not _client_matches(claims, client) or claims["exp"] - time.time() > ttl / 2:
+        return None
+    user = user_from_token(token, client)
+    if not user:
+        return None
+    revoke_token(token)
+    return issue_token(user, client, ttl)
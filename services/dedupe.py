@@ -0,0 +1,233 @@
+# services/dedupe.py
+"""
+Duplicate-patient detection for the registration form.
+
+Health agents re-register the same person with transliteration variants
+("Raamesh" / "Ramesh" / "RAMESH", "Lakshmi" / "Laxmi"). Before a new patient is
+saved, find_duplicates() lists likely existing matches:
+
+  1. Blocking (indexed, patient_match_keys / migration 0009): same village and
+     age band, same phonetic first-name key and age band, or the same mobile /
+     aadhar hash anywhere. A few hundred candidates at most, whatever the table size.
+  2. Scoring: trigram (Dice) similarity of phonetically normalized names and
+     father names, nudged by same village / close age; exact aadhar / mobile
+     matches override.
+
+    matches = find_duplicates(name="Raamesh Kumar", age=45, gender="Male", village="Rampur", mobile="98...")
+    # [{"id": 812, "name": "Ramesh Kumar", "score": 0.93, "reasons": ["similar name", "same mobile"], ...}]
+"""
+import hashlib
+import re
+import unicodedata
+from typing import List, Optional
+
+from db import connection
+
+AGE_BAND = 5            # +/- years when blocking on age
+MATCH_THRESHOLD = 0.7   # minimum score shown to the user
+MAX_MATCHES = 5
+
+# Common Latin-script spellings of the same Indian name sound, applied in order
+_PHONETIC_RULES = [
+    ("ksh", "x"), ("ks", "x"),
+    ("aa", "a"), ("ee", "i"), ("ii", "i"), ("oo", "u"), ("uu", "u"), ("ou", "u"), ("ai", "e"), ("ay", "e"),
+    ("th", "t"), ("dh", "d"), ("bh", "b"), ("kh", "k"), ("gh", "g"), ("jh", "j"), ("ph", "f"),
+    ("sh", "s"), ("ch", "c"), ("ck", "k"), ("q", "k"), ("w", "v"), ("z", "j"), ("y", "i"),
+]
+_VOWELS = set("aeiou")
+
+
+# -----------------------------
+# Keys
+# -----------------------------
+def normalize_name(text: Optional[str]) -> str:
+    """Lower-case ASCII letters, transliteration variants folded, repeated letters collapsed."""
+    s = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii").lower()
+    s = " ".join(re.findall(r"[a-z]+", s))
+    for src, dst in _PHONETIC_RULES:
+        s = s.replace(src, dst)
+    return re.sub(r"(.)\1+", r"\1", s)
+
+
+def name_key(norm: str) -> Optional[str]:
+    """Phonetic key of the first name: first letter + remaining consonants ("ramesh" -> "rms")."""
+    first = norm.split(" ", 1)[0]
+    if not first:
+        return None
+    return first[0] + "".join(c for c in first[1:] if c not in _VOWELS)[:5]
+
+
+def _digits_hash(kind: str, value: Optional[str], length: int) -> Optional[str]:
+    digits = re.sub(r"\D", "", value or "")[-length:]
+    if len(digits) != length or len(set(digits)) == 1:   # missing, short, or 0000000000-style filler
+        return None
+    return hashlib.sha256(f"{kind}:{digits}".encode("ascii")).hexdigest()[:32]
+
+
+def mobile_hash(mobile: Optional[str]) -> Optional[str]:
+    return _digits_hash("mobile", mobile, 10)   # last 10 digits, so +91 / 0 prefixes match
+
+
+def aadhar_hash(aadhar: Optional[str]) -> Optional[str]:
+    return _digits_hash("aadhar", aadhar, 12)
+
+
+def village_key(village: Optional[str]) -> Optional[str]:
+    return " ".join((village or "").lower().split()) or None
+
+
+def match_keys(name, father_name=None, age=None, gender=None, village=None, mobile=None, aadhar=None) -> dict:
+    norm = normalize_name(name)
+    return {
+        "village_key": village_key(village),
+        "age": age or None,
+        "gender": (gender or "").strip().lower() or None,
+        "name_key": name_key(norm),
+        "name_norm": norm,
+        "father_norm": normalize_name(father_name) or None,
+        "mobile_hash": mobile_hash(mobile),
+        "aadhar_hash": aadhar_hash(aadhar),
+    }
+
+
+def sync_match_keys(conn, batch: int = 5000) -> int:
+    """Fill keys for patients marked stale by the 0009 triggers; returns how many were refreshed."""
+    done = 0
+    while True:
+        rows = conn.execute(f"""
+            SELECT p.id, p.name, p.father_name, p.age, p.gender, p.village,
+                   COALESCE(NULLIF(p.mobile, ''), p.phone) AS mobile, p.aadhar
+            FROM patient_match_keys k CROSS JOIN patients p   -- CROSS: drive from the partial stale index
+            WHERE k.stale = 1 AND p.id = k.patient_id
+            LIMIT {int(batch)}
+        """).fetchall()
+        if not rows:
+            return done
+        updates = []
+        for r in rows:
+            k = match_keys(r["name"], r["father_name"], r["age"], r["gender"], r["village"], r["mobile"], r["aadhar"])
+            updates.append((k["village_key"], k["age"], k["gender"], k["name_key"], k["name_norm"],
+                            k["father_norm"], k["mobile_hash"], k["aadhar_hash"], r["id"]))
+        conn.executemany("""
+            UPDATE patient_match_keys
+            SET village_key=?, age=?, gender=?, name_key=?, name_norm=?, father_norm=?,
+                mobile_hash=?, aadhar_hash=?, stale=0
+            WHERE patient_id=?
+        """, updates)
+        done += len(rows)
+
+
+# -----------------------------
+# Scoring
+# -----------------------------
+def _trigrams(norm: str) -> set:
+    padded = f"  {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(ta: set, b: str) -> float:
+    if not ta or not b:
+        return 0.0
+    tb = _trigrams(b)
+    return 2 * len(ta & tb) / (len(ta) + len(tb))
+
+
+def similarity(a: str, b: str) -> float:
+    """Dice coefficient of the two normalized strings' trigrams (0..1)."""
+    return _dice(_trigrams(a) if a else set(), b)
+
+
+def _score(keys: dict, grams: dict, cand) -> tuple:
+    """
+    Name (and father name) similarity, nudged by same village / close age; an exact
+    mobile match lifts the score, an exact aadhar match is always a duplicate.
+    """
+    name_sim = _dice(grams["name"], cand["name_norm"])
+    reasons = ["similar name"] if name_sim >= MATCH_THRESHOLD else []
+    if keys["aadhar_hash"] and keys["aadhar_hash"] == cand["aadhar_hash"]:
+        return 1.0, ["same Aadhar"] + reasons
+    if grams["father"] and cand["father_norm"]:
+        score = 0.8 * name_sim + 0.2 * _dice(grams["father"], cand["father_norm"])
+    else:
+        score = name_sim
+    same_village = keys["village_key"] is not None and keys["village_key"] == cand["village_key"]
+    age_gap = abs(keys["age"] - cand["age"]) if keys["age"] and cand["age"] else AGE_BAND
+    score = 0.8 * score + 0.1 * same_village + 0.1 * max(0.0, 1 - age_gap / AGE_BAND)
+    if same_village:
+        reasons.append("same village")
+    if keys["mobile_hash"] and keys["mobile_hash"] == cand["mobile_hash"]:
+        score = 0.5 + 0.5 * score
+        reasons.append("same mobile")
+    if keys["gender"] and cand["gender"] and keys["gender"] != cand["gender"]:
+        score *= 0.5
+    return score, reasons
+
+
+def find_duplicates(
+    name: str,
+    father_name: Optional[str] = None,
+    age: Optional[int] = None,
+    gender: Optional[str] = None,
+    village: Optional[str] = None,
+    mobile: Optional[str] = None,
+    aadhar: Optional[str] = None,
+    limit: int = MAX_MATCHES,
+    threshold: float = MATCH_THRESHOLD,
+    db_path: str = None,
+) -> List[dict]:
+    """
+    Existing patients that look like the one being registered, best first:
+    [{id, name, father_name, age, gender, village, mobile, score, reasons}, ...]
+    An age of 0 / None means unknown (no age band).
+    """
+    keys = match_keys(name, father_name, age, gender, village, mobile, aadhar)
+    if not keys["name_norm"] and not keys["mobile_hash"] and not keys["aadhar_hash"]:
+        return []
+    lo, hi = (age - AGE_BAND, age + AGE_BAND) if age else (0, 200)
+
+    blocks, params = [], []
+    if keys["village_key"]:
+        blocks.append("(village_key = ? AND age BETWEEN ? AND ?)")
+        params += [keys["village_key"], lo, hi]
+    if keys["name_key"]:
+        blocks.append("(name_key = ? AND age BETWEEN ? AND ?)")
+        params += [keys["name_key"], lo, hi]
+    for col in ("mobile_hash", "aadhar_hash"):
+        if keys[col]:
+            blocks.append(f"{col} = ?")
+            params.append(keys[col])
+    if not blocks:
+        return []
+
+    with connection(db_path) as conn:
+        sync_match_keys(conn)
+        candidates = conn.execute(f"""
+            SELECT patient_id, village_key, age, gender, name_norm, father_norm, mobile_hash, aadhar_hash
+            FROM patient_match_keys
+            WHERE {" OR ".join(blocks)}
+        """, params).fetchall()
+
+        grams = {
+            "name": _trigrams(keys["name_norm"]) if keys["name_norm"] else set(),
+            "father": _trigrams(keys["father_norm"]) if keys["father_norm"] else set(),
+        }
+        scored = []
+        for cand in candidates:
+            score, reasons = _score(keys, grams, cand)
+            if score >= threshold:
+                scored.append((score, cand["patient_id"], reasons))
+        scored.sort(key=lambda t: (-t[0], t[1]))
+        scored = scored[:limit]
+        if not scored:
+            return []
+
+        ids = [pid for _, pid, _ in scored]
+        details = {r["id"]: r for r in conn.execute(f"""
+            SELECT id, name, father_name, age, gender, village, COALESCE(NULLIF(mobile, ''), phone) AS mobile
+            FROM patients WHERE id IN ({",".join("?" * len(ids))})
+        """, ids)}
+
+    return [
+        {**dict(details[pid]), "score": round(score, 2), "reasons": reasons}
+        for score, pid, reasons in scored if pid in details
+    ]
@@ -0,0 +1,130 @@
+# services/downsample.py
+"""
+Point-budget downsampling for line charts.
+
+Two years of daily readings for a page of overlaid patients is tens of thousands
+of points, all serialized into the Vega spec and drawn by the browser, although
+a ~1000 px wide chart can't show more than a few points per pixel column.
+downsample_frame() trims every series with Largest-Triangle-Three-Buckets
+(Steinarsson, 2013) so the whole chart stays within CHART_POINT_BUDGET points:
+the first and last points are kept, and from each bucket in between the point
+forming the largest triangle with its neighbours, which preserves peaks, dips
+and the overall shape far better than averaging or taking every n-th point.
+
+    df_long = downsample_frame(df_long, x="Date", y="Value", by=["PatientID", "Metric"])
+"""
+import os
+from typing import List, Optional, Sequence
+
+
+# Total points per chart; series shorter than their share are left untouched
+CHART_POINT_BUDGET = int(os.environ.get("HOSPITAL_CHART_POINTS", "2000"))
+MIN_POINTS_PER_SERIES = 20
+
+
+def lttb(x: Sequence[float], y: Sequence[float], n_out: int):
+    """
+    Indices (ascending) of the `n_out` points LTTB keeps from the series (x must be
+    sorted and numeric). Returns every index when the series is already small enough.
+    """
+    import numpy as np
+
+    n = len(x)
+    return lttb_segments(x, y, np.array([0]), np.array([n]), n_out)
+
+
+def lttb_segments(x, y, starts, lengths, n_out: int):
+    """
+    lttb() for many series at once: x / y hold the series back to back, series k
+    is [starts[k], starts[k] + lengths[k]) and sorted by x. Returns the global
+    indices kept, ascending; series of at most `n_out` points are kept whole.
+
+    Bucket i of every long series is processed in one vectorized step, so the
+    Python loop runs n_out times however many series there are.
+    """
+    import numpy as np
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    n_out = max(int(n_out), 2)
+
+    long_ = lengths > n_out
+    keep = [np.arange(s, s + n) for s, n in zip(starts[~long_], lengths[~long_])]
+    if long_.any():
+        s, n = starts[long_], lengths[long_]
+        if n_out == 2:
+            keep.append(np.concatenate([s, s + n - 1]))
+        else:
+            keep.append(_lttb_long(x, y, s, n, n_out).ravel())
+    if not keep:
+        return np.array([], dtype=np.int64)
+    return np.sort(np.concatenate(keep))
+
+
+def _lttb_long(x, y, s, n, n_out):
+    """(series, n_out) indices for series that all have more than n_out (>= 3) points."""
+    import numpy as np
+
+    rows = np.arange(len(s))
+    x = x - x.min()   # smaller running sums for epoch-nanosecond x
+    # n - 2 middle points split into n_out - 2 buckets; edges[k, i] is where bucket i starts
+    step = (n - 2) / (n_out - 2)
+    edges = s[:, None] + (1 + np.arange(n_out - 1)[None, :] * step[:, None]).astype(np.int64)
+    edges[:, -1] = s + n - 1
+    csx = np.concatenate([[0.0], np.cumsum(x)])
+    csy = np.concatenate([[0.0], np.cumsum(y)])
+
+    out = np.empty((len(s), n_out), dtype=np.int64)
+    out[:, 0], out[:, -1] = s, s + n - 1
+    a = s.copy()
+    for i in range(n_out - 2):
+        lo, hi = edges[:, i], edges[:, i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        if i + 2 < n_out - 1:
+            nlo, nhi = hi, edges[:, i + 2]
+        else:
+            nlo, nhi = s + n - 1, s + n
+        cx = (csx[nhi] - csx[nlo]) / (nhi - nlo)
+        cy = (csy[nhi] - csy[nlo]) / (nhi - nlo)
+
+        # All candidate points of bucket i, series after series
+        size = hi - lo
+        offsets = np.concatenate([[0], np.cumsum(size)[:-1]])
+        seg = np.repeat(rows, size)
+        idx = np.arange(size.sum()) - offsets[seg] + lo[seg]
+        ax, ay = x[a][seg], y[a][seg]
+        area = np.abs((ax - cx[seg]) * (y[idx] - ay) - (ax - x[idx]) * (cy[seg] - ay))
+        # First point with the largest area in each series' bucket
+        best = np.maximum.reduceat(area, offsets)
+        first = np.minimum.reduceat(np.where(area == best[seg], np.arange(len(area)), len(area)), offsets)
+        a = idx[first]
+        out[:, i + 1] = a
+    return out
+
+
+def downsample_frame(df, x: str, y: str, by: Optional[List[str]] = None,
+                     budget: int = None, min_points: int = MIN_POINTS_PER_SERIES):
+    """
+    `df` with each series (rows grouped by `by`, ordered by `x`) reduced by LTTB so
+    the total row count stays near `budget` (default CHART_POINT_BUDGET). Every
+    series keeps at least `min_points`; rows with a missing `y` are dropped.
+    `x` may be datetimes or numbers. Rows come back sorted by `by`, then `x`.
+    """
+    import numpy as np
+
+    budget = CHART_POINT_BUDGET if budget is None else budget
+    df = df.dropna(subset=[y])
+    if budget <= 0 or len(df) <= budget:
+        return df
+
+    by = list(by or [])
+    df = df.sort_values(by + [x], kind="stable")
+    lengths = df.groupby(by, sort=False).size().to_numpy() if by else np.array([len(df)])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    xs = df[x].to_numpy()
+    if np.issubdtype(xs.dtype, np.datetime64):
+        xs = xs.astype("datetime64[ns]").astype(np.int64)
+    per_series = max(min_points, budget // len(lengths))
+    return df.iloc[lttb_segments(xs, df[y].to_numpy(), starts, lengths, per_series)]
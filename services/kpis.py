@@ -0,0 +1,83 @@
+# services/kpis.py
+"""
+Dashboard counters (patients, today's visits, pending tests, stock, ...) computed
+in ONE statement / read transaction and cached process-wide for a short TTL.
+
+Every Streamlit session shares the same snapshot, so N users re-rendering the
+dashboard cost one query per TTL instead of N x (one connection per counter).
+Write paths call invalidate_kpis() so their own change shows up on the next render.
+When the TTL runs out the statement goes through services.query_cache, so it is
+only re-run if one of KPI_TABLES was written in the meantime.
+
+    snap = get_kpis()          # {"patients": 812, "today_visits": 14, ...}
+    invalidate_kpis()          # after INSERT/UPDATE/DELETE on a counted table
+"""
+import os
+import threading
+import time
+
+from db import get_pool
+from services import query_cache
+
+KPI_TTL = float(os.environ.get("HOSPITAL_KPI_TTL_SECS", "30"))
+LOW_STOCK_THRESHOLD = 5
+
+# Tables whose writes change a counter (callers use this to decide whether to invalidate)
+KPI_TABLES = {"patients", "vitals", "blood_sugar_tests", "lab_orders", "stock"}
+
+_SNAPSHOT_SQL = f"""
+    SELECT
+        (SELECT COUNT(*) FROM patients)                                       AS patients,
+        (SELECT COUNT(*) FROM vitals)                                         AS vitals,
+        (SELECT COUNT(*) FROM blood_sugar_tests)                              AS blood_sugar_tests,
+        (SELECT COUNT(*) FROM vitals WHERE visit_day = ?)                     AS today_visits,
+        (SELECT COUNT(*) FROM lab_orders WHERE status != 'Completed')         AS pending_tests,
+        (SELECT COALESCE(SUM(qty), 0) FROM stock)                             AS stock_total,
+        (SELECT COUNT(*) FROM stock WHERE qty <= {LOW_STOCK_THRESHOLD})       AS low_stock
+"""
+
+_cache = {}        # db_path -> (expires_at, snapshot dict)
+_generation = {}   # db_path -> bumped by invalidate_kpis(); guards against caching a stale read
+_lock = threading.Lock()
+
+
+def _key(db_path: str = None) -> str:
+    return get_pool(db_path).db_path
+
+
+def _compute(db_path: str = None) -> dict:
+    # Today's UTC day as a parameter (what date('now') gives) so the cached result is per day;
+    # between writes to KPI_TABLES it comes from services.query_cache
+    today = time.strftime("%Y-%m-%d", time.gmtime())
+    row = query_cache.cached_query(_SNAPSHOT_SQL, (today,), tables=KPI_TABLES, db_path=db_path)[0]
+    snap = {k: int(row[k] or 0) for k in row.keys()}
+    snap["computed_at"] = time.time()
+    return snap
+
+
+def get_kpis(db_path: str = None, max_age: float = None) -> dict:
+    """Return the cached snapshot, recomputing it if older than `max_age` (default KPI_TTL) seconds."""
+    key = _key(db_path)
+    ttl = KPI_TTL if max_age is None else max_age
+    now = time.time()
+    with _lock:
+        hit = _cache.get(key)
+        if hit and hit[0] > now and ttl > 0:
+            return dict(hit[1])
+        gen = _generation.get(key, 0)
+
+    snap = _compute(db_path)
+
+    with _lock:
+        # Only publish if nobody invalidated while we were reading
+        if _generation.get(key, 0) == gen:
+            _cache[key] = (now + ttl, snap)
+    return dict(snap)
+
+
+def invalidate_kpis(db_path: str = None):
+    """Drop the cached snapshot; call after writing to any table in KPI_TABLES."""
+    key = _key(db_path)
+    with _lock:
+        _cache.pop(key, None)
+        _generation[key] = _generation.get(key, 0) + 1
@@ -0,0 +1,84 @@
+# services/messages.py
+"""
+Conversation feed over the messages table, paged by message id (migration 0015).
+
+A screen opens with the newest page of a role's feed (tail), pages back with the
+oldest id it holds as the cursor, and then polls for what arrived after the
+newest id it holds (since). Every call is one or two index seeks returning at
+most a page of rows, however many messages the table has.
+
+A role's feed is what it sent plus what was addressed to it; with `with_role`
+it is just the thread between the two roles (both directions).
+
+    rows, older = tail("RMP")                    # newest FEED_PAGE, oldest first
+    more, older = tail("RMP", before=older)      # the page before that
+    new = since("RMP", rows[-1]["id"])           # arrived since, oldest first
+"""
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from db import connection
+from services import query_cache
+
+FEED_PAGE = 50
+SINCE_LIMIT = 500
+# How often an open Messages screen asks for new messages
+POLL_SECS = float(os.environ.get("HOSPITAL_MESSAGES_POLL_SECS", "5"))
+
+_COLUMNS = "id, sender_role, recipient_role, message, created_at"
+
+
+def _feed(role, with_role, cond, order, bound, limit, db_path):
+    """Up to `limit` feed rows matching `cond` ('id < ?' / 'id > ?', bound to `bound`) in id `order`."""
+    if with_role:
+        lo, hi = sorted((role, with_role))
+        sql = f"""
+            SELECT {_COLUMNS} FROM messages
+            WHERE min(sender_role, recipient_role) = ? AND max(sender_role, recipient_role) = ? AND {cond}
+            ORDER BY id {order} LIMIT ?
+        """
+        params = [lo, hi, bound, limit]
+    else:
+        # Each side seeks its own index for at most `limit` rows; UNION drops a message a role sent itself
+        side = f"SELECT {_COLUMNS} FROM messages WHERE {{col}} = ? AND {cond} ORDER BY id {order} LIMIT ?"
+        sql = f"""
+            SELECT * FROM (SELECT * FROM ({side.format(col="recipient_role")}) AS received
+                           UNION
+                           SELECT * FROM ({side.format(col="sender_role")}) AS sent) AS feed
+            ORDER BY id {order} LIMIT ?
+        """
+        params = [role, bound, limit, role, bound, limit, limit]
+    return query_cache.cached_query(sql, params, tables=("messages",), db_path=db_path)
+
+
+def tail(role: str, with_role: Optional[str] = None, before: Optional[int] = None, limit: int = FEED_PAGE,
+         db_path: str = None) -> Tuple[List, Optional[int]]:
+    """
+    The newest `limit` messages of the feed (older than message id `before`, if
+    given), oldest first, and the cursor for the page before them (None when
+    there is nothing older).
+    """
+    bound = before if before is not None else 2 ** 63 - 1
+    rows = _feed(role, with_role, "id < ?", "DESC", bound, limit + 1, db_path)
+    older = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        older = rows[-1]["id"]
+    return rows[::-1], older
+
+
+def since(role: str, after_id: int, with_role: Optional[str] = None, limit: int = SINCE_LIMIT,
+          db_path: str = None) -> List:
+    """Messages of the feed with id > `after_id`, oldest first (at most `limit`; poll again for the rest)."""
+    return _feed(role, with_role, "id > ?", "ASC", int(after_id or 0), limit, db_path)
+
+
+def send(sender_role: str, recipient_role: str, text: str, db_path: str = None) -> int:
+    """Store a message; returns its id."""
+    with connection(db_path) as conn:
+        cur = conn.execute(
+            "INSERT INTO messages (sender_role, recipient_role, message, created_at) VALUES (?,?,?,?)",
+            (sender_role, recipient_role, text, datetime.utcnow().isoformat()),
+        )
+        return cur.lastrowid
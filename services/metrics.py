@@ -0,0 +1,62 @@
+# services/metrics.py
+"""
+Health Metrics chart series from the metric_rollups table (migration 0010).
+
+Readings are pre-aggregated per patient, metric and day / month / year by
+triggers, so a chart for any set of patients is one indexed query returning one
+row per bucket, however long the history:
+
+    rows = metric_series([12, 40], ["BP Sys", "FBS"], grain="month")
+    # [{"patient_id": 12, "metric": "BP Sys", "date": "2025-01-01", "value": 131.5, "n": 2}, ...]
+"""
+from typing import Iterable, List
+
+from db import connection
+
+# Chart label -> metric_rollups.metric
+METRICS = {
+    "BP Sys": "bp_sys",
+    "BP Dia": "bp_dia",
+    "Pulse": "pulse",
+    "FBS": "FBS",
+    "PPBS": "PPBS",
+    "HbA1c": "HbA1c",
+    "RBS": "RBS",
+}
+
+# Group-by choice -> metric_rollups.grain
+GRAINS = {"Daily": "day", "Monthly": "month", "Yearly": "year"}
+
+_LABELS = {v: k for k, v in METRICS.items()}
+
+
+def metric_series(patient_ids: Iterable[int], metrics: Iterable[str], grain: str = "day",
+                  db_path: str = None) -> List[dict]:
+    """
+    Mean of each metric (chart labels, see METRICS) per bucket for the patients,
+    ordered by patient, metric and date. `grain` is day / month / year (or the
+    Daily / Monthly / Yearly labels); bucket dates are UTC ('YYYY-MM-DD', first
+    day of the month / year).
+    """
+    grain = GRAINS.get(grain, grain)
+    if grain not in GRAINS.values():
+        raise ValueError(f"grain must be one of {tuple(GRAINS.values())}, not {grain!r}")
+    pids = list(dict.fromkeys(int(p) for p in patient_ids))
+    keys = [METRICS[m] for m in dict.fromkeys(metrics) if m in METRICS]
+    if not pids or not keys:
+        return []
+
+    sql = f"""
+        SELECT patient_id, metric, bucket, total / n AS value, n
+        FROM metric_rollups
+        WHERE patient_id IN ({",".join("?" * len(pids))})
+          AND grain = ?
+          AND metric IN ({",".join("?" * len(keys))})
+        ORDER BY patient_id, metric, bucket
+    """
+    with connection(db_path) as conn:
+        rows = conn.execute(sql, pids + [grain] + keys).fetchall()
+    return [
+        {"patient_id": r["patient_id"], "metric": _LABELS[r["metric"]], "date": r["bucket"], "value": r["value"], "n": r["n"]}
+        for r in rows
+    ]
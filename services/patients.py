@@ -0,0 +1,201 @@
+# services/patients.py
+"""
+Keyset-paginated patient lists.
+
+Screens page through patients with a cursor (the sort key of the last row shown)
+instead of OFFSET or a hard LIMIT, so every patient is reachable and page 500
+costs the same as page 1. Village, search text and risk filters run in SQL:
+
+  - "newest" (id DESC) seeks idx_patients_village (village, rowid) or the rowid
+  - "name" (name NOCASE, id) seeks idx_patients_name_nocase / idx_patients_village_name
+
+    rows, cursor = page_patients(order="name", village="Rampur", search="ram")
+    more, cursor = page_patients(order="name", village="Rampur", search="ram", after=cursor)
+    # cursor is None on the last page
+
+Search goes through the patients_fts full-text index (0008): every word must
+match the start of a token in name, father name, mobile, aadhar, village or
+address. `"exact words"` matches whole tokens and `village:ram` limits a word to
+one field (see fts_query).
+
+search_patients() backs the typeahead patient picker: top N matches for what the
+user typed (numeric ID, mobile / aadhar prefix, name prefix), each an index seek.
+
+Both go through services.query_cache: sessions asking for the same page share
+one result until patients (or, for risk / latest readings, vitals and sugar
+tests) change.
+"""
+import re
+from typing import List, Optional, Tuple
+
+from services import query_cache, risk
+
+PAGE_SIZE = 50
+PICKER_LIMIT = 20
+
+ORDERS = ("newest", "name")
+
+_COLUMNS = """p.id, p.name, p.age, p.gender, COALESCE(p.mobile, p.phone) AS mobile,
+              p.aadhar, p.activity_level, p.village"""
+
+_RISK_SQL = risk.sql_case("l.bp_sys", "l.bp_dia", "l.pulse", "l.fbs_value")
+
+# Latest readings (patient_latest) and the derived risk level, for with_latest=True
+_LATEST_COLUMNS = f"""l.bp_sys, l.bp_dia, l.pulse, l.sugar_value AS sugar, l.sugar_type,
+                      l.fbs_value AS fbs, l.fbs_at, {_RISK_SQL} AS risk"""
+
+
+# Fields indexed by patients_fts, usable as `field:word` in a search
+SEARCH_COLUMNS = ("name", "father_name", "mobile", "aadhar", "village", "address")
+
+_TERM = re.compile(r'(?:(\w+):)?(?:"([^"]*)"|(\w+))')
+
+
+def fts_query(text: str) -> str:
+    """
+    Search box text -> FTS5 MATCH expression (all terms must match):
+
+      ram 98          "ram"* "98"*            token prefixes, any field
+      "ram kumar"     "ram kumar"             whole tokens, as a phrase
+      village:ram     village : "ram"*        only in that field
+
+    Returns "" when the text has nothing searchable. User input never reaches
+    FTS5 syntax unquoted, so stray operators or quotes can't raise.
+    """
+    terms = []
+    for col, phrase, word in _TERM.findall(text or ""):
+        if col and col.lower() not in SEARCH_COLUMNS:
+            # "dr:ram" is just two words
+            terms.append(f'"{col}"*')
+            col = ""
+        if phrase:
+            words = re.findall(r"\w+", phrase)
+            if not words:
+                continue
+            term = '"' + " ".join(words) + '"'
+        else:
+            term = f'"{word}"*'
+        terms.append(f"{col.lower()} : {term}" if col else term)
+    return " ".join(terms)
+
+
+def _cursor(order: str, row) -> tuple:
+    return (row["id"],) if order == "newest" else (row["name"], row["id"])
+
+
+def page_patients(
+    order: str = "name",
+    after: Optional[tuple] = None,
+    limit: int = PAGE_SIZE,
+    village: Optional[str] = None,
+    search: Optional[str] = None,
+    risk_level: Optional[str] = None,
+    with_latest: bool = False,
+    db_path: str = None,
+) -> Tuple[List, Optional[tuple]]:
+    """
+    One page of patients (sqlite3.Row: id, name, age, gender, mobile, aadhar,
+    activity_level, village [+ latest readings and risk]) and the cursor for the
+    next page, or None when this is the last one.
+
+    village / risk_level of None or "All" mean no filter.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"order must be one of {ORDERS}, not {order!r}")
+
+    where, params = [], []
+    if village and village != "All":
+        where.append("p.village = ?")
+        params.append(village)
+    match = fts_query(search)
+    if match:
+        where.append("p.id IN (SELECT rowid FROM patients_fts WHERE patients_fts MATCH ?)")
+        params.append(match)
+    if risk_level and risk_level != "All":
+        where.append(f"{_RISK_SQL} = ?")
+        params.append(risk_level)
+    if after is not None:
+        if order == "newest":
+            where.append("p.id < ?")
+            params.append(after[0])
+        else:
+            # The plain >= lets SQLite seek the NOCASE index; the row value breaks name ties by id
+            where.append("p.name >= ? COLLATE NOCASE AND (p.name COLLATE NOCASE, p.id) > (?, ?)")
+            params += [after[0], after[0], after[1]]
+
+    join = with_latest or (risk_level and risk_level != "All")
+    # patient_latest is maintained from vitals / blood_sugar_tests, patients_fts from patients
+    tables = ("patients", "vitals", "blood_sugar_tests") if join else ("patients",)
+    sql = f"""
+        SELECT {_COLUMNS}{", " + _LATEST_COLUMNS if with_latest else ""}
+        FROM patients p
+        {"LEFT JOIN patient_latest l ON l.patient_id = p.id" if join else ""}
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY {"p.id DESC" if order == "newest" else "p.name COLLATE NOCASE, p.id"}
+        LIMIT ?
+    """
+    rows = query_cache.cached_query(sql, params + [limit + 1], tables=tables, db_path=db_path)
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, _cursor(order, rows[-1])
+    return rows, None
+
+
+def _prefix_end(prefix: str) -> str:
+    """Smallest string greater than every string starting with `prefix` (for range seeks)."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+# Longest digit string that always fits a SQLite INTEGER (int64); longer ones can only be a mobile / aadhar prefix
+_MAX_ID_DIGITS = 18
+
+
+def search_patients(query: str, limit: int = PICKER_LIMIT, village: Optional[str] = None,
+                    db_path: str = None) -> List:
+    """
+    Top `limit` patients (same columns as page_patients) for the patient picker.
+
+      "#123" / "123"   that ID first, then mobile / phone / aadhar starting with the digits
+                       (ASCII digits only; more than 18 of them match no ID)
+      "ram"            names starting with "ram" (case-insensitive)
+
+    Every branch is a range seek on its own index (0007) capped at `limit`, so the
+    cost doesn't grow with the number of patients.
+    """
+    text = (query or "").strip()
+    digits = text.lstrip("#").replace(" ", "")
+    in_village = " AND village = ?" if village and village != "All" else ""
+    v = [village] if in_village else []
+
+    branches, params = [], []
+    if digits.isascii() and digits.isdigit():
+        if len(digits) <= _MAX_ID_DIGITS:
+            branches.append(f"SELECT id, 0 AS rank FROM patients WHERE id = ?{in_village}")
+            params += [int(digits)] + v
+        for rank, col in ((1, "mobile"), (1, "phone"), (2, "aadhar")):
+            branches.append(
+                f"SELECT * FROM (SELECT id, {rank} AS rank FROM patients"
+                f" WHERE {col} >= ? AND {col} < ?{in_village} LIMIT ?)"
+            )
+            params += [digits, _prefix_end(digits)] + v + [limit]
+    elif text:
+        prefix = text.lower()
+        branches.append(
+            "SELECT * FROM (SELECT id, 1 AS rank FROM patients"
+            f" WHERE name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE{in_village}"
+            " ORDER BY name COLLATE NOCASE LIMIT ?)"
+        )
+        params += [prefix, _prefix_end(prefix)] + v + [limit]
+    else:
+        return []
+
+    sql = f"""
+        SELECT {_COLUMNS}
+        FROM ({" UNION ALL ".join(branches)}) m
+        JOIN patients p ON p.id = m.id
+        GROUP BY p.id
+        ORDER BY MIN(m.rank), p.name COLLATE NOCASE, p.id
+        LIMIT ?
+    """
+    return query_cache.cached_query(sql, params + [limit], tables=("patients",), db_path=db_path)
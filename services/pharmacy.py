@@ -0,0 +1,75 @@
+# services/pharmacy.py
+"""
+Pharmacy stock-and-collections grid: keyset-paginated reads and batched saves.
+
+The screen shows one page of drugs (ordered by name, optionally filtered by a
+name fragment) in a single editable table; page_drugs() seeks
+idx_pharmacy_name_nocase from the cursor, so a catalogue of thousands of SKUs
+costs one page of rows per rerun.
+
+save_changes() writes only the rows whose values changed, all in one
+transaction. Each UPDATE is conditional on the values the user started from,
+so an edit made meanwhile by someone else is reported back, not overwritten.
+
+    rows, cursor = page_drugs(search="para")
+    saved, conflicts = save_changes([{"id": 7, "distributed": 40, "amount_collected": 120.0,
+                                      "old_distributed": 35, "old_amount_collected": 100.0}])
+"""
+from typing import List, Optional, Tuple
+
+from db import connection
+from services import query_cache
+
+PAGE_SIZE = 50
+
+
+def page_drugs(after: Optional[tuple] = None, limit: int = PAGE_SIZE, search: Optional[str] = None,
+               db_path: str = None) -> Tuple[List, Optional[tuple]]:
+    """
+    One page of pharmacy rows (id, drug_name, supplied, distributed, amount_due,
+    amount_collected) by drug name, and the cursor for the next page (None on
+    the last one). `search` keeps drugs whose name contains it (any case).
+    """
+    where, params = [], []
+    if search and search.strip():
+        where.append("drug_name LIKE ? ESCAPE '\\'")
+        term = search.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params.append(f"%{term}%")
+    if after is not None:
+        # The plain >= lets SQLite seek the NOCASE index; the row value breaks name ties by id
+        where.append("drug_name >= ? COLLATE NOCASE AND (drug_name COLLATE NOCASE, id) > (?, ?)")
+        params += [after[0], after[0], after[1]]
+
+    rows = query_cache.cached_query(f"""
+        SELECT id, drug_name, COALESCE(supplied, 0) AS supplied, COALESCE(distributed, 0) AS distributed,
+               COALESCE(amount_due, 0) AS amount_due, COALESCE(amount_collected, 0) AS amount_collected
+        FROM pharmacy
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY drug_name COLLATE NOCASE, id
+        LIMIT ?
+    """, params + [limit + 1], tables=("pharmacy",), db_path=db_path)
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, (rows[-1]["drug_name"], rows[-1]["id"])
+    return rows, None
+
+
+def save_changes(changes: List[dict], db_path: str = None) -> Tuple[List[int], List[int]]:
+    """
+    Apply edited rows ({id, distributed, amount_collected, old_distributed,
+    old_amount_collected}) in one transaction. Returns (saved ids, conflicting
+    ids): a row conflicts when its stored values no longer match the old ones.
+    """
+    saved, conflicts = [], []
+    if not changes:
+        return saved, conflicts
+    with connection(db_path) as conn:
+        for c in changes:
+            cur = conn.execute("""
+                UPDATE pharmacy SET distributed = ?, amount_collected = ?
+                WHERE id = ? AND COALESCE(distributed, 0) = ? AND COALESCE(amount_collected, 0) = ?
+            """, (int(c["distributed"]), float(c["amount_collected"]), int(c["id"]),
+                  int(c["old_distributed"]), float(c["old_amount_collected"])))
+            (saved if cur.rowcount else conflicts).append(int(c["id"]))
+    return saved, conflicts
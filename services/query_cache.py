@@ -0,0 +1,117 @@
+# services/query_cache.py
+"""
+Process-wide cache of read-only query results, shared by every Streamlit session.
+
+Entries are keyed by database, SQL text and parameters, and remember the
+table_versions counters (migration 0011) of the tables the query reads. A
+lookup re-reads only those counters (one primary-key lookup per table) and
+serves the cached rows while they are unchanged; any INSERT / UPDATE / DELETE
+on one of the tables, from any session or process, bumps its counter and the
+next lookup runs the query again. There is no TTL: an idle table stays cached.
+
+Least recently used entries are evicted once the cache holds more than
+QUERY_CACHE_MAX_ENTRIES results or about QUERY_CACHE_MAX_BYTES of row data.
+HOSPITAL_QUERY_CACHE=0 turns caching off (every call runs its query).
+
+    rows = cached_query("SELECT DISTINCT village FROM patients", tables=("patients",))
+
+`tables` must list every base table the result depends on (for patient_latest,
+metric_rollups or patients_fts, the tables their triggers read: patients,
+vitals, blood_sugar_tests).
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Sequence
+
+from db import connection, get_pool
+
+QUERY_CACHE_ENABLED = os.environ.get("HOSPITAL_QUERY_CACHE", "1") != "0"
+QUERY_CACHE_MAX_BYTES = int(float(os.environ.get("HOSPITAL_QUERY_CACHE_MB", "64")) * 1024 * 1024)
+QUERY_CACHE_MAX_ENTRIES = int(os.environ.get("HOSPITAL_QUERY_CACHE_ENTRIES", "2000"))
+
+_entries = OrderedDict()   # (db_path, sql, params) -> (versions, rows, size)
+_bytes = 0
+_counters = {"hits": 0, "misses": 0, "evictions": 0}
+_lock = threading.Lock()
+
+
+def _sizeof(rows) -> int:
+    """Rough in-memory size of a result: row objects plus their values."""
+    size = sys.getsizeof(rows)
+    for r in rows:
+        size += sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r)
+    return size
+
+
+def _versions(conn, tables: Sequence[str]) -> tuple:
+    rows = conn.execute(
+        f"SELECT name, version FROM table_versions WHERE name IN ({','.join('?' * len(tables))})", tables
+    ).fetchall()
+    found = dict(tuple(r) for r in rows)
+    return tuple(found.get(t) for t in tables)
+
+
+def _store(key, versions, rows):
+    global _bytes
+    size = _sizeof(rows)
+    if size > QUERY_CACHE_MAX_BYTES // 4:   # one huge result shouldn't flush everything else
+        return
+    old = _entries.pop(key, None)
+    if old:
+        _bytes -= old[2]
+    _entries[key] = (versions, rows, size)
+    _bytes += size
+    while _entries and (_bytes > QUERY_CACHE_MAX_BYTES or len(_entries) > QUERY_CACHE_MAX_ENTRIES):
+        _, (_, _, evicted) = _entries.popitem(last=False)
+        _bytes -= evicted
+        _counters["evictions"] += 1
+
+
+def cached_query(sql: str, params: Iterable = (), tables: Sequence[str] = (), db_path: str = None) -> List:
+    """
+    fetchall() of `sql` with `params`, from memory when none of `tables` changed
+    since it was cached. Returns a new list each call (the rows themselves are
+    shared sqlite3.Row objects, which are read-only).
+    """
+    params = tuple(params)
+    tables = tuple(sorted(set(tables)))
+    if not tables:
+        raise ValueError("cached_query needs the tables the query reads")
+    if not QUERY_CACHE_ENABLED:
+        with connection(db_path) as conn:
+            return conn.execute(sql, params).fetchall()
+    key = (get_pool(db_path).db_path, sql, params)
+
+    with connection(db_path) as conn:
+        versions = _versions(conn, tables)
+        with _lock:
+            hit = _entries.get(key)
+            if hit and hit[0] == versions and None not in versions:
+                _entries.move_to_end(key)
+                _counters["hits"] += 1
+                return list(hit[1])
+            _counters["misses"] += 1
+        # Counters were read first, so these rows are at least as new as `versions`
+        rows = conn.execute(sql, params).fetchall()
+
+    if None not in versions:   # untracked table: never cache
+        with _lock:
+            _store(key, versions, rows)
+    return list(rows)
+
+
+def invalidate(db_path: str = None):
+    """Drop every cached result for the database (tests, restores, schema changes)."""
+    global _bytes
+    path = get_pool(db_path).db_path
+    with _lock:
+        for key in [k for k in _entries if k[0] == path]:
+            _bytes -= _entries.pop(key)[2]
+
+
+def stats() -> dict:
+    """Hit / miss / eviction counts and current size, for the Diagnostics tab."""
+    with _lock:
+        return {**_counters, "entries": len(_entries), "bytes": _bytes, "max_bytes": QUERY_CACHE_MAX_BYTES}
@@ -0,0 +1,69 @@
+# services/risk.py
+"""
+Red/Amber/Green risk classification shared by every screen.
+
+  🔴 Red:    BP Sys >160 or BP Dia >100 or Pulse >120 or FBS >140
+  🟠 Amber:  BP Sys 140–160 or BP Dia 90–100 or Pulse 100–120 or FBS 110–140
+  🟢 Green:  otherwise / no data
+
+classify() works on whole columns at once (NumPy), sql_case() emits the same
+rule as a CASE expression so filtering can happen inside SQLite.
+"""
+import numpy as np
+
+RED, AMBER, GREEN = "Red", "Amber", "Green"
+LEVELS = [RED, AMBER, GREEN]
+BADGES = {RED: "🔴", AMBER: "🟠", GREEN: "🟢"}
+LABELS = {RED: "🔴 Red", AMBER: "🟠 Amber", GREEN: "🟢 Green"}
+
+# metric -> (amber from, red above); both bounds of the amber band are inclusive
+THRESHOLDS = {
+    "bp_sys": (140, 160),
+    "bp_dia": (90, 100),
+    "pulse": (100, 120),
+    "fbs": (110, 140),
+}
+
+
+def _as_float(values) -> np.ndarray:
+    """Array-like/scalar with None/NaN/'' for missing -> float array (NaN = no data)."""
+    if values is None:
+        return np.array(np.nan)
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        import pandas as pd
+        return pd.to_numeric(pd.Series(np.atleast_1d(values), dtype=object), errors="coerce").to_numpy(dtype=float)
+
+
+def classify(bp_sys, bp_dia, pulse, fbs) -> np.ndarray:
+    """Vectorized classification of aligned columns (or scalars) -> array of "Red"/"Amber"/"Green"."""
+    cols = np.broadcast_arrays(*(_as_float(v) for v in (bp_sys, bp_dia, pulse, fbs)))
+    red = np.zeros(cols[0].shape, dtype=bool)
+    amber = np.zeros(cols[0].shape, dtype=bool)
+    for (amber_from, red_above), v in zip(THRESHOLDS.values(), cols):
+        red |= v > red_above
+        amber |= (v >= amber_from) & (v <= red_above)
+    return np.where(red, RED, np.where(amber, AMBER, GREEN))
+
+
+def classify_one(bp_sys=None, bp_dia=None, pulse=None, fbs=None) -> str:
+    return str(classify(bp_sys, bp_dia, pulse, fbs).reshape(-1)[0])
+
+
+def classify_frame(df, bp_sys="BP Sys", bp_dia="BP Dia", pulse="Pulse", fbs="FBS"):
+    """Risk level per row of a DataFrame (a Series aligned to df.index); missing columns = no data."""
+    import pandas as pd
+    cols = [df[c] if c in df.columns else None for c in (bp_sys, bp_dia, pulse, fbs)]
+    levels = np.broadcast_to(classify(*cols), (len(df),))
+    return pd.Series(levels, index=df.index, dtype=object)
+
+
+def sql_case(bp_sys="bp_sys", bp_dia="bp_dia", pulse="pulse", fbs="fbs_value") -> str:
+    """The same rule as a SQLite CASE expression over the given column expressions."""
+    cols = {"bp_sys": bp_sys, "bp_dia": bp_dia, "pulse": pulse, "fbs": fbs}
+    red = " OR ".join(f"{expr} > {THRESHOLDS[k][1]}" for k, expr in cols.items())
+    amber = " OR ".join(
+        f"{expr} BETWEEN {THRESHOLDS[k][0]} AND {THRESHOLDS[k][1]}" for k, expr in cols.items()
+    )
+    return f"(CASE WHEN {red} THEN '{RED}' WHEN {amber} THEN '{AMBER}' ELSE '{GREEN}' END)"
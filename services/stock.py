@@ -0,0 +1,192 @@
+# services/stock.py
+"""
+Stock levels from the stock_movements ledger (migration 0012).
+
+Every change is an appended movement: receipts, issues to health agents and
+adjustments move the on-hand quantity (a trigger keeps stock.qty in step), and
+triggers on stock_requests record requests, approvals, rejections and
+withdrawals as pending / received movements. Nothing is overwritten, so the
+ledger is also the audit trail.
+
+Balances are read from the latest stock_snapshots row set plus the movements
+after it. Once that tail reaches STOCK_SNAPSHOT_EVERY movements the next write
+(or read) folds it into a new snapshot, so a balance read scans O(items + tail)
+rows, never the whole history.
+
+    record_movement("Lancets", "receipt", 100, category="Consumables", created_by=uid)
+    record_movement("Lancets", "issue", -10, created_by=uid, note="to agent 7")
+    balances()["Lancets"]   # {"on_hand": 90, "pending": 20, "received": 40}
+
+Stock alerts (migration 0014) are rows a trigger writes when an item's on-hand
+quantity drops into the low / critical / out band; screens read them with
+open_alerts() / alert_counts() and clear them with acknowledge_alerts().
+decided_requests() lists a user's latest approved / rejected stock requests.
+"""
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from db import connection
+from services import query_cache
+
+STOCK_SNAPSHOT_EVERY = int(os.environ.get("HOSPITAL_STOCK_SNAPSHOT_EVERY", "500"))
+
+# Alert severities, worst first (bands in migrations/0014_stock_alerts.py)
+SEVERITIES = ("out", "critical", "low")
+ALERTS_SHOWN = 20
+
+# Movements that change the quantity on hand, and the sign each allows
+ON_HAND_KINDS = {"receipt": 1, "issue": -1, "adjustment": 0}
+
+_LAST_SNAPSHOT = "(SELECT COALESCE(MAX(movement_id), 0) FROM stock_snapshots)"
+
+# Latest snapshot + tail. Taking a snapshot doesn't change the result, so it is
+# cached on stock_movements alone.
+_BALANCES_SQL = f"""
+    SELECT item_name, SUM(on_hand) AS on_hand, SUM(pending) AS pending, SUM(received) AS received
+    FROM (
+        SELECT item_name, on_hand, pending, received
+        FROM stock_snapshots WHERE movement_id = {_LAST_SNAPSHOT}
+        UNION ALL
+        SELECT item_name, on_hand_delta, pending_delta, received_delta
+        FROM stock_movements WHERE id > {_LAST_SNAPSHOT}
+    ) AS levels
+    GROUP BY item_name
+"""
+
+
+def record_movement(item_name: str, kind: str, qty_delta: int, category: Optional[str] = None,
+                    unit: Optional[str] = None, created_by: Optional[int] = None, note: Optional[str] = None,
+                    db_path: str = None) -> int:
+    """
+    Append an on-hand movement (see ON_HAND_KINDS; receipts add, issues subtract,
+    adjustments either) and return the delta actually applied: an issue or
+    adjustment never takes the item below zero. Creates the stock row on first
+    receipt; `category` / `unit` update it when given.
+    """
+    sign = ON_HAND_KINDS.get(kind)
+    if sign is None:
+        raise ValueError(f"unknown stock movement kind {kind!r}; expected one of {sorted(ON_HAND_KINDS)}")
+    qty_delta = int(qty_delta)
+    if sign and qty_delta * sign < 0:
+        raise ValueError(f"{kind} quantities must be {'positive' if sign > 0 else 'negative'}")
+    now = datetime.utcnow().isoformat()
+
+    with connection(db_path) as conn:
+        conn.execute("""
+            INSERT INTO stock (item_name, category, qty, unit, last_updated) VALUES (?, ?, 0, COALESCE(?, 'pcs'), ?)
+            ON CONFLICT (item_name) DO UPDATE SET
+                category = COALESCE(excluded.category, category),
+                unit = COALESCE(?, unit)
+        """, (item_name, category, unit, now, unit))
+        # Clamp against the current level inside the INSERT, so concurrent issues can't overdraw
+        cur = conn.execute("""
+            INSERT INTO stock_movements (item_name, kind, on_hand_delta, created_by, created_at, note)
+            SELECT ?, ?, MAX(?, -COALESCE(qty, 0)), ?, ?, ? FROM stock WHERE item_name = ?
+        """, (item_name, kind, qty_delta, created_by, now, note, item_name))
+        applied = conn.execute("SELECT on_hand_delta FROM stock_movements WHERE id = ?", (cur.lastrowid,)).fetchone()[0]
+        maybe_snapshot(conn)
+    return applied
+
+
+def maybe_snapshot(conn, every: int = None) -> bool:
+    """Fold the tail into a new snapshot once it holds `every` (STOCK_SNAPSHOT_EVERY) movements."""
+    every = STOCK_SNAPSHOT_EVERY if every is None else every
+    last, upto = conn.execute(
+        f"SELECT {_LAST_SNAPSHOT}, (SELECT COALESCE(MAX(id), 0) FROM stock_movements)"
+    ).fetchone()
+    if upto - last < max(every, 1):
+        return False
+    take_snapshot(conn, last, upto)
+    return True
+
+
+def take_snapshot(conn, last: int, upto: int):
+    """Balances of every item as of movement `upto`, from snapshot `last` plus the movements in between."""
+    conn.execute("""
+        INSERT OR IGNORE INTO stock_snapshots (movement_id, item_name, on_hand, pending, received, taken_at)
+        SELECT ?, item_name, SUM(on_hand), SUM(pending), SUM(received), ?
+        FROM (
+            SELECT item_name, on_hand, pending, received FROM stock_snapshots WHERE movement_id = ?
+            UNION ALL
+            SELECT item_name, on_hand_delta, pending_delta, received_delta
+            FROM stock_movements WHERE id > ? AND id <= ?
+        )
+        GROUP BY item_name
+    """, (upto, datetime.utcnow().isoformat(), last, last, upto))
+
+
+def balances(db_path: str = None) -> Dict[str, dict]:
+    """{item_name: {"on_hand", "pending", "received"}} for every item the ledger has seen."""
+    with connection(db_path) as conn:
+        maybe_snapshot(conn)   # requests written through the triggers grow the tail too
+    rows = query_cache.cached_query(_BALANCES_SQL, tables=("stock_movements",), db_path=db_path)
+    return {
+        r["item_name"]: {"on_hand": int(r["on_hand"] or 0), "pending": int(r["pending"] or 0),
+                         "received": int(r["received"] or 0)}
+        for r in rows
+    }
+
+
+def history(item_name: Optional[str] = None, limit: int = 100, db_path: str = None) -> List:
+    """The latest `limit` movements, newest first (one item's, or all)."""
+    where, params = ("WHERE item_name = ?", [item_name]) if item_name else ("", [])
+    return query_cache.cached_query(f"""
+        SELECT id, created_at, item_name, kind, on_hand_delta, pending_delta, received_delta,
+               request_id, created_by, note
+        FROM stock_movements {where}
+        ORDER BY id DESC
+        LIMIT ?
+    """, params + [limit], tables=("stock_movements",), db_path=db_path)
+
+
+def open_alerts(limit: int = ALERTS_SHOWN, severity: Optional[str] = None, include_acknowledged: bool = False,
+                db_path: str = None) -> List:
+    """Newest stock alerts first (unacknowledged only unless `include_acknowledged`), optionally one severity."""
+    where, params = [], []
+    if not include_acknowledged:
+        where.append("acknowledged = 0")
+    if severity:
+        where.append("severity = ?")
+        params.append(severity)
+    return query_cache.cached_query(f"""
+        SELECT id, item_name, qty, severity, created_at, acknowledged, acknowledged_at, note
+        FROM stock_alerts
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY id DESC
+        LIMIT ?
+    """, params + [limit], tables=("stock_alerts",), db_path=db_path)
+
+
+def alert_counts(db_path: str = None) -> Dict[str, int]:
+    """{severity: unacknowledged alerts}, one index seek per severity."""
+    row = query_cache.cached_query(
+        "SELECT " + ", ".join(
+            f"(SELECT COUNT(*) FROM stock_alerts WHERE severity = '{s}' AND acknowledged = 0)" for s in SEVERITIES
+        ), tables=("stock_alerts",), db_path=db_path,
+    )[0]
+    return dict(zip(SEVERITIES, (int(n) for n in row)))
+
+
+def acknowledge_alerts(alert_ids: List[int], user_id: Optional[int] = None, db_path: str = None) -> int:
+    """Mark the alerts acknowledged by `user_id`; returns how many were still open."""
+    ids = [int(i) for i in alert_ids]
+    if not ids:
+        return 0
+    with connection(db_path) as conn:
+        cur = conn.execute(f"""
+            UPDATE stock_alerts SET acknowledged = 1, acknowledged_by = ?, acknowledged_at = ?
+            WHERE acknowledged = 0 AND id IN ({",".join("?" * len(ids))})
+        """, [user_id, datetime.utcnow().isoformat()] + ids)
+        return cur.rowcount
+
+
+def decided_requests(user_id: Optional[int], limit: int = ALERTS_SHOWN, db_path: str = None) -> List:
+    """The user's latest approved / rejected stock requests, newest first (seeks idx_stock_requests_requested_by)."""
+    return query_cache.cached_query("""
+        SELECT id, item_name, qty, status, requested_at
+        FROM stock_requests
+        WHERE requested_by IS ? AND status != 'Pending'
+        ORDER BY id DESC
+        LIMIT ?
+    """, [user_id, limit], tables=("stock_requests",), db_path=db_path)
@@ -1,19 +1,55 @@
+// Generated by tools/build_assets.py from static/build/assets.json -- do not edit by hand.
+const CACHE = "hospital-assets-b1ea51ab";
+const PRECACHE = [
+  "./build/logo-1200.707b6731.webp",
+  "./build/logo-1200.b3919aeb.png",
+  "./build/logo-320.180709c3.png",
+  "./build/logo-320.3c6652db.webp",
+  "./build/logo-640.64ec1610.png",
+  "./build/logo-640.9267bd68.webp",
+  "./build/style.66c1c481.css"
+];
+
 self.addEventListener("install", function(event) {
   event.waitUntil(
-    caches.open("hospital-app-cache").then(function(cache) {
-      return cache.addAll([
-        "./",
-        "./static/manifest.json",
-        "./assets/Logo_final_800px.png"
-      ]);
+    caches.open(CACHE).then(function(cache) {
+      return cache.addAll(PRECACHE);
+    }).then(function() {
+      return self.skipWaiting();
+    })
+  );
+});
+
+// Drop the caches of earlier builds
+self.addEventListener("activate", function(event) {
+  event.waitUntil(
+    caches.keys().then(function(keys) {
+      return Promise.all(keys.filter(function(key) {
+        return key !== CACHE;
+      }).map(function(key) {
+        return caches.delete(key);
+      }));
+    }).then(function() {
+      return self.clients.claim();
     })
   );
 });
 
+// Fingerprinted files never change: serve them cache-first. Everything else goes to the network.
 self.addEventListener("fetch", function(event) {
+  if (event.request.method !== "GET" || new URL(event.request.url).pathname.indexOf("/static/build/") === -1) {
+    return;
+  }
   event.respondWith(
-    caches.match(event.request).then(function(response) {
-      return response || fetch(event.request);
+    caches.open(CACHE).then(function(cache) {
+      return cache.match(event.request).then(function(hit) {
+        return hit || fetch(event.request).then(function(response) {
+          if (response.ok) {
+            cache.put(event.request, response.clone());
+          }
+          return response;
+        });
+      });
     })
   );
 });
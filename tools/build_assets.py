@@ -0,0 +1,193 @@
+# tools/build_assets.py
+"""
+Build step for the static assets: resized WebP + PNG variants of the logo,
+minified CSS, all written to static/build/ under content-hash names
+(logo-640.3f9a1c2e.webp), plus
+
+  static/build/assets.json  manifest: logical name -> built file(s), read by services/assets.py
+  static/service-worker.js  precache list and cache name generated from that manifest
+
+Streamlit serves static/ at app/static/ (server.enableStaticServing in
+.streamlit/config.toml), so screens point <img> tags at those URLs and the
+browser fetches and caches the files itself instead of receiving them over the
+websocket on every rerun. A built file's name changes whenever its bytes do, so
+anything under app/static/build/ can be cached indefinitely. Streamlit sets no
+cache headers on static files, so the proxy in front of the app has to send
+"Cache-Control: public, max-age=31536000, immutable" for that path; see
+DEPLOY.md, which also covers when the service worker can be registered.
+
+Usage (from project root), after changing a source image or static/style.css:
+> python tools/build_assets.py
+> python tools/build_assets.py -v        # list every file written
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(ROOT, "static")
+BUILD_DIR = os.path.join(STATIC_DIR, "build")
+MANIFEST = os.path.join(BUILD_DIR, "assets.json")
+SERVICE_WORKER = os.path.join(STATIC_DIR, "service-worker.js")
+
+# logical name -> (source image, widths in px). The login banner is at most 600 px
+# wide and the dashboard headers less, so 1200 covers 2x screens.
+IMAGES = {
+    "logo": ("Logo_upscaled.png", (320, 640, 1200)),
+}
+# logical name -> source stylesheet
+STYLESHEETS = {
+    "style.css": "static/style.css",
+}
+
+WEBP_QUALITY = 85
+HASH_CHARS = 8
+
+
+def _fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_CHARS]
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and the whitespace around punctuation; descendant combinators keep one space."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+def _variants(src_path, widths):
+    """(width, fmt, bytes) for every width not larger than the source, WebP and PNG."""
+    from PIL import Image
+
+    with Image.open(src_path) as im:
+        im.load()
+        for width in sorted(w for w in widths if w <= im.width) or [im.width]:
+            height = round(im.height * width / im.width)
+            resized = im.resize((width, height), Image.LANCZOS)
+            for fmt, opts in (("webp", {"quality": WEBP_QUALITY, "method": 6}), ("png", {"optimize": True})):
+                buf = io.BytesIO()
+                resized.save(buf, fmt.upper(), **opts)
+                yield width, height, fmt, buf.getvalue()
+
+
+def _write(name, ext, data, written):
+    """Write `data` as build/<name>.<hash>.<ext>; returns its path relative to static/."""
+    rel = f"build/{name}.{_fingerprint(data)}.{ext}"
+    path = os.path.join(STATIC_DIR, rel)
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(data)
+    written.append(rel)
+    return rel
+
+
+def build():
+    """Build every asset; returns (manifest, [written paths relative to static/])."""
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    manifest, written = {}, []
+
+    for name, (src, widths) in IMAGES.items():
+        entry = {"webp": {}, "png": {}}
+        for width, height, fmt, data in _variants(os.path.join(ROOT, src), widths):
+            entry[fmt][str(width)] = _write(f"{name}-{width}", fmt, data, written)
+            entry["aspect"] = round(width / height, 4)
+        manifest[name] = entry
+
+    for name, src in STYLESHEETS.items():
+        with open(os.path.join(ROOT, src), encoding="utf-8") as f:
+            css = minify_css(f.read())
+        stem, ext = os.path.splitext(name)
+        manifest[name] = _write(stem, ext.lstrip("."), css.encode("utf-8"), written)
+
+    # Files from earlier builds are no longer referenced
+    keep = {os.path.basename(p) for p in written} | {os.path.basename(MANIFEST)}
+    for fname in os.listdir(BUILD_DIR):
+        if fname not in keep:
+            os.remove(os.path.join(BUILD_DIR, fname))
+
+    manifest["version"] = _fingerprint("\n".join(sorted(written)).encode())
+    with open(MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    with open(SERVICE_WORKER, "w", encoding="utf-8") as f:
+        f.write(service_worker(manifest["version"], written))
+    return manifest, written
+
+
+def service_worker(version, files):
+    """Service worker precaching `files` (paths relative to static/, where the worker itself is served)."""
+    precache = ",\n".join(f'  "./{p}"' for p in sorted(files))
+    return f"""// Generated by tools/build_assets.py from static/build/assets.json -- do not edit by hand.
+const CACHE = "hospital-assets-{version}";
+const PRECACHE = [
+{precache}
+];
+
+self.addEventListener("install", function(event) {{
+  event.waitUntil(
+    caches.open(CACHE).then(function(cache) {{
+      return cache.addAll(PRECACHE);
+    }}).then(function() {{
+      return self.skipWaiting();
+    }})
+  );
+}});
+
+// Drop the caches of earlier builds
+self.addEventListener("activate", function(event) {{
+  event.waitUntil(
+    caches.keys().then(function(keys) {{
+      return Promise.all(keys.filter(function(key) {{
+        return key !== CACHE;
+      }}).map(function(key) {{
+        return caches.delete(key);
+      }}));
+    }}).then(function() {{
+      return self.clients.claim();
+    }})
+  );
+}});
+
+// Fingerprinted files never change: serve them cache-first. Everything else goes to the network.
+self.addEventListener("fetch", function(event) {{
+  if (event.request.method !== "GET" || new URL(event.request.url).pathname.indexOf("/static/build/") === -1) {{
+    return;
+  }}
+  event.respondWith(
+    caches.open(CACHE).then(function(cache) {{
+      return cache.match(event.request).then(function(hit) {{
+        return hit || fetch(event.request).then(function(response) {{
+          if (response.ok) {{
+            cache.put(event.request, response.clone());
+          }}
+          return response;
+        }});
+      }});
+    }})
+  );
+}});
+"""
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build fingerprinted static assets into static/build/.")
+    ap.add_argument("-v", "--verbose", action="store_true", help="list every file written")
+    args = ap.parse_args()
+
+    manifest, written = build()
+    total = sum(os.path.getsize(os.path.join(STATIC_DIR, p)) for p in written)
+    if args.verbose:
+        for p in written:
+            print(f"  static/{p}  {os.path.getsize(os.path.join(STATIC_DIR, p)) / 1024:.1f} KB")
+    print(f"{len(written)} files ({total / 1024:.0f} KB) in static/build/, build {manifest['version']}; "
+          f"wrote {os.path.relpath(MANIFEST, ROOT)} and {os.path.relpath(SERVICE_WORKER, ROOT)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,450 @@
+# tools/generate_data.py
+"""
+Synthetic hospital database for scale testing (10k – 1M patients).
+
+Builds a fresh, fully migrated database with realistic patients, villages,
+health agents, vitals, sugar tests, lab orders, medications, doctor advice,
+messages, stock, stock requests and pharmacy rows. The same --seed and
+--end-date always produce the same rows (only schema_version.applied_at differs).
+
+Rows go in with executemany() in large batches inside one transaction per
+table. The per-row maintenance triggers (patient_latest, visit_day/taken_day,
+patients_fts, patient_match_keys, metric_rollups, stock_movements) are dropped for the load and
+their tables rebuilt set-wise afterwards, which is what makes 1M patients practical.
+
+Usage (from project root):
+> python tools/generate_data.py --db data/scale_10k.db --patients 10000
+> python tools/generate_data.py --db /tmp/big.db --patients 1000000 --vitals 6 --sugar 6
+> python tools/generate_data.py --db /tmp/x.db --patients 50000 --seed 7 --end-date 2025-06-30
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from itertools import islice
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import DEFAULT_DB_PATH, MIGRATIONS_DIR, _load_migration, migrate
+from services import dedupe
+
+FIRST_NAMES = [
+    "Ramesh", "Suresh", "Lakshmi", "Padma", "Venkatesh", "Srinivas", "Anitha", "Kavitha",
+    "Ravi", "Sita", "Gopal", "Durga", "Naresh", "Swathi", "Prasad", "Manjula", "Kiran",
+    "Radha", "Satish", "Bhavani", "Mahesh", "Sunitha", "Raju", "Vijaya", "Krishna",
+    "Saraswathi", "Nagaraju", "Jyothi", "Anil", "Rani", "Chandra", "Pushpa", "Harish",
+    "Madhavi", "Sekhar", "Vani", "Mohan", "Aruna", "Balaji", "Sravani",
+]
+SURNAMES = [
+    "Reddy", "Rao", "Naidu", "Goud", "Varma", "Sharma", "Chowdary", "Murthy", "Yadav",
+    "Raju", "Setty", "Patel", "Kumar", "Babu", "Achari", "Prasad", "Devi", "Nayak",
+    "Shetty", "Pillai",
+]
+VILLAGE_STEMS = ["Rama", "Krishna", "Venkata", "Siva", "Lakshmi", "Gopala", "Nara", "Chinna", "Pedda", "Kota",
+                 "Seetha", "Bhima", "Durga", "Anantha", "Hari"]
+VILLAGE_SUFFIXES = ["puram", "palem", "peta", "gudem", "nagar", "pally", "varam", "konda", "padu", "cheruvu"]
+
+DIETS = ["Veg", "Non-Veg", "Mixed"]
+HABITS = ["No", "Occasional", "Yes"]
+ACTIVITY = ["Sedentary", "Moderate", "Active"]
+SUGAR_TYPES = [("FBS", 0.40), ("PPBS", 0.30), ("RBS", 0.25), ("HbA1c", 0.05)]
+LAB_TESTS = ["CBC", "Lipid Profile", "HbA1c", "Thyroid Profile", "Urine Routine", "LFT", "RFT", "ECG"]
+STOCK_ITEMS = [
+    ("Test Strips", "Consumables", "pcs"), ("Lancet tool", "Consumables", "pcs"),
+    ("BP cuffs", "Equipment", "pcs"), ("Thermometer", "Equipment", "pcs"),
+    ("Tape", "Consumables", "rolls"), ("Pulse Meter", "Equipment", "pcs"),
+    ("Gloves", "Consumables", "boxes"), ("Cotton", "Consumables", "packs"),
+    ("Syringes", "Consumables", "pcs"), ("Sanitizer", "Consumables", "bottles"),
+]
+DRUGS = [
+    ("Paracetamol", "500 mg"), ("Metformin", "500 mg"), ("Amlodipine", "5 mg"), ("Telmisartan", "40 mg"),
+    ("Atorvastatin", "10 mg"), ("Glimepiride", "1 mg"), ("Amoxicillin", "500 mg"), ("Vitamin D", "60k IU"),
+    ("Losartan", "50 mg"), ("Aspirin", "75 mg"), ("Pantoprazole", "40 mg"), ("Cetirizine", "10 mg"),
+]
+FREQUENCIES = ["OD", "BD", "TDS", "HS"]
+ADVICE = [
+    "Reduce salt intake and walk 30 minutes daily.",
+    "Continue current medication; recheck BP in 2 weeks.",
+    "Avoid sweets and rice at night; repeat FBS after 1 month.",
+    "Start Metformin 500 mg after breakfast; review in 15 days.",
+    "Refer to district hospital for ECG.",
+    "Drink more water, reduce tea/coffee.",
+    "Stop tobacco; counselling advised.",
+    "Vitals stable. Continue diet control.",
+]
+MESSAGES = [
+    "Please review BP readings for {name}.",
+    "Sugar values high for {name}, advise?",
+    "Follow-up visit scheduled for {name}.",
+    "Stock of test strips running low.",
+    "Medication reminder sent to {name}.",
+    "Lab report received for {name}.",
+]
+ROLES = [("RMP", "Doctor"), ("Doctor", "RMP"), ("Admin", "RMP"), ("System", "RMP"), ("RMP", "Admin")]
+
+# Triggers dropped during the bulk load (recreated from sqlite_master afterwards)
+BULK_TABLES = ("vitals", "blood_sugar_tests", "patients", "stock_requests", "stock_movements")
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def _batched(rows, size):
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _insert(conn, sql, rows, batch):
+    n = 0
+    conn.execute("BEGIN")
+    for chunk in _batched(rows, batch):
+        conn.executemany(sql, chunk)
+        n += len(chunk)
+    conn.execute("COMMIT")
+    return n
+
+
+def _villages():
+    return [stem + suffix for stem in VILLAGE_STEMS for suffix in VILLAGE_SUFFIXES]
+
+
+def _sugar_value(rng, ttype, diabetic):
+    if ttype == "HbA1c":
+        return round(rng.uniform(6.5, 10.5) if diabetic else rng.uniform(4.6, 6.2), 1)
+    if ttype == "FBS":
+        return rng.randint(120, 230) if diabetic else rng.randint(72, 125)
+    return rng.randint(160, 320) if diabetic else rng.randint(90, 170)
+
+
+def _pick_sugar_type(rng):
+    x, acc = rng.random(), 0.0
+    for ttype, p in SUGAR_TYPES:
+        acc += p
+        if x < acc:
+            return ttype
+    return SUGAR_TYPES[-1][0]
+
+
+# -----------------------------
+# Row generators (one rng per table, derived from --seed, so tables are independent)
+# -----------------------------
+def gen_rmp_users(rng, n):
+    villages = _villages()
+    for i in range(n):
+        yield (f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}", f"9{rng.randrange(10**9):09d}",
+               f"{rng.randrange(10**12):012d}", rng.choice(villages), None, "Community Health", f"Agent #{i + 1}")
+
+
+def gen_patients(rng, n, dup_rate):
+    villages = _villages()
+    recent = []
+    for _ in range(n):
+        if recent and rng.random() < dup_rate:
+            # Near-duplicate registration: same person, slightly different spelling / missing field
+            name, father, age, gender, mobile, aadhar, village = rng.choice(recent)
+            name = name.replace("a", "aa", 1) if rng.random() < 0.5 else name.upper()
+            if rng.random() < 0.5:
+                mobile = None
+        else:
+            gender = rng.choice(["Male", "Female"])
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}"
+            father = f"{rng.choice(FIRST_NAMES)} {name.split()[-1]}"
+            age = max(18, min(95, int(rng.gauss(48, 15))))
+            mobile = f"{rng.choice('6789')}{rng.randrange(10**9):09d}"
+            aadhar = f"{rng.randrange(10**11, 10**12)}"
+            village = rng.choice(villages)
+            recent.append((name, father, age, gender, mobile, aadhar, village))
+            if len(recent) > 500:
+                recent.pop(0)
+        yield (name, father, age, gender, mobile, mobile, aadhar, f"H.No {rng.randint(1, 400)}, {village}",
+               village, None, rng.choice(DIETS), "Idli", "Rice, dal", "Chapati",
+               rng.choice(HABITS), rng.choice(HABITS), rng.choice(ACTIVITY),
+               rng.choice(["", "Diabetes", "Hypertension", "Diabetes, Hypertension"]))
+
+
+def _timestamps(rng, count, days, end):
+    """`count` sorted UTC datetimes spread over the `days` days ending at `end`."""
+    start = end - timedelta(days=days)
+    span = int((end - start).total_seconds())
+    return sorted(start + timedelta(seconds=rng.randrange(span)) for _ in range(count))
+
+
+def gen_vitals(rng, patients, per_patient, days, end, agents):
+    for pid in range(1, patients + 1):
+        hypertensive = rng.random() < 0.3
+        base_sys = rng.randint(135, 165) if hypertensive else rng.randint(108, 132)
+        base_dia = rng.randint(88, 102) if hypertensive else rng.randint(70, 85)
+        base_pulse = rng.randint(64, 92)
+        height = rng.choice([150.0, 155.0, 160.0, 165.0, 170.0, 175.0])
+        weight = round(rng.uniform(48, 90), 1)
+        count = max(1, int(rng.gauss(per_patient, per_patient / 4)))
+        stamps = _timestamps(rng, count, days, end)
+        cutoff = len(stamps) - max(1, count // 10)
+        for i, ts in enumerate(stamps):
+            w = round(weight + rng.uniform(-1.5, 1.5), 1)
+            yield (pid, ts.strftime("%Y-%m-%d %H:%M:%S"), int(ts.timestamp()), ts.date().isoformat(),
+                   base_sys + rng.randint(-10, 10), base_dia + rng.randint(-6, 6), base_pulse + rng.randint(-8, 14),
+                   round(rng.uniform(97.0, 99.8), 1), rng.randint(94, 100), height, w,
+                   round(rng.uniform(70, 105), 1), round(w / (height / 100) ** 2, 1),
+                   "", rng.randint(1, agents), 1 if i < cutoff else 0, rng.choice([0, 7, 15, 30]))
+
+
+def gen_sugar(rng, patients, per_patient, days, end, agents):
+    for pid in range(1, patients + 1):
+        diabetic = rng.random() < 0.25
+        count = max(1, int(rng.gauss(per_patient, per_patient / 4)))
+        stamps = _timestamps(rng, count, days, end)
+        cutoff = len(stamps) - max(1, count // 10)
+        for i, ts in enumerate(stamps):
+            ttype = _pick_sugar_type(rng)
+            yield (pid, ttype, _sugar_value(rng, ttype, diabetic), rng.choice(["1 hr ago", "2 hrs ago", "Fasting"]),
+                   "", "", "", 1 if i < cutoff else 0, ts.isoformat(), int(ts.timestamp()), ts.date().isoformat(),
+                   rng.randint(1, agents), rng.choice([0, 15, 30]))
+
+
+def gen_lab_orders(rng, n, patients, days, end, agents):
+    for ts in _timestamps(rng, n, days, end):
+        status = "Completed" if ts < end - timedelta(days=7) or rng.random() < 0.5 else rng.choice(["Pending", "In Progress"])
+        yield (rng.randint(1, patients), ts.isoformat(), rng.choice(LAB_TESTS), rng.choice(["Routine", "Urgent"]),
+               "", rng.randint(1, agents), status)
+
+
+def gen_medications(rng, n, patients, days, end):
+    for ts in _timestamps(rng, n, days, end):
+        drug, dose = rng.choice(DRUGS)
+        yield (rng.randint(1, patients), drug, dose, rng.choice(FREQUENCIES), f"{rng.choice([5, 7, 15, 30, 90])} days",
+               None, rng.choice([7, 15, 30]), "", ts.isoformat())
+
+
+def gen_advice(rng, n, patients, days, end):
+    for ts in _timestamps(rng, n, days, end):
+        yield (rng.randint(1, patients), rng.choice(ADVICE), ts.isoformat())
+
+
+def gen_messages(rng, n, days, end):
+    for ts in _timestamps(rng, n, days, end):
+        sender, recipient = rng.choice(ROLES)
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}"
+        yield (sender, recipient, rng.choice(MESSAGES).format(name=name), ts.isoformat())
+
+
+def gen_stock(rng, end):
+    for name, category, unit in STOCK_ITEMS:
+        yield (name, category, rng.choice([0, 1, 2, 4, 5, 8, 20, 50, 120]), unit, end.isoformat())
+
+
+def gen_stock_requests(rng, n, days, end, agents):
+    for ts in _timestamps(rng, n, days, end):
+        status = rng.choice(["Approved", "Approved", "Rejected"]) if ts < end - timedelta(days=5) else "Pending"
+        yield (rng.choice(STOCK_ITEMS)[0], rng.randint(1, 20), rng.randint(1, agents), ts.isoformat(), status)
+
+
+def gen_pharmacy(rng):
+    for drug, _dose in DRUGS:
+        supplied = rng.randint(50, 500)
+        due = round(supplied * rng.uniform(5, 25), 2)
+        yield (drug, supplied, rng.randint(0, supplied), due, round(due * rng.uniform(0, 1), 2))
+
+
+# -----------------------------
+# Post-load rebuilds
+# -----------------------------
+def _rebuild_patient_latest(conn):
+    """Same content the 0004 triggers maintain, computed in one pass per table."""
+    conn.execute("BEGIN")
+    conn.execute("DELETE FROM patient_latest")
+    conn.execute("""
+        INSERT INTO patient_latest (patient_id, vitals_id, vitals_at, bp_sys, bp_dia, pulse, temperature)
+        SELECT fk_patient_id, id, recorded_at, bp_sys, bp_dia, pulse, temperature FROM (
+            SELECT v.*, ROW_NUMBER() OVER (PARTITION BY fk_patient_id ORDER BY recorded_at DESC, id DESC) AS rn
+            FROM vitals v)
+        WHERE rn = 1
+    """)
+    conn.execute("INSERT OR IGNORE INTO patient_latest (patient_id) SELECT DISTINCT fk_patient_id FROM blood_sugar_tests")
+    conn.execute("""
+        UPDATE patient_latest
+        SET sugar_id = s.id, sugar_at = s.taken_at, sugar_type = s.test_type, sugar_value = s.result_mg_dl
+        FROM (SELECT b.*, ROW_NUMBER() OVER (PARTITION BY fk_patient_id ORDER BY taken_at DESC, id DESC) AS rn
+              FROM blood_sugar_tests b) s
+        WHERE s.rn = 1 AND s.fk_patient_id = patient_latest.patient_id
+    """)
+    for ttype, col in (("FBS", "fbs"), ("PPBS", "ppbs"), ("RBS", "rbs"), ("HbA1c", "hba1c")):
+        conn.execute(f"""
+            UPDATE patient_latest
+            SET {col}_value = s.result_mg_dl, {col}_at = s.taken_at
+            FROM (SELECT b.*, ROW_NUMBER() OVER (PARTITION BY fk_patient_id ORDER BY taken_at DESC, id DESC) AS rn
+                  FROM blood_sugar_tests b WHERE test_type = '{ttype}') s
+            WHERE s.rn = 1 AND s.fk_patient_id = patient_latest.patient_id
+        """)
+    conn.execute("COMMIT")
+
+
+# -----------------------------
+# Main
+# -----------------------------
+def _rebuild_match_keys(conn):
+    """Duplicate-detection keys (0009) for every patient, so the first registration doesn't pay for them."""
+    conn.execute("BEGIN")
+    conn.execute("INSERT OR REPLACE INTO patient_match_keys (patient_id) SELECT id FROM patients")
+    conn.row_factory = sqlite3.Row
+    dedupe.sync_match_keys(conn, batch=50_000)
+    conn.row_factory = None
+    conn.execute("COMMIT")
+
+
+def _rebuild_metric_rollups(conn):
+    """Chart rollups (0010) with the migration's own set-wise backfill, so the two can't drift."""
+    rollups = _load_migration(MIGRATIONS_DIR / "0010_metric_rollups.py")
+    conn.execute("BEGIN")
+    conn.execute("DELETE FROM metric_rollups")
+    for stmt in rollups.BACKFILL:
+        conn.execute(stmt)
+    conn.execute("COMMIT")
+
+
+def _rebuild_stock_ledger(conn, taken_at):
+    """
+    Opening movements, request movements and the first snapshot (0012), from the
+    generated stock rows. The snapshot is stamped `taken_at` rather than the
+    migration's wall clock, so the same seed still gives the same rows.
+    """
+    ledger = _load_migration(MIGRATIONS_DIR / "0012_stock_ledger.py")
+    conn.execute("BEGIN")
+    conn.execute("DELETE FROM stock_snapshots")
+    conn.execute("DELETE FROM stock_movements")
+    for stmt in ledger.BACKFILL:
+        conn.execute(stmt)
+    conn.execute("UPDATE stock_snapshots SET taken_at = ?", (taken_at,))
+    conn.execute("COMMIT")
+
+
+def _rebuild_stock_alerts(conn):
+    """Open alerts (0014) for the generated items already at or below the low-stock band."""
+    alerts = _load_migration(MIGRATIONS_DIR / "0014_stock_alerts.py")
+    conn.execute("BEGIN")
+    conn.execute("DELETE FROM stock_alerts")
+    alerts.backfill(conn)
+    conn.execute("COMMIT")
+
+
+def generate(db_path, patients, vitals, sugar, days, end, seed, dup_rate=0.01, batch=50_000, log=print):
+    """Create and fill `db_path` (must not exist). Returns {table: rows inserted}."""
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists; pass a new path (or --overwrite on the CLI).")
+    migrate(db_path, log=None)
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")   # 256 MB
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+    triggers = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type='trigger' AND tbl_name IN ({','.join('?' * len(BULK_TABLES))})",
+        BULK_TABLES,
+    ).fetchall()
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+
+    agents = max(1, patients // 500)
+    end_dt = datetime.combine(end, dtime(18, 0), tzinfo=timezone.utc)
+    rngs = {t: random.Random(f"{seed}:{t}") for t in (
+        "rmp_users", "patients", "vitals", "sugar", "lab_orders", "medications", "advice", "messages",
+        "stock", "stock_requests", "pharmacy")}
+
+    steps = [
+        ("rmp_users", "INSERT INTO rmp_users (name, mobile, aadhar, address, photo_path, specialization, notes) "
+                      "VALUES (?,?,?,?,?,?,?)", gen_rmp_users(rngs["rmp_users"], agents)),
+        ("patients", "INSERT INTO patients (name, father_name, age, gender, phone, mobile, aadhar, address, village, "
+                     "photo_path, diet, breakfast, lunch, dinner, tobacco, alcohol, activity_level, family_history) "
+                     "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", gen_patients(rngs["patients"], patients, dup_rate)),
+        ("vitals", "INSERT INTO vitals (fk_patient_id, recorded_at, recorded_epoch, visit_day, bp_sys, bp_dia, pulse, "
+                   "temperature, spo2, height_cm, weight_kg, waist_cm, bmi, notes, recorded_by, sent_to_doctor, "
+                   "frequency_days) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+         gen_vitals(rngs["vitals"], patients, vitals, days, end_dt, agents)),
+        ("blood_sugar_tests", "INSERT INTO blood_sugar_tests (fk_patient_id, test_type, result_mg_dl, last_meal_time, "
+                              "history, symptoms, notes, sent_to_doctor, taken_at, taken_epoch, taken_day, recorded_by, "
+                              "frequency_days) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)",
+         gen_sugar(rngs["sugar"], patients, sugar, days, end_dt, agents)),
+        ("lab_orders", "INSERT INTO lab_orders (fk_patient_id, ordered_at, test_name, priority, notes, ordered_by, status) "
+                       "VALUES (?,?,?,?,?,?,?)",
+         gen_lab_orders(rngs["lab_orders"], max(1, patients // 5), patients, days, end_dt, agents)),
+        ("medications", "INSERT INTO medications (patient_id, drug_name, dose, frequency, duration, referral_facility, "
+                        "follow_up_days, reason, created_at) VALUES (?,?,?,?,?,?,?,?,?)",
+         gen_medications(rngs["medications"], patients, patients, days, end_dt)),
+        ("doctor_advice", "INSERT INTO doctor_advice (patient_id, advice, created_at) VALUES (?,?,?)",
+         gen_advice(rngs["advice"], max(1, patients // 2), patients, days, end_dt)),
+        ("messages", "INSERT INTO messages (sender_role, recipient_role, message, created_at) VALUES (?,?,?,?)",
+         gen_messages(rngs["messages"], max(10, patients // 10), days, end_dt)),
+        ("stock", "INSERT INTO stock (item_name, category, qty, unit, last_updated) VALUES (?,?,?,?,?)",
+         gen_stock(rngs["stock"], end_dt)),
+        ("stock_requests", "INSERT INTO stock_requests (item_name, qty, requested_by, requested_at, status) "
+                           "VALUES (?,?,?,?,?)",
+         gen_stock_requests(rngs["stock_requests"], max(10, agents * 12), days, end_dt, agents)),
+        ("pharmacy", "INSERT INTO pharmacy (drug_name, supplied, distributed, amount_due, amount_collected) "
+                     "VALUES (?,?,?,?,?)", gen_pharmacy(rngs["pharmacy"])),
+    ]
+
+    counts = {}
+    for table, sql, rows in steps:
+        t0 = time.perf_counter()
+        counts[table] = _insert(conn, sql, rows, batch)
+        if log:
+            elapsed = time.perf_counter() - t0
+            log(f"  {table:<18} {counts[table]:>10,} rows  {elapsed:6.1f}s  ({counts[table] / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    t0 = time.perf_counter()
+    _rebuild_patient_latest(conn)
+    conn.execute("INSERT INTO patients_fts (patients_fts) VALUES ('rebuild')")
+    _rebuild_match_keys(conn)
+    _rebuild_metric_rollups(conn)
+    _rebuild_stock_ledger(conn, end_dt.isoformat())
+    _rebuild_stock_alerts(conn)
+    for _, sql in triggers:
+        conn.execute(sql)
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    if log:
+        log(f"  patient_latest / search index / match keys / rollups / stock ledger + alerts / triggers / ANALYZE  {time.perf_counter() - t0:6.1f}s")
+    return counts
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", required=True, help="new database file to create")
+    ap.add_argument("--patients", type=int, default=10_000)
+    ap.add_argument("--vitals", type=int, default=24, help="average vitals readings per patient")
+    ap.add_argument("--sugar", type=int, default=12, help="average sugar tests per patient")
+    ap.add_argument("--days", type=int, default=730, help="history window in days")
+    ap.add_argument("--end-date", type=date.fromisoformat, default=date.today(),
+                    help="last day of generated history (default: today; pin it for byte-identical output)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--dup-rate", type=float, default=0.01, help="share of near-duplicate patient registrations")
+    ap.add_argument("--batch", type=int, default=50_000, help="rows per executemany() call")
+    ap.add_argument("--overwrite", action="store_true", help="delete --db first if it exists")
+    args = ap.parse_args()
+
+    if os.path.abspath(args.db) == os.path.abspath(DEFAULT_DB_PATH):
+        ap.error("refusing to generate into the live database; pick another --db")
+    if args.overwrite:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+
+    print(f"DB path : {args.db}  (patients={args.patients:,}, seed={args.seed}, end={args.end_date})")
+    t0 = time.perf_counter()
+    counts = generate(args.db, args.patients, args.vitals, args.sugar, args.days, args.end_date,
+                      args.seed, args.dup_rate, args.batch)
+    print(f"Done: {sum(counts.values()):,} rows in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
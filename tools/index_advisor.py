@@ -0,0 +1,239 @@
+# tools/index_advisor.py
+"""
+Index advisor: runs EXPLAIN QUERY PLAN over the app's hot queries and fails
+(exit code 1) if any of them does a full table scan.
+
+Usage (from project root):
+> python tools/index_advisor.py                 # against HOSPITAL_DB_PATH / data/hospital.db
+> python tools/index_advisor.py --db copy.db -v # print every plan
+
+Keep HOT_QUERIES in sync with the SQL in modules/*/app.py when a hot path changes.
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import DEFAULT_DB_PATH
+
+# name -> (sql, params, tables/aliases allowed to be scanned in full)
+HOT_QUERIES = {
+    "patients_page_name": (
+        """SELECT p.id, p.name, l.bp_sys, l.bp_dia, l.pulse, l.sugar_value AS sugar, l.sugar_type
+           FROM patients p
+           LEFT JOIN patient_latest l ON l.patient_id = p.id
+           WHERE p.name >= ? COLLATE NOCASE AND (p.name COLLATE NOCASE, p.id) > (?, ?)
+           ORDER BY p.name COLLATE NOCASE, p.id LIMIT 51""",
+        ("m", "m", 0), set(),
+    ),
+    "patients_page_village_name": (
+        """SELECT p.id, p.name FROM patients p
+           WHERE p.village = ? AND p.name >= ? COLLATE NOCASE AND (p.name COLLATE NOCASE, p.id) > (?, ?)
+           ORDER BY p.name COLLATE NOCASE, p.id LIMIT 51""",
+        ("x", "m", "m", 0), set(),
+    ),
+    "patients_fts_search": (
+        """SELECT p.id, p.name FROM patients p
+           WHERE p.id IN (SELECT rowid FROM patients_fts WHERE patients_fts MATCH ?)
+           ORDER BY p.name COLLATE NOCASE, p.id LIMIT 101""",
+        ('"ra"*',), set(),
+    ),
+    "picker_name_prefix": (
+        """SELECT id FROM patients
+           WHERE name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE
+           ORDER BY name COLLATE NOCASE LIMIT 20""",
+        ("ra", "rb"), set(),
+    ),
+    "picker_mobile_prefix": (
+        "SELECT id FROM patients WHERE mobile >= ? AND mobile < ? LIMIT 20",
+        ("98765", "98766"), set(),
+    ),
+    "picker_phone_prefix": (
+        "SELECT id FROM patients WHERE phone >= ? AND phone < ? LIMIT 20",
+        ("98765", "98766"), set(),
+    ),
+    "picker_aadhar_prefix": (
+        "SELECT id FROM patients WHERE aadhar >= ? AND aadhar < ? LIMIT 20",
+        ("12345", "12346"), set(),
+    ),
+    "dedupe_blocking": (
+        """SELECT patient_id, village_key, age, gender, name_norm, father_norm, mobile_hash, aadhar_hash
+           FROM patient_match_keys
+           WHERE (village_key = ? AND age BETWEEN ? AND ?) OR (name_key = ? AND age BETWEEN ? AND ?)
+              OR mobile_hash = ? OR aadhar_hash = ?""",
+        ("rampur", 40, 50, "rms", 40, 50, "x", "y"), set(),
+    ),
+    "dedupe_stale_keys": (
+        """SELECT p.id, p.name FROM patient_match_keys k CROSS JOIN patients p
+           WHERE k.stale = 1 AND p.id = k.patient_id LIMIT 5000""",
+        (), set(),
+    ),
+    "health_metrics_series": (
+        """SELECT patient_id, metric, bucket, total / n AS value, n
+           FROM metric_rollups
+           WHERE patient_id IN (?, ?, ?) AND grain = ? AND metric IN (?, ?)
+           ORDER BY patient_id, metric, bucket""",
+        (1, 2, 3, "day", "bp_sys", "FBS"), set(),
+    ),
+    "query_cache_versions": (
+        "SELECT name, version FROM table_versions WHERE name IN (?, ?)",
+        ("patients", "vitals"), set(),
+    ),
+    "stock_balances": (
+        """SELECT item_name, SUM(on_hand), SUM(pending), SUM(received) FROM (
+               SELECT item_name, on_hand, pending, received FROM stock_snapshots
+               WHERE movement_id = (SELECT COALESCE(MAX(movement_id), 0) FROM stock_snapshots)
+               UNION ALL
+               SELECT item_name, on_hand_delta, pending_delta, received_delta FROM stock_movements
+               WHERE id > (SELECT COALESCE(MAX(movement_id), 0) FROM stock_snapshots)) AS levels
+           GROUP BY item_name""",
+        (), {"levels"},   # the snapshot + tail rows themselves
+    ),
+    "stock_item_history": (
+        """SELECT id, created_at, kind, on_hand_delta FROM stock_movements
+           WHERE item_name = ? ORDER BY id DESC LIMIT 100""",
+        ("Lancets",), set(),
+    ),
+    "stock_alerts_open": (
+        """SELECT id, item_name, qty, severity, created_at FROM stock_alerts
+           WHERE acknowledged = 0 ORDER BY id DESC LIMIT 20""",
+        (), set(),
+    ),
+    "stock_alerts_open_severity": (
+        """SELECT id, item_name, qty, created_at FROM stock_alerts
+           WHERE acknowledged = 0 AND severity = ? ORDER BY id DESC LIMIT 20""",
+        ("out",), set(),
+    ),
+    "stock_alert_counts": (
+        "SELECT COUNT(*) FROM stock_alerts WHERE severity = ? AND acknowledged = 0",
+        ("low",), set(),
+    ),
+    "stock_requests_decided": (
+        """SELECT id, item_name, qty, status, requested_at FROM stock_requests
+           WHERE requested_by IS ? AND status != 'Pending' ORDER BY id DESC LIMIT 20""",
+        (1,), set(),
+    ),
+    "messages_feed_tail": (
+        """SELECT * FROM (
+               SELECT * FROM (SELECT id, message FROM messages WHERE recipient_role = ? AND id < ?
+                              ORDER BY id DESC LIMIT 51) AS received
+               UNION
+               SELECT * FROM (SELECT id, message FROM messages WHERE sender_role = ? AND id < ?
+                              ORDER BY id DESC LIMIT 51) AS sent) AS feed
+           ORDER BY id DESC LIMIT 51""",
+        ("RMP", 10 ** 9, "RMP", 10 ** 9), {"received", "sent", "feed"},   # the two index seeks' own rows
+    ),
+    "messages_thread_since": (
+        """SELECT id, message FROM messages
+           WHERE min(sender_role, recipient_role) = ? AND max(sender_role, recipient_role) = ? AND id > ?
+           ORDER BY id ASC LIMIT 500""",
+        ("Doctor", "RMP", 0), set(),
+    ),
+    "pharmacy_page": (
+        """SELECT id, drug_name, supplied, distributed, amount_due, amount_collected FROM pharmacy
+           WHERE drug_name >= ? COLLATE NOCASE AND (drug_name COLLATE NOCASE, id) > (?, ?)
+           ORDER BY drug_name COLLATE NOCASE, id LIMIT 51""",
+        ("m", "m", 0), set(),
+    ),
+    "risk_badge_latest": (
+        "SELECT bp_sys, bp_dia, pulse, fbs_value FROM patient_latest WHERE patient_id=?",
+        (1,), set(),
+    ),
+    "patients_page_village_newest": (
+        """SELECT p.id, p.name, p.age, p.gender, COALESCE(p.mobile, p.phone) AS mobile, p.aadhar,
+                  p.activity_level, p.village
+           FROM patients p WHERE p.village = ? AND p.id < ? ORDER BY p.id DESC LIMIT 101""",
+        ("x", 1000), set(),
+    ),
+    "list_villages": (
+        """SELECT DISTINCT village FROM patients
+           WHERE village IS NOT NULL AND TRIM(village) <> ''
+           ORDER BY village COLLATE NOCASE""",
+        (), set(),
+    ),
+    "recent_unsent_vitals": (
+        """SELECT v.id, p.name, v.recorded_at FROM vitals v
+           JOIN patients p ON p.id = v.fk_patient_id
+           WHERE v.sent_to_doctor = 0 ORDER BY v.id DESC LIMIT 100""",
+        (), set(),
+    ),
+    "recent_unsent_sugar": (
+        """SELECT t.id, p.name, t.taken_at FROM blood_sugar_tests t
+           JOIN patients p ON p.id = t.fk_patient_id
+           WHERE t.sent_to_doctor = 0 ORDER BY t.id DESC LIMIT 100""",
+        (), set(),
+    ),
+    "reports_latest_advice": (
+        "SELECT advice, created_at FROM doctor_advice WHERE patient_id=? ORDER BY id DESC LIMIT 1",
+        (1,), set(),
+    ),
+    "reports_medications": (
+        """SELECT drug_name, dose, frequency, duration, referral_facility, follow_up_days, reason, created_at
+           FROM medications WHERE patient_id=? ORDER BY id DESC""",
+        (1,), set(),
+    ),
+    "kpi_today_visits": (
+        "SELECT COUNT(*) FROM vitals WHERE visit_day = date('now')",
+        (), set(),
+    ),
+    "management_today_visits": (
+        """SELECT v.id, p.name, v.recorded_at, v.bp_sys, v.bp_dia, v.pulse, v.temperature
+           FROM vitals v JOIN patients p ON p.id = v.fk_patient_id
+           WHERE v.visit_day = date('now')
+           ORDER BY v.id DESC""",
+        (), set(),
+    ),
+    "my_stock_requests": (
+        """SELECT id, item_name, qty, status, requested_at FROM stock_requests
+           WHERE requested_by IS ? ORDER BY id DESC LIMIT 50""",
+        (1,), set(),
+    ),
+}
+
+# "SCAN vitals" / "SCAN TABLE vitals AS v" without a USING ... INDEX clause = full table scan
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\S+)(?: AS (\S+))?$")
+
+
+def full_scans(conn, sql, params):
+    """Return (plan_lines, [table-or-alias scanned in full, ...])."""
+    plan = [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+    scans = []
+    for detail in plan:
+        m = _FULL_SCAN.match(detail.strip())
+        if m:
+            scans.append((m.group(1), m.group(2) or m.group(1)))
+    return plan, scans
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fail if a hot query does a full table scan.")
+    ap.add_argument("--db", default=DEFAULT_DB_PATH)
+    ap.add_argument("-v", "--verbose", action="store_true", help="print every query plan")
+    args = ap.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    failures = 0
+    for name, (sql, params, allowed) in HOT_QUERIES.items():
+        try:
+            plan, scans = full_scans(conn, sql, params)
+        except sqlite3.Error as e:
+            print(f"ERROR {name}: {e}")
+            failures += 1
+            continue
+        bad = [t for t, alias in scans if t not in allowed and alias not in allowed]
+        print(f"{'FAIL' if bad else 'ok  '} {name}" + (f"  (full scan: {', '.join(bad)})" if bad else ""))
+        if bad or args.verbose:
+            for detail in plan:
+                print(f"       {detail}")
+        failures += bool(bad)
+    conn.close()
+
+    print(f"\n{len(HOT_QUERIES) - failures}/{len(HOT_QUERIES)} hot queries use indexes.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
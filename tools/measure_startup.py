@@ -0,0 +1,129 @@
+# tools/measure_startup.py
+"""
+Cold-start and per-rerun cost of app.py for each role, measured headless with
+Streamlit's AppTest. Every measurement runs in a fresh Python process, so module
+imports are really cold:
+
+  import_ms         importing each dashboard module on its own (after streamlit)
+  login_cold_ms     first run of app.py: the login page, plus whatever app.py imports
+  dashboard_cold_ms first logged-in run in that process (lazy dashboards import here)
+  rerun_ms          median wall time of --reruns further reruns of the dashboard
+  loaded            modules/*/app.py dashboards imported by the end of the run
+
+Usage (from project root):
+> python tools/measure_startup.py                          # generated 1k-patient DB
+> python tools/measure_startup.py --db copy.db --reruns 20 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from tools.profile_renders import ROLE_LOGINS, _login, _prepare_db
+
+DASHBOARD_MODULES = ("modules.patient.app", "modules.health_agent.app", "modules.doctor.app", "modules.management.app")
+
+
+def _child_import(module):
+    import importlib
+
+    import streamlit  # noqa: F401  (its own import cost is not the dashboard's)
+
+    t0 = time.perf_counter()
+    importlib.import_module(module)
+    return {"import_ms": (time.perf_counter() - t0) * 1000}
+
+
+def _child_role(role, reruns, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    t0 = time.perf_counter()
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=timeout)
+    at.run()
+    login_cold = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    at = _login(AppTest, role, timeout)   # login page run + the first dashboard run
+    dashboard_cold = (time.perf_counter() - t0) * 1000
+
+    times = []
+    for _ in range(reruns):
+        t0 = time.perf_counter()
+        at.run()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {
+        "login_cold_ms": login_cold,
+        "dashboard_cold_ms": dashboard_cold,
+        "rerun_ms": statistics.median(times) if times else None,
+        "errors": [str(e.value)[:200] for e in at.exception],
+        "loaded": sorted(m.split(".")[1] for m in sys.modules if m in DASHBOARD_MODULES),
+    }
+
+
+def _spawn(args, *child_args):
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--db", args.db, *child_args],
+        capture_output=True, text=True, cwd=ROOT, env=os.environ,
+    )
+    for line in reversed(out.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"child {child_args} failed:\n{out.stderr[-2000:]}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", help="measure against this database (default: generated, --patients)")
+    ap.add_argument("--patients", type=int, default=1000)
+    ap.add_argument("--roles", default=",".join(ROLE_LOGINS), help="comma-separated roles")
+    ap.add_argument("--reruns", type=int, default=10)
+    ap.add_argument("--timeout", type=float, default=300, help="AppTest timeout per run (s)")
+    ap.add_argument("--json", help="also write the results to this file")
+    ap.add_argument("--child-role", help=argparse.SUPPRESS)
+    ap.add_argument("--child-import", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    args.db = _prepare_db(args)
+    os.chdir(ROOT)   # app.py loads assets relative to cwd
+    if args.child_import:
+        print(json.dumps(_child_import(args.child_import)))
+        return
+    if args.child_role:
+        print(json.dumps(_child_role(args.child_role, args.reruns, args.timeout)))
+        return
+
+    import db
+
+    db.migrate(args.db, log=None)
+    for role, (username, password, name) in ROLE_LOGINS.items():
+        db.create_user(username, role, password, name=name, db_path=args.db)
+
+    results = {"imports": {}, "roles": {}}
+    print("== module import (fresh process, after streamlit) ==")
+    for module in DASHBOARD_MODULES:
+        r = results["imports"][module] = _spawn(args, "--child-import", module)
+        print(f"  {module:<28}{r['import_ms']:>9.1f} ms")
+
+    print(f"\n== app.py per role (fresh process each; rerun = median of {args.reruns}) ==")
+    print(f"  {'role':<14}{'login cold':>12}{'dashboard cold':>16}{'rerun':>10}  loaded dashboards")
+    for role in [r.strip() for r in args.roles.split(",") if r.strip()]:
+        r = results["roles"][role] = _spawn(args, "--child-role", role, "--reruns", str(args.reruns),
+                                            "--timeout", str(args.timeout))
+        flag = "  !! " + r["errors"][0][:60] if r["errors"] else ""
+        print(f"  {role:<14}{r['login_cold_ms']:>9.1f} ms{r['dashboard_cold_ms']:>13.1f} ms"
+              f"{r['rerun_ms']:>7.1f} ms  {', '.join(r['loaded'])}{flag}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWritten to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
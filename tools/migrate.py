@@ -0,0 +1,65 @@
+# tools/migrate.py
+"""
+Apply database schema migrations (run once per deploy, before starting Streamlit),
+then fill the duplicate-detection keys (migration 0009) of every patient still
+marked stale, so the first registration after a deploy only refreshes the few
+rows changed since instead of computing keys for the whole table in a rerun.
+Usage (from project root):
+> python tools/migrate.py              # apply everything pending
+> python tools/migrate.py --status     # show applied / pending versions
+> python tools/migrate.py --db other.db --target 2
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite3
+
+from db import DEFAULT_DB_PATH, migrate, migration_files, schema_version
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Apply hospital.db schema migrations.")
+    ap.add_argument("--db", default=DEFAULT_DB_PATH, help=f"database file (default: {DEFAULT_DB_PATH})")
+    ap.add_argument("--target", type=int, default=None, help="stop after this version")
+    ap.add_argument("--status", action="store_true", help="list migrations without applying")
+    args = ap.parse_args()
+
+    print(f"DB path : {args.db}")
+    if args.status:
+        conn = sqlite3.connect(args.db)
+        current = schema_version(conn)
+        conn.close()
+        for version, name, _ in migration_files():
+            state = "applied" if version <= current else "pending"
+            print(f"  {version:04d}_{name:<40} {state}")
+        return
+
+    applied = migrate(args.db, target=args.target)
+    print(f"Applied {len(applied)} migration(s)." if applied else "Schema already up to date.")
+    sync_match_keys(args.db)
+
+
+def sync_match_keys(db_path):
+    """dedupe.sync_match_keys over the whole table, in one transaction (no-op before 0009)."""
+    from services import dedupe
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'patient_match_keys'").fetchone():
+            return
+        t0 = time.perf_counter()
+        with conn:
+            done = dedupe.sync_match_keys(conn, batch=50_000)
+        if done:
+            print(f"Filled duplicate-detection keys for {done} patient(s) in {time.perf_counter() - t0:.1f}s.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
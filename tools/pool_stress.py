@@ -0,0 +1,79 @@
+# tools/pool_stress.py
+"""
+Simulate many concurrent Streamlit sessions re-rendering the Management dashboard
+and report how many physical SQLite connections were opened per rerun.
+
+Usage (from project root):
+> python tools/pool_stress.py --sessions 50 --reruns 20
+> python tools/pool_stress.py --sessions 50 --reruns 20 --pool-size 0   # unpooled, for comparison
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# One Management render = the KPI snapshot (services.kpis, cached) + Overview + Stock queries
+RENDER_QUERIES = [
+    "SELECT v.id FROM vitals v JOIN patients p ON p.id = v.fk_patient_id WHERE v.visit_day = date('now')",
+    "SELECT id, item_name, category, qty, unit, last_updated FROM stock WHERE qty <= 5",
+]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", help="database file (default: HOSPITAL_DB_PATH / data/hospital.db)")
+    ap.add_argument("--sessions", type=int, default=50)
+    ap.add_argument("--reruns", type=int, default=20)
+    ap.add_argument("--pool-size", type=int, default=None)
+    args = ap.parse_args()
+
+    if args.db:
+        os.environ["HOSPITAL_DB_PATH"] = args.db
+    if args.pool_size is not None:
+        os.environ["HOSPITAL_DB_POOL_SIZE"] = str(args.pool_size)
+
+    import db  # after env overrides
+    from services import kpis
+
+    per_rerun = []
+    lock = threading.Lock()
+    start = threading.Barrier(args.sessions)
+
+    def session():
+        start.wait()
+        for _ in range(args.reruns):
+            db.begin_rerun()
+            kpis.get_kpis()
+            for sql in RENDER_QUERIES:
+                conn = db.get_connection()
+                conn.execute(sql).fetchall()
+                conn.close()
+            with lock:
+                per_rerun.append(db.rerun_stats())
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=session) for _ in range(args.sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    pool = db.get_pool().stats()
+    reruns = len(per_rerun)
+    checkouts = sum(r["checkouts"] for r in per_rerun)
+    opened = sum(r["opened"] for r in per_rerun)
+    print(f"DB path              : {pool['db_path']}")
+    print(f"Pool size            : {pool['max_size'] or 'unpooled'}")
+    print(f"Sessions x reruns    : {args.sessions} x {args.reruns} = {reruns}")
+    print(f"Checkouts per rerun  : {checkouts / reruns:.2f}")
+    print(f"Opened per rerun     : {opened / reruns:.3f}")
+    print(f"Physical connections : {pool['opened_total']} (still open: {pool['open']})")
+    print(f"Wall time            : {elapsed:.2f}s ({reruns / elapsed:.0f} reruns/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+# tools/profile_renders.py
+"""
+Headless render profiler: drives app.py through Streamlit's AppTest (no browser),
+logs in as each seeded role, walks every section / sub-state, and records per rerun:
+
+  - wall time of the full script run
+  - SQL statements executed, rows fetched and time spent in SQLite (db query tracing)
+  - peak Python memory (tracemalloc, measured on a separate rerun so it doesn't skew timings)
+
+Outputs (in --out):
+  summary.md / summary.json   one row per role/section
+  profile.folded              sampled stacks in "frame;frame;frame count" form, ready for
+                              flamegraph.pl, speedscope.app or `inferno-flamegraph`
+
+Usage (from project root):
+> python tools/profile_renders.py                               # generated 1k-patient DB
+> python tools/profile_renders.py --patients 10000 --reruns 5
+> python tools/profile_renders.py --db copy.db --roles "Health Agent" --sections "Record Vitals,Reports"
+
+Exit code 1 if any screen raised, so CI can run it as a smoke test too.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+# Same accounts SeedData/seed_users.py creates
+ROLE_LOGINS = {
+    "Health Agent": ("agent1", "agentpass", "Health Agent One"),
+    "Management": ("manager1", "managerpass", "Manager One"),
+    "Doctor": ("doctor1", "doctorpass", "Doctor One"),
+    "Patient": ("patient1", "patientpass", "Patient One"),
+}
+
+# role -> [(section label, session_state to set before the rerun)]
+SCENARIOS = {
+    "Health Agent": [
+        ("Dashboard", {"rmp_section": "Dashboard"}),
+        ("Patients", {"rmp_section": "Patients", "patients_sub": "Menu"}),
+        ("Patients / New", {"rmp_section": "Patients", "patients_sub": "Patients_New"}),
+        ("Patients / Search", {"rmp_section": "Patients", "patients_sub": "Patients_Search"}),
+        ("Record Vitals", {"rmp_section": "Record Vitals"}),
+        ("Sugar Blood Test", {"rmp_section": "Sugar Blood Test"}),
+        ("Stock", {"rmp_section": "Stock", "stock_sub": "Menu"}),
+        ("Stock / Order List", {"rmp_section": "Stock", "stock_sub": "Stock_Order_List"}),
+        ("Stock / Low Alert", {"rmp_section": "Stock", "stock_sub": "Stock_Low_Alert"}),
+        ("Health Profiles", {"rmp_section": "Health Profiles"}),
+        ("Messages", {"rmp_section": "Messages"}),
+        ("Reports", {"rmp_section": "Reports"}),
+        ("SOPs", {"rmp_section": "SOPs"}),
+        ("Pharmacy", {"rmp_section": "Pharmacy"}),
+        ("Profile", {"rmp_section": "Profile"}),
+    ],
+    "Management": [("Dashboard (all tabs)", {})],
+    "Doctor": [("Dashboard (all tabs)", {})],
+    "Patient": [
+        ("Dashboard", {"patient_section": "Patient_Dashboard"}),
+        ("Case Allocation", {"patient_section": "Case_Allocation"}),
+        ("Doctor Workload", {"patient_section": "Doctor_Workload"}),
+        ("Assignment Rules", {"patient_section": "Assignment_Rules"}),
+        ("Drilldown", {"patient_section": "Drilldown"}),
+        ("Profile", {"patient_section": "Profile"}),
+    ],
+}
+
+
+# -----------------------------
+# Stack sampler (flame graph input)
+# -----------------------------
+class StackSampler(threading.Thread):
+    """Samples the script-runner thread(s) every `interval` seconds into folded stacks."""
+
+    def __init__(self, interval: float):
+        super().__init__(daemon=True, name="render-profiler-sampler")
+        self.interval = interval
+        self.counts = Counter()
+        self.label = None
+        self._stop_evt = threading.Event()
+        self._skip = {threading.main_thread().ident}
+
+    def run(self):
+        self._skip.add(threading.get_ident())
+        while not self._stop_evt.wait(self.interval):
+            label = self.label
+            if label is None:
+                continue
+            for ident, frame in sys._current_frames().items():
+                if ident in self._skip:
+                    continue
+                stack = []
+                ours = False
+                while frame is not None:
+                    code = frame.f_code
+                    filename = code.co_filename
+                    if filename.startswith(ROOT):
+                        ours = True
+                        filename = os.path.relpath(filename, ROOT)
+                    else:
+                        filename = os.path.basename(filename)
+                    stack.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if ours:   # only threads running app code (skip idle Streamlit workers)
+                    self.counts[";".join([label] + stack[::-1])] += 1
+
+    def stop(self):
+        self._stop_evt.set()
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in sorted(self.counts.items()):
+                f.write(f"{stack} {n}\n")
+
+
+# -----------------------------
+# Driving the app
+# -----------------------------
+def _login(AppTest, role, timeout):
+    username, password, _ = ROLE_LOGINS[role]
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=timeout)
+    at.run()
+    at.text_input[0].input(username)
+    at.text_input[1].input(password)
+    at.selectbox[0].select(role)
+    at.button[0].click()
+    at.run()
+    if "user" not in at.session_state:
+        errors = [e.value for e in at.error]
+        raise RuntimeError(f"login as {username} ({role}) failed: {errors}")
+    return at
+
+
+def _profile_section(at, state, reruns, sampler, label):
+    import db
+
+    runs = []
+    errors = []
+    for i in range(reruns + 1):   # last extra run measures memory
+        for k, v in state.items():
+            at.session_state[k] = v
+        measure_mem = i == reruns
+        if measure_mem:
+            tracemalloc.start()
+        else:
+            sampler.label = label
+        before = db.query_totals()
+        t0 = time.perf_counter()
+        at.run()
+        wall = time.perf_counter() - t0
+        sampler.label = None
+        after = db.query_totals()
+        if measure_mem:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            runs.append({
+                "wall_ms": wall * 1000,
+                "queries": after["queries"] - before["queries"],
+                "rows": after["rows"] - before["rows"],
+                "sql_ms": after["sql_ms"] - before["sql_ms"],
+            })
+        errors = [str(e.value)[:300] for e in at.exception]
+    return {
+        "wall_ms_p50": round(statistics.median(r["wall_ms"] for r in runs), 1),
+        "wall_ms_max": round(max(r["wall_ms"] for r in runs), 1),
+        "sql_ms_p50": round(statistics.median(r["sql_ms"] for r in runs), 1),
+        "queries": runs[-1]["queries"],
+        "rows": runs[-1]["rows"],
+        "peak_mem_mb": round(peak / 2**20, 1),
+        "errors": errors,
+    }
+
+
+def _prepare_db(args):
+    """Point HOSPITAL_DB_PATH at the target database (before db is imported), generating it if needed."""
+    path = args.db or os.path.join(tempfile.gettempdir(), "hospital_bench", f"profile_{args.patients}.db")
+    os.environ["HOSPITAL_DB_PATH"] = path
+    if not args.db and not os.path.exists(path):
+        from tools.generate_data import generate
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        print(f"Generating {path} ...")
+        generate(path, args.patients, vitals=24, sugar=12, days=730, end=date.today(), seed=42, log=None)
+    return path
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", help="profile against this database (default: generated, --patients)")
+    ap.add_argument("--patients", type=int, default=1000)
+    ap.add_argument("--reruns", type=int, default=3, help="timed reruns per section")
+    ap.add_argument("--roles", default=",".join(SCENARIOS), help="comma-separated roles")
+    ap.add_argument("--sections", default="", help="comma-separated section labels (default: all)")
+    ap.add_argument("--sample-ms", type=float, default=2.0, help="stack sampling interval")
+    ap.add_argument("--timeout", type=float, default=300, help="AppTest timeout per rerun (s)")
+    ap.add_argument("--out", default="profile_out")
+    args = ap.parse_args()
+
+    db_path = _prepare_db(args)
+    args.out = os.path.abspath(args.out)
+    os.chdir(ROOT)   # app.py loads Logo_upscaled.png relative to cwd
+
+    import db  # after env overrides
+    from streamlit.testing.v1 import AppTest
+
+    db.migrate(db_path, log=None)
+    for role, (username, password, name) in ROLE_LOGINS.items():
+        db.create_user(username, role, password, name=name, db_path=db_path)
+    db.set_query_tracing(True)
+
+    roles = [r.strip() for r in args.roles.split(",") if r.strip()]
+    only = {s.strip() for s in args.sections.split(",") if s.strip()}
+    sampler = StackSampler(args.sample_ms / 1000)
+    sampler.start()
+
+    summary = []
+    for role in roles:
+        at = _login(AppTest, role, args.timeout)
+        for section, state in SCENARIOS[role]:
+            if only and section not in only:
+                continue
+            label = f"{role}/{section}".replace(" ", "_").replace(";", "_")
+            result = _profile_section(at, state, args.reruns, sampler, label)
+            summary.append({"role": role, "section": section, **result})
+            flag = "  !! " + result["errors"][0][:80] if result["errors"] else ""
+            print(f"{role:<13} {section:<22} {result['wall_ms_p50']:>9.1f} ms  "
+                  f"{result['queries']:>5} q  {result['rows']:>8} rows  {result['peak_mem_mb']:>7.1f} MB{flag}")
+    sampler.stop()
+    sampler.join()
+
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump({"db": db_path, "reruns": args.reruns, "results": summary}, f, indent=2)
+    with open(os.path.join(args.out, "summary.md"), "w", encoding="utf-8") as f:
+        f.write("| Role | Section | Wall p50 (ms) | Wall max (ms) | SQL (ms) | Queries | Rows | Peak mem (MB) | Errors |\n")
+        f.write("|---|---|---:|---:|---:|---:|---:|---:|---|\n")
+        for r in summary:
+            f.write(f"| {r['role']} | {r['section']} | {r['wall_ms_p50']} | {r['wall_ms_max']} | {r['sql_ms_p50']} | "
+                    f"{r['queries']} | {r['rows']} | {r['peak_mem_mb']} | {len(r['errors'])} |\n")
+    sampler.write(os.path.join(args.out, "profile.folded"))
+    print(f"\nWrote {args.out}/summary.md, summary.json, profile.folded ({sum(sampler.counts.values())} samples)")
+
+    if any(r["errors"] for r in summary):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()